@@ -0,0 +1,220 @@
+"""
+Beat-synchronized lighting from Spotify audio analysis
+"""
+import logging
+import math
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Loudness (dB) mapped onto the base brightness level
+_LOUDNESS_FLOOR_DB = -40.0
+_MIN_LEVEL = 0.3
+
+_BEAT_DECAY_S = 0.12
+_BAR_DECAY_S = 0.2
+_BAR_WHITE_MIX = 0.35
+
+
+class BeatTimeline:
+    """
+    Precomputed per-frame colors for one track
+
+    Built once per track from the audio analysis so playback only has to
+    index into a list.
+    """
+
+    def __init__(self, fps: int, frames: List[Tuple[int, int, int]]):
+        self.fps = fps
+        self.frames = frames
+
+    @property
+    def duration(self) -> float:
+        """Timeline length in seconds"""
+        return len(self.frames) / self.fps
+
+    def index_at(self, position: float) -> int:
+        """Frame index for a playback position in seconds"""
+        return int(position * self.fps)
+
+    def color_at(self, position: float) -> Optional[Tuple[int, int, int]]:
+        """Color for a playback position, or None outside the track"""
+        index = self.index_at(position)
+        if 0 <= index < len(self.frames):
+            return self.frames[index]
+        return None
+
+
+def _events(analysis: Dict, key: str) -> List[Dict]:
+    return sorted(analysis.get(key) or [], key=lambda e: e.get('start', 0.0))
+
+
+def build_timeline(analysis: Dict, base_color: Tuple[int, int, int], fps: int = 40) -> BeatTimeline:
+    """
+    Turn an audio analysis into a brightness/color timeline
+
+    Segment loudness sets the base level, every beat adds a decaying
+    brightness pulse (weighted by its confidence) and every bar start
+    briefly mixes the color towards white.
+
+    Args:
+        analysis: Spotify audio analysis payload
+        base_color: Album color to modulate
+        fps: Frames per second
+
+    Returns:
+        BeatTimeline covering the whole track
+    """
+    beats = _events(analysis, 'beats')
+    bars = _events(analysis, 'bars')
+    segments = _events(analysis, 'segments')
+
+    duration = (analysis.get('track') or {}).get('duration')
+    if not duration:
+        last = (segments or beats or [{'start': 0.0, 'duration': 0.0}])[-1]
+        duration = last.get('start', 0.0) + last.get('duration', 0.0)
+
+    frame_count = int(duration * fps) + 1
+    frames: List[Tuple[int, int, int]] = []
+    beat_i = bar_i = seg_i = -1
+    r0, g0, b0 = base_color
+
+    for n in range(frame_count):
+        t = n / fps
+
+        # Advance sweep pointers (all event lists are sorted by start)
+        while beat_i + 1 < len(beats) and beats[beat_i + 1]['start'] <= t:
+            beat_i += 1
+        while bar_i + 1 < len(bars) and bars[bar_i + 1]['start'] <= t:
+            bar_i += 1
+        while seg_i + 1 < len(segments) and segments[seg_i + 1]['start'] <= t:
+            seg_i += 1
+
+        level = 1.0
+        if seg_i >= 0:
+            loudness = segments[seg_i].get('loudness_max', 0.0)
+            normalized = min(1.0, max(0.0, 1.0 - loudness / _LOUDNESS_FLOOR_DB))
+            level = _MIN_LEVEL + (1.0 - _MIN_LEVEL) * normalized
+
+        pulse = 0.0
+        if beat_i >= 0:
+            beat = beats[beat_i]
+            pulse = beat.get('confidence', 1.0) * math.exp(-(t - beat['start']) / _BEAT_DECAY_S)
+
+        white = 0.0
+        if bar_i >= 0:
+            white = _BAR_WHITE_MIX * math.exp(-(t - bars[bar_i]['start']) / _BAR_DECAY_S)
+
+        brightness = level * (0.55 + 0.45 * pulse)
+        frames.append((
+            int((r0 + (255 - r0) * white) * brightness),
+            int((g0 + (255 - g0) * white) * brightness),
+            int((b0 + (255 - b0) * white) * brightness)
+        ))
+
+    return BeatTimeline(fps, frames)
+
+
+class BeatScheduler:
+    """
+    Plays a BeatTimeline aligned to the playback position
+
+    Frames are emitted on a high-resolution schedule: the thread sleeps
+    until shortly before each frame is due and busy-waits the remainder,
+    which keeps jitter well below 10 ms on a Pi.
+    """
+
+    def __init__(self, sinks: List[Callable[[Tuple[int, int, int]], None]], spin_s: float = 0.002):
+        self.sinks = sinks
+        self.spin_s = spin_s
+        self._timeline: Optional[BeatTimeline] = None
+        self._position_fn: Optional[Callable[[], Optional[float]]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._wake = threading.Event()
+
+        self.frames_sent = 0
+        self.jitter_max_ms = 0.0
+        self._jitter_total_ms = 0.0
+
+    def play(self, timeline: BeatTimeline, position_fn: Callable[[], Optional[float]]) -> None:
+        """
+        Play a timeline
+
+        Args:
+            timeline: Timeline for the current track
+            position_fn: Returns the current playback position in seconds,
+                or None while playback is paused
+        """
+        self._timeline = timeline
+        self._position_fn = position_fn
+        self._wake.set()
+        if not (self._thread and self._thread.is_alive()):
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name='beat-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop playback"""
+        self._running = False
+        self._timeline = None
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+
+    @property
+    def is_playing(self) -> bool:
+        return self._running and self._timeline is not None
+
+    @property
+    def jitter_avg_ms(self) -> float:
+        return self._jitter_total_ms / self.frames_sent if self.frames_sent else 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        """Scheduler timing statistics"""
+        return {
+            'frames_sent': self.frames_sent,
+            'jitter_avg_ms': round(self.jitter_avg_ms, 3),
+            'jitter_max_ms': round(self.jitter_max_ms, 3)
+        }
+
+    def _run(self) -> None:
+        while self._running:
+            timeline, position_fn = self._timeline, self._position_fn
+            position = position_fn() if (timeline and position_fn) else None
+            if position is None:
+                self._wake.wait(0.05)
+                self._wake.clear()
+                continue
+
+            index = timeline.index_at(position) + 1
+            if index >= len(timeline.frames):
+                self._wake.wait(0.05)
+                self._wake.clear()
+                continue
+
+            target = perf_counter() + max(0.0, index / timeline.fps - position)
+            remaining = target - perf_counter()
+            if remaining > self.spin_s:
+                # Returns early when a new timeline arrives
+                if self._wake.wait(remaining - self.spin_s):
+                    self._wake.clear()
+                    continue
+            while perf_counter() < target:
+                pass
+
+            jitter_ms = (perf_counter() - target) * 1000
+            color = timeline.frames[index]
+            for sink in self.sinks:
+                try:
+                    sink(color)
+                except Exception as e:
+                    logger.debug(f"Beat sink failed: {e}")
+
+            self.frames_sent += 1
+            self._jitter_total_ms += jitter_ms
+            self.jitter_max_ms = max(self.jitter_max_ms, jitter_ms)
+
+        logger.debug("Beat scheduler stopped")
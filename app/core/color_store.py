@@ -0,0 +1,187 @@
+"""
+Persistent cover colors, precomputed per extraction method
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from time import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+WRITE_TIMEOUT_S = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cover_colors (
+    url TEXT NOT NULL,
+    method TEXT NOT NULL,
+    r INTEGER NOT NULL,
+    g INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    extracted_at REAL NOT NULL,
+    PRIMARY KEY (url, method)
+) WITHOUT ROWID;
+"""
+
+
+class ColorStore:
+    """
+    Cover URL and extraction method -> color, backed by SQLite
+
+    Spotify cover URLs are content-addressed, so a stored color never goes
+    stale. The sync loop reads from here before downloading a cover; the
+    library job and live extractions fill it.
+
+    Writes are handed to a background writer thread, as in HistoryStore,
+    and stay visible to readers until they are committed. Reads wait at
+    most `read_timeout` seconds for the database and count as a miss
+    otherwise, so the sync loop never stalls behind a write.
+    """
+
+    def __init__(self, db_path: str, read_timeout: float = 0.05):
+        self.db_path = db_path
+        self.read_timeout = read_timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._unwritten: Dict[Tuple[str, str], Tuple[int, int, int]] = {}
+        self._unwritten_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        """Open the database (falls back to memory if the file is unusable)"""
+        if self._conn is not None:
+            return
+        with self._open_lock:
+            if self._conn is not None:
+                return
+            try:
+                conn = sqlite3.connect(self.db_path, timeout=self.read_timeout, check_same_thread=False)
+                # Readers in other processes never wait for our writes
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+            except sqlite3.Error as e:
+                logger.error(f"Could not open color store {self.db_path}: {e}")
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+                conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._writer = threading.Thread(target=self._write_loop, args=(conn,),
+                                            name='color-store-writer', daemon=True)
+            self._writer.start()
+
+    def get(self, url: str, method: str) -> Optional[Tuple[int, int, int]]:
+        """Stored color of a cover, or None (also if the database is busy)"""
+        with self._unwritten_lock:
+            color = self._unwritten.get((url, method))
+        if color is not None:
+            return color
+        self.open()
+        if not self._lock.acquire(timeout=self.read_timeout):
+            logger.debug(f"Color store busy, skipping lookup of {url}")
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT r, g, b FROM cover_colors WHERE url = ? AND method = ?", (url, method)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Could not read colors for {url}: {e}")
+            return None
+        finally:
+            self._lock.release()
+        return tuple(row) if row else None
+
+    def put(self, url: str, colors: Dict[str, Tuple[int, int, int]]) -> None:
+        """Store the colors of one cover, keyed by method; never blocks on disk I/O"""
+        if not colors:
+            return
+        self.open()
+        with self._unwritten_lock:
+            for method, color in colors.items():
+                self._unwritten[(url, method)] = tuple(color)
+        self._pending.put((url, dict(colors), time()))
+
+    def missing(self, urls: Iterable[str], methods: Iterable[str]) -> List[str]:
+        """The URLs, in order and without duplicates, lacking any of the methods"""
+        urls = list(dict.fromkeys(urls))
+        methods = list(methods)
+        if not urls:
+            return []
+        self.open()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT url, method FROM cover_colors "
+                f"WHERE url IN ({','.join('?' * len(urls))}) "
+                f"AND method IN ({','.join('?' * len(methods))})",
+                (*urls, *methods)
+            ).fetchall()
+        stored = set(rows)
+        with self._unwritten_lock:
+            stored.update(self._unwritten)
+        return [url for url in urls if any((url, method) not in stored for method in methods)]
+
+    def count(self) -> int:
+        """Number of covers with at least one stored color"""
+        self.open()
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT url) FROM cover_colors").fetchone()[0]
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until all pending puts have been written"""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._pending.put(done)
+        done.wait(timeout)
+
+    def close(self) -> None:
+        with self._open_lock:
+            if self._conn is None:
+                return
+            self._pending.put(None)
+            self._writer.join(5)
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+            self._writer = None
+
+    def _write_loop(self, conn: sqlite3.Connection) -> None:
+        """Persist queued puts in batches until closed"""
+        while True:
+            batch = [self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            puts = [item for item in batch if isinstance(item, tuple)]
+            rows = [(url, method, *color, at) for url, colors, at in puts for method, color in colors.items()]
+            if rows:
+                try:
+                    with self._lock:
+                        # Unlike reads, writes may wait for other processes
+                        conn.execute(f"PRAGMA busy_timeout = {int(WRITE_TIMEOUT_S * 1000)}")
+                        try:
+                            with conn:
+                                conn.executemany(
+                                    "INSERT OR REPLACE INTO cover_colors (url, method, r, g, b, extracted_at) "
+                                    "VALUES (?, ?, ?, ?, ?, ?)",
+                                    rows
+                                )
+                        finally:
+                            conn.execute(f"PRAGMA busy_timeout = {int(self.read_timeout * 1000)}")
+                except sqlite3.Error as e:
+                    logger.error(f"Could not store colors for {len(puts)} covers: {e}")
+                with self._unwritten_lock:
+                    for url, method, r, g, b, _ in rows:
+                        if self._unwritten.get((url, method)) == (r, g, b):
+                            del self._unwritten[(url, method)]
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is None for item in batch):
+                return
@@ -4,9 +4,19 @@ Configuration management with validation and persistence
 import json
 import os
 import logging
-from typing import Dict, List, Any, Tuple
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows: edits are only serialized within one process
+    fcntl = None
+
+from app.core.device_groups import parse_groups
+from app.utils.atomic import write_json
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,9 +30,50 @@ class Config:
         "SPOTIFY_SCOPE": "user-read-currently-playing",
         "WLED_IPS": [],
         "REFRESH_INTERVAL": 30,
+        # Polls stretch beyond REFRESH_INTERVAL while the playback clock is sure of the
+        # position, up to this; manual skips and pauses can take this long to show
+        "MAX_POLL_INTERVAL": 60,
         "CACHE_DURATION": 5,  # Cache API responses for 5 seconds
         "MAX_RETRIES": 3,
         "RETRY_DELAY": 2,
+        "SYNC_DEADLINE": 5.0,  # Seconds from poll to lights; later iterations count as missed
+        "EXTRACTION_BUDGET": 2.0,  # Cover download/analysis before falling back to a known color
+        "DEVICE_BUDGET": 3.0,  # Device pushes, retries included
+        "SPOTIFY_REQUESTS_PER_MINUTE": 60,  # Shared budget for all Spotify API calls
+        "HISTORY_DB_PATH": "",  # Defaults to history.db next to the config file
+        "HISTORY_MEMORY_SIZE": 100,
+        "HISTORY_RETENTION_DAYS": 365,
+        "LIGHTING_MODE": "static",  # 'static', 'beat', 'pixels' or 'palette'
+        "BEAT_SYNC_FPS": 40,
+        "PIXEL_SOURCE": "art",  # 'art' (cover across the strip) or 'gradient' (its palette)
+        "PALETTE_EFFECT": 65,  # WLED effect showing the album palette ('Palette')
+        "PALETTE_STOPS": 16,
+        # Custom palette slots (paletteN.json) for album palettes; they must follow
+        # directly after any custom palettes of your own
+        "PALETTE_FIRST_SLOT": 0,
+        "PALETTE_SLOTS": 4,
+        "COLOR_STORE_PATH": "",  # Precomputed cover colors, defaults to colors.db next to the config file
+        # Library precompute job; needs "user-library-read playlist-read-private" in SPOTIFY_SCOPE
+        "LIBRARY_JOB_WORKERS": 2,  # Concurrent cover downloads
+        "EXTRACTION_PROCESSES": 2,  # Worker processes for batch extraction, 0 runs it in the download threads
+        "LIBRARY_JOB_COVERS_PER_MINUTE": 60,
+        "STATE_PATH": "",  # Last color/track for warm starts, defaults to state.json next to the config file
+        "DEVICE_CACHE_PATH": "",  # Device capability profiles, defaults to devices.json next to the config file
+        "WLED_WEBSOCKET": True,  # Mirror device state live over /ws
+        # Per device: {"gamma": 2.2, "white_balance": [1, 0.9, 0.8], "max_brightness": 0.8, "rgbw": true}
+        "DEVICE_CALIBRATION": {},
+        # [{"name": "Living room", "leader": "10.0.0.2", "followers": ["10.0.0.3"], "sync_group": 1},
+        #  {"name": "Garden", "transport": "mqtt", "devices": ["10.0.0.4", "10.0.0.5"], "topic": "wled/garden"}]
+        "DEVICE_GROUPS": [],
+        "E131_ENABLED": False,  # Send colors over sACN multicast instead of HTTP
+        "E131_OUTPUTS": [],  # [{"universe": 1, "start_channel": 1, "led_count": 60}, ...]
+        "E131_PRIORITY": 100,
+        "MQTT_HOST": "",  # Broker for device groups with "transport": "mqtt"
+        "MQTT_PORT": 1883,
+        "MQTT_USERNAME": "",
+        "MQTT_PASSWORD": "",
+        "MQTT_QOS": 1,
+        "MQTT_RETAIN": False,  # Let devices pick up the last color when they (re)subscribe
     }
     
     def __init__(self, config_path: str = None):
@@ -32,6 +83,7 @@ class Config:
         
         self.config_path = Path(config_path)
         self.data = self.DEFAULT_CONFIG.copy()
+        self._edit_lock = threading.Lock()
         self.is_running = False
         self.load()
     
@@ -57,14 +109,35 @@ class Config:
             save_data = {k: v for k, v in self.data.items() 
                         if k not in ['IS_RUNNING']}
             
-            with open(self.config_path, 'w') as f:
-                json.dump(save_data, f, indent=2)
+            # Replaced atomically, so other processes never load half a file
+            write_json(self.config_path, save_data, indent=2)
             logger.info(f"Configuration saved to {self.config_path}")
             return True
         except Exception as e:
             logger.error(f"Error saving config: {e}")
             return False
     
+    @contextmanager
+    def edit(self) -> Iterator['Config']:
+        """
+        Read-modify-write the config file
+        
+        Every web worker process has its own copy of the config. Editing
+        holds an exclusive lock and reloads the file first, so a change
+        saved by another process is not overwritten with a stale copy.
+        The config is saved when the block exits without an error.
+        """
+        with self._edit_lock, open(f"{self.config_path}.lock", 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self.load()
+                yield self
+                self.save()
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
     def validate(self) -> Tuple[bool, List[str]]:
         """
         Validate configuration
@@ -87,6 +160,15 @@ class Config:
         if not isinstance(refresh, int) or refresh < 1:
             errors.append("Refresh interval must be at least 1 second")
         
+        # Validate device groups
+        try:
+            parse_groups(self.data.get("DEVICE_GROUPS", []))
+        except (TypeError, ValueError) as e:
+            errors.append(f"Invalid device groups: {e}")
+        
+        if self.data.get("MQTT_QOS", 1) not in (0, 1, 2):
+            errors.append("MQTT QoS must be 0, 1 or 2")
+        
         return (len(errors) == 0, errors)
     
     def get(self, key: str, default: Any = None) -> Any:
@@ -108,5 +190,27 @@ class Config:
         self.data[key] = value
 
 
-# Global config instance
-config = Config()
+_config: Optional[Config] = None
+_config_lock = threading.Lock()
+
+
+def get_config() -> Config:
+    """
+    Get the global config instance, loading it on first use
+
+    Creating the instance reads the config file, so it is deferred until
+    something actually needs configuration instead of happening at import.
+    """
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                _config = Config()
+    return _config
+
+
+def __getattr__(name: str) -> Any:
+    # Backwards compatible ``from app.core.config import config``
+    if name == 'config':
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
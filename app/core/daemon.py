@@ -0,0 +1,165 @@
+"""
+Headless sync daemon: the SyncEngine without the web UI
+
+    python run.py --headless [--config config.json] [--status-socket PATH]
+    python -m app.core.daemon ...
+
+Runs the engine from the config file without importing Flask, Jinja or
+the routes. Spotify has to be authorized once through the web UI; the
+token cache it leaves behind is reused here.
+
+SIGTERM/SIGINT stop the engine cleanly and SIGHUP reloads the config
+file. The status socket answers one command per connection ('status',
+the default, or 'metrics') with a line of JSON:
+
+    echo metrics | nc -U /tmp/spotifytowled-status.sock
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socketserver
+import threading
+from typing import List, Optional
+
+from app.core.config import get_config
+from app.core.log_setup import configure_logging
+from app.core.sync_engine import SyncEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_SOCKET = '/tmp/spotifytowled-status.sock'
+
+# Seconds between attempts to start the engine (e.g. Spotify unreachable at boot)
+START_RETRY_S = 30
+# Seconds between checks that the engine is still running
+WATCH_INTERVAL_S = 60
+
+
+class _StatusHandler(socketserver.StreamRequestHandler):
+    timeout = 2
+
+    def handle(self) -> None:
+        try:
+            command = self.rfile.readline(64).decode('ascii', 'replace').strip() or 'status'
+        except OSError:
+            return
+        engine = self.server.engine
+        if command == 'status':
+            payload = engine.get_status_snapshot().json_bytes
+        elif command == 'metrics':
+            payload = json.dumps(engine.get_metrics(), default=str).encode('utf-8')
+        else:
+            payload = json.dumps({'error': f"Unknown command: {command}"}).encode('utf-8')
+        try:
+            self.wfile.write(payload + b'\n')
+        except OSError:
+            pass
+
+
+class StatusServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket answering status and metrics queries"""
+    daemon_threads = True
+
+    def __init__(self, engine: SyncEngine, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        self.engine = engine
+        self.path = path
+        super().__init__(path, _StatusHandler)
+        self._thread = threading.Thread(target=self.serve_forever, name='status-socket', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        logger.info(f"Status socket listening on {self.path}")
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class Daemon:
+    """Runs the engine until a signal stops it"""
+
+    def __init__(self, engine: SyncEngine, status_socket: str = ''):
+        self.engine = engine
+        self.status_socket = status_socket
+        self._stopping = False
+        self._reload = threading.Event()
+        self._wake = threading.Event()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wake.set()
+
+    def reload(self) -> None:
+        self._reload.set()
+        self._wake.set()
+
+    def install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.reload())
+
+    def run(self) -> int:
+        """
+        Start the engine and keep it running
+
+        Returns:
+            Process exit code
+        """
+        server = None
+        if self.status_socket:
+            try:
+                server = StatusServer(self.engine, self.status_socket)
+                server.start()
+            except OSError as e:
+                logger.error(f"Cannot open status socket {self.status_socket}: {e}")
+
+        try:
+            while not self._stopping:
+                if self._reload.is_set():
+                    self._reload.clear()
+                    logger.info("Reloading configuration")
+                    self.engine.config.load()
+                    self.engine.reload_config()
+                if self.engine.is_running or self.engine.start():
+                    self._wake.wait(WATCH_INTERVAL_S)
+                else:
+                    logger.error(f"Sync engine did not start, retrying in {START_RETRY_S}s")
+                    self._wake.wait(START_RETRY_S)
+                self._wake.clear()
+        finally:
+            logger.info("Headless daemon shutting down")
+            self.engine.stop()
+            self.engine.device_queue.wait_idle(5)
+            if server:
+                server.close()
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the headless daemon"""
+    parser = argparse.ArgumentParser(description="Sync Spotify album colors to WLED without the web UI")
+    parser.add_argument('--config', help="Config file (default: $CONFIG_PATH or config.json)")
+    parser.add_argument('--status-socket', default=os.environ.get('STATUS_SOCKET', DEFAULT_STATUS_SOCKET),
+                        help="Unix socket for status queries, empty to disable")
+    args = parser.parse_args(argv)
+    if args.config:
+        os.environ['CONFIG_PATH'] = args.config
+
+    configure_logging()
+    daemon = Daemon(SyncEngine(get_config()), status_socket=args.status_socket)
+    daemon.install_signal_handlers()
+    logger.info("🎵 SpotifyToWLED running headless")
+    return daemon.run()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
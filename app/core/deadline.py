@@ -0,0 +1,98 @@
+"""
+End-to-end deadlines for sync iterations
+"""
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGE_SPOTIFY = 'spotify'
+STAGE_EXTRACTION = 'extraction'
+STAGE_DEVICES = 'devices'
+STAGE_EFFECTS = 'effects'
+
+
+class Deadline:
+    """
+    Time limit of one sync iteration, handed down to every stage
+
+    Stages ask for ``budget()`` before blocking and report back with
+    ``check()`` once done. The first stage to finish late marks the
+    iteration as missed; ``on_miss`` is called once with its name.
+    """
+
+    def __init__(self, budget_s: float, on_miss: Optional[Callable[[str], None]] = None):
+        self.budget_s = budget_s
+        self.expires_at = monotonic() + budget_s
+        self.missed_stage: Optional[str] = None
+        self._on_miss = on_miss
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """Seconds left, never negative"""
+        return max(0.0, self.expires_at - monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return monotonic() >= self.expires_at
+
+    def budget(self, stage_s: float) -> float:
+        """Time a stage may take: its own budget, capped by what is left"""
+        return min(stage_s, self.remaining())
+
+    def check(self, stage: str) -> bool:
+        """
+        Report a finished stage
+
+        Returns:
+            True if it finished within the deadline
+        """
+        if not self.expired:
+            return True
+        with self._lock:
+            if self.missed_stage is not None:
+                return False
+            self.missed_stage = stage
+        logger.warning(f"⏱ Sync iteration missed its {self.budget_s:.1f}s deadline in stage '{stage}'")
+        if self._on_miss:
+            self._on_miss(stage)
+        return False
+
+
+class DeadlineStats:
+    """Iteration, miss and fallback counters"""
+
+    def __init__(self):
+        self.iterations = 0
+        self.missed = 0
+        self.missed_by_stage: Dict[str, int] = {}
+        self.fallbacks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self, budget_s: float) -> Deadline:
+        """Deadline for a new iteration, counted here"""
+        with self._lock:
+            self.iterations += 1
+        return Deadline(budget_s, on_miss=self._record_miss)
+
+    def _record_miss(self, stage: str) -> None:
+        with self._lock:
+            self.missed += 1
+            self.missed_by_stage[stage] = self.missed_by_stage.get(stage, 0) + 1
+
+    def record_fallback(self, stage: str) -> None:
+        """A stage ran out of time or failed and used its fallback"""
+        with self._lock:
+            self.fallbacks[stage] = self.fallbacks.get(stage, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'iterations': self.iterations,
+                'missed': self.missed,
+                'missed_by_stage': dict(self.missed_by_stage),
+                'fallbacks': dict(self.fallbacks)
+            }
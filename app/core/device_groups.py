@@ -0,0 +1,246 @@
+"""
+Device groups relayed by WLED's own UDP sync or fanned out by an MQTT broker
+"""
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a follower may lag behind its leader before it counts as not tracking
+TRACKING_GRACE_S = 3.0
+
+TRANSPORT_UDP_SYNC = 'udp_sync'
+TRANSPORT_MQTT = 'mqtt'
+
+
+@dataclass(frozen=True)
+class DeviceGroup:
+    """
+    Devices that share one color push
+
+    UDP sync groups have a leader that receives pushes and followers that
+    mirror it. MQTT groups have no leader: their devices (``followers``)
+    are reached through the group ``topic`` or their own ``device_topics``.
+    """
+    name: str
+    leader: str
+    followers: Tuple[str, ...]
+    sync_group: int = 1
+    transport: str = TRANSPORT_UDP_SYNC
+    topic: str = ''
+    device_topics: Tuple[Tuple[str, str], ...] = ()
+
+    @property
+    def mask(self) -> int:
+        """WLED sync group bitmask (groups 1-8)"""
+        return 1 << (self.sync_group - 1)
+
+    @property
+    def devices(self) -> Tuple[str, ...]:
+        """Every device in the group"""
+        return ((self.leader,) if self.leader else ()) + self.followers
+
+
+def parse_groups(settings: Iterable[Dict[str, Any]]) -> List[DeviceGroup]:
+    """
+    Parse the DEVICE_GROUPS config
+
+    Raises:
+        ValueError: On missing leaders or topics, bad sync groups, unknown
+            transports or devices in two groups
+    """
+    groups = []
+    seen: Set[str] = set()
+    for index, entry in enumerate(settings or []):
+        if not isinstance(entry, dict):
+            raise ValueError(f"Device group {index + 1} must be an object")
+        transport = entry.get('transport', TRANSPORT_UDP_SYNC)
+        name = str(entry.get('name') or f"Group {index + 1}")
+        if transport == TRANSPORT_MQTT:
+            group = _parse_mqtt_group(index, name, entry)
+        elif transport == TRANSPORT_UDP_SYNC:
+            if not entry.get('leader'):
+                raise ValueError(f"Device group {index + 1} needs a leader")
+            sync_group = int(entry.get('sync_group', 1))
+            if not 1 <= sync_group <= 8:
+                raise ValueError(f"Device group {index + 1}: sync_group must be 1-8")
+            group = DeviceGroup(
+                name=name,
+                leader=entry['leader'],
+                followers=tuple(f for f in entry.get('followers', []) if f != entry['leader']),
+                sync_group=sync_group
+            )
+        else:
+            raise ValueError(f"Device group {index + 1}: unknown transport '{transport}'")
+        for ip in group.devices:
+            if ip in seen:
+                raise ValueError(f"{ip} is in more than one device group")
+            seen.add(ip)
+        groups.append(group)
+    return groups
+
+
+def _parse_mqtt_group(index: int, name: str, entry: Dict[str, Any]) -> DeviceGroup:
+    topic = str(entry.get('topic') or '').strip('/')
+    device_topics = {ip: str(t).strip('/') for ip, t in (entry.get('device_topics') or {}).items()}
+    devices = tuple(dict.fromkeys(list(entry.get('devices', [])) + list(device_topics)))
+    if not devices:
+        raise ValueError(f"Device group {index + 1} has no devices")
+    missing = [ip for ip in devices if not topic and not device_topics.get(ip)]
+    if missing:
+        raise ValueError(f"Device group {index + 1} needs a topic or device_topics for {', '.join(missing)}")
+    return DeviceGroup(
+        name=name,
+        leader='',
+        followers=devices,
+        transport=TRANSPORT_MQTT,
+        topic=topic,
+        device_topics=tuple(sorted(device_topics.items()))
+    )
+
+
+def main_color(state: Optional[Dict[str, Any]]) -> Optional[Tuple[int, ...]]:
+    """Primary color of the first segment of a mirrored WLED state"""
+    try:
+        return tuple(state['seg'][0]['col'][0][:3])
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class GroupCoordinator:
+    """
+    Decide which devices need a direct push
+
+    Leaders are pushed to directly; WLED relays their state to followers
+    in the same sync group. Followers are pushed to directly only while
+    they are not (yet) subscribed or have stopped tracking their leader:
+    their mirrored sync settings no longer receive the group, or their
+    color still differs from the leader's well after it changed. Without
+    a mirrored state (WLED_WEBSOCKET off) nothing would show a follower
+    dropping out, so it keeps getting direct pushes.
+
+    Devices in MQTT groups are split off beforehand by ``route_mqtt``.
+    """
+
+    def __init__(self, set_sync: Callable[..., bool], mirror):
+        self._set_sync = set_sync
+        self._mirror = mirror
+        self._groups: List[DeviceGroup] = []
+        self._subscribed: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.relayed = 0
+
+    def configure(self, groups: List[DeviceGroup]) -> None:
+        """Replace the groups; subscriptions are set up again on next use"""
+        with self._lock:
+            if groups != self._groups:
+                self._groups = groups
+                self._subscribed.clear()
+
+    def forget(self, ip: str) -> None:
+        """Re-check a device's subscription (e.g. after it reconnected)"""
+        with self._lock:
+            self._subscribed = {key for key in self._subscribed if key[1] != ip}
+
+    def route_mqtt(self, ips: Iterable[str]) -> Tuple[List[str], List[Tuple[str, Optional[str]]]]:
+        """
+        Split off the devices reached through an MQTT broker
+
+        Args:
+            ips: Devices that should show the new color
+
+        Returns:
+            (devices left for HTTP/UDP sync, (topic, device) pairs to publish
+            to; device is None for group topics that reach several devices)
+        """
+        ips = list(ips)
+        wanted = set(ips)
+        published: Set[str] = set()
+        routes: List[Tuple[str, Optional[str]]] = []
+        with self._lock:
+            groups = [g for g in self._groups if g.transport == TRANSPORT_MQTT]
+        for group in groups:
+            members = [ip for ip in group.devices if ip in wanted]
+            if not members:
+                continue
+            if group.topic:
+                # One publish reaches every device subscribed to the group topic
+                routes.append((group.topic, None))
+            else:
+                device_topics = dict(group.device_topics)
+                routes.extend((device_topics[ip], ip) for ip in members)
+            published.update(members)
+        return [ip for ip in ips if ip not in published], routes
+
+    def plan(self, ips: Iterable[str]) -> Tuple[List[str], List[Tuple[str, Callable[[], bool]]]]:
+        """
+        Split devices into direct pushes and subscription commands
+
+        Args:
+            ips: Devices that should show the new color
+
+        Returns:
+            (devices to push to directly, (device, command) pairs that
+            subscribe leaders/followers and must run before the push)
+        """
+        ips = list(ips)
+        wanted = set(ips)
+        relayed: Set[str] = set()
+        commands = []
+        with self._lock:
+            groups = list(self._groups)
+        for group in groups:
+            if group.transport != TRANSPORT_UDP_SYNC or group.leader not in wanted:
+                continue
+            if (group.name, group.leader) not in self._subscribed:
+                commands.append((group.leader, self._subscribe_command(group, group.leader, leader=True)))
+            for follower in group.followers:
+                if follower not in wanted:
+                    continue
+                if self.is_tracking(group, follower):
+                    relayed.add(follower)
+                elif (group.name, follower) not in self._subscribed:
+                    commands.append((follower, self._subscribe_command(group, follower, leader=False)))
+        self.relayed += len(relayed)
+        return [ip for ip in ips if ip not in relayed], commands
+
+    def _subscribe_command(self, group: DeviceGroup, ip: str, leader: bool) -> Callable[[], bool]:
+        def subscribe() -> bool:
+            if leader:
+                ok = self._set_sync(ip, send=True, send_groups=group.mask)
+            else:
+                ok = self._set_sync(ip, receive=True, receive_groups=group.mask)
+            if ok:
+                with self._lock:
+                    self._subscribed.add((group.name, ip))
+                logger.info(f"WLED @ {ip} {'leads' if leader else 'follows'} device group '{group.name}'")
+            return ok
+        return subscribe
+
+    def is_tracking(self, group: DeviceGroup, follower: str) -> bool:
+        """Whether a follower can be left to the leader's UDP sync"""
+        if (group.name, group.leader) not in self._subscribed or (group.name, follower) not in self._subscribed:
+            return False
+        if self._mirror.is_online(group.leader) is False or self._mirror.is_online(follower) is False:
+            return False
+
+        state = self._mirror.get_state(follower)
+        if state is None:
+            # Relaying is only safe while we can see that it works
+            return False
+        sync = state.get('udpn') or {}
+        if not sync.get('recv', True) or not sync.get('rgrp', group.mask) & group.mask:
+            logger.info(f"WLED @ {follower} no longer receives sync from '{group.name}', pushing directly")
+            self.forget(follower)
+            return False
+
+        leader_color = main_color(self._mirror.get_state(group.leader))
+        follower_color = main_color(state)
+        if leader_color and follower_color and leader_color != follower_color:
+            age = self._mirror.seconds_since_update(group.leader)
+            if age is not None and age > TRACKING_GRACE_S:
+                logger.info(f"WLED @ {follower} stopped tracking '{group.name}', pushing directly")
+                return False
+        return True
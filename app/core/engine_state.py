@@ -0,0 +1,61 @@
+"""
+Engine state kept across restarts for a warm start
+"""
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from time import time
+from typing import Dict, Optional, Tuple
+
+from app.utils.atomic import write_json
+
+logger = logging.getLogger(__name__)
+
+# Cover colors written to disk, most recently extracted first
+MAX_SAVED_COLORS = 200
+
+
+@dataclass
+class EngineState:
+    """The last applied color and what it came from"""
+    color: Tuple[int, int, int] = (0, 0, 0)
+    track_info: Dict[str, str] = field(default_factory=dict)
+    album_image_url: str = ''
+    # Cover URL -> extracted color
+    colors: Dict[str, Tuple[int, int, int]] = field(default_factory=dict)
+    saved_at: float = 0.0
+
+    @property
+    def track_id(self) -> str:
+        return self.track_info.get('id', '')
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'EngineState':
+        return cls(
+            color=tuple(data.get('color', (0, 0, 0)))[:3],
+            track_info=dict(data.get('track_info') or {}),
+            album_image_url=str(data.get('album_image_url', '')),
+            colors={url: tuple(color)[:3] for url, color in (data.get('colors') or {}).items()},
+            saved_at=float(data.get('saved_at', 0.0))
+        )
+
+
+def load_state(path: str) -> Optional[EngineState]:
+    """Saved state, or None if there is none (or it is unreadable)"""
+    try:
+        with open(path, 'r') as f:
+            return EngineState.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"Could not read engine state {path}: {e}")
+        return None
+
+
+def save_state(path: str, state: EngineState) -> None:
+    """Write the state (atomically)"""
+    state.saved_at = time()
+    try:
+        write_json(path, asdict(state))
+    except OSError as e:
+        logger.warning(f"Could not write engine state {path}: {e}")
@@ -0,0 +1,219 @@
+"""
+Persistent color history with an in-memory ring buffer
+"""
+import logging
+import queue
+import sqlite3
+import threading
+from collections import deque
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS color_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    track_id TEXT NOT NULL DEFAULT '',
+    track TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    album TEXT NOT NULL DEFAULT '',
+    r INTEGER NOT NULL,
+    g INTEGER NOT NULL,
+    b INTEGER NOT NULL,
+    method TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_color_history_ts ON color_history (ts);
+CREATE INDEX IF NOT EXISTS idx_color_history_track ON color_history (track_id, ts);
+"""
+
+_COLUMNS = "ts, track_id, track, artist, album, r, g, b, method"
+
+
+class HistoryStore:
+    """
+    Color history backed by SQLite
+
+    Recent entries live in a fixed-size deque so the sync loop can append in
+    O(1) without touching the disk. Every append is also handed to a
+    background writer thread that batches rows into an append-only SQLite
+    table, indexed on time and track, for long-term queries.
+    """
+
+    def __init__(self, db_path: str, capacity: int = 100, retention_days: int = 365):
+        self.db_path = db_path
+        self.capacity = capacity
+        self.retention_days = retention_days
+        self._buffer: deque = deque(maxlen=capacity)
+        self._pending: queue.SimpleQueue = queue.SimpleQueue()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        """
+        Open the database, prune old rows and warm the ring buffer
+
+        Safe to call repeatedly. Appends made before opening are queued and
+        written once the writer thread starts.
+        """
+        if self._conn is not None:
+            return
+        with self._open_lock:
+            if self._conn is not None:
+                return
+            try:
+                conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.executescript(_SCHEMA)
+                if self.retention_days:
+                    conn.execute("DELETE FROM color_history WHERE ts < ?",
+                                 (time() - self.retention_days * 86400,))
+                    conn.commit()
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM color_history ORDER BY ts DESC, id DESC LIMIT ?",
+                    (self.capacity,)
+                ).fetchall()
+                # Persisted rows are older than anything appended before opening
+                warmed = deque((self._row_to_entry(row) for row in reversed(rows)), maxlen=self.capacity)
+                warmed.extend(self._buffer)
+                self._buffer = warmed
+            except sqlite3.Error as e:
+                logger.error(f"Could not open history database {self.db_path}: {e}")
+                conn = sqlite3.connect(':memory:', check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+            self._writer.start()
+
+    def append(self, color: Tuple[int, int, int], track_info: Dict[str, Any], method: str = '') -> Dict[str, Any]:
+        """
+        Record a color change
+
+        Never blocks on disk I/O; the row is persisted asynchronously.
+
+        Returns:
+            The stored history entry
+        """
+        entry = {
+            'time': time(),
+            'color': tuple(color),
+            'track': track_info.get('name', 'Unknown'),
+            'artist': track_info.get('artist', 'Unknown'),
+            'album': track_info.get('album', ''),
+            'track_id': track_info.get('id', ''),
+            'method': method
+        }
+        self._buffer.append(entry)
+        self._pending.put(entry)
+        return entry
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the most recent entries from memory, newest first"""
+        self.open()
+        entries = list(self._buffer)
+        entries.reverse()
+        return entries[:limit] if limit is not None else entries
+
+    def query(self, page: int = 1, per_page: int = 50, track_id: Optional[str] = None,
+              artist: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Query persisted history, newest first
+
+        Args:
+            page: 1-based page number
+            per_page: Entries per page (1-500)
+            track_id: Only entries for this Spotify track ID
+            artist: Only entries whose artist contains this text
+            since, until: Unix timestamp bounds (inclusive)
+
+        Returns:
+            Dictionary with 'items', 'page', 'per_page' and 'total'
+        """
+        self.open()
+        self.flush()
+        page = max(1, int(page))
+        per_page = max(1, min(500, int(per_page)))
+
+        clauses, params = [], []
+        if track_id:
+            clauses.append("track_id = ?")
+            params.append(track_id)
+        if artist:
+            clauses.append("artist LIKE ?")
+            params.append(f"%{artist}%")
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(float(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._db_lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM color_history {where}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM color_history {where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [per_page, (page - 1) * per_page]
+            ).fetchall()
+
+        return {
+            'items': [self._row_to_entry(row) for row in rows],
+            'page': page,
+            'per_page': per_page,
+            'total': total
+        }
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until all pending appends have been written"""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._pending.put(done)
+        done.wait(timeout)
+
+    def _write_loop(self) -> None:
+        """Persist queued entries in batches"""
+        while True:
+            batch = [self._pending.get()]
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows = [
+                (e['time'], e['track_id'], e['track'], e['artist'], e['album'],
+                 *e['color'], e['method'])
+                for e in batch if isinstance(e, dict)
+            ]
+            if rows:
+                try:
+                    with self._db_lock:
+                        self._conn.executemany(
+                            f"INSERT INTO color_history ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            rows
+                        )
+                        self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to persist color history: {e}")
+
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            'time': row['ts'],
+            'color': (row['r'], row['g'], row['b']),
+            'track': row['track'],
+            'artist': row['artist'],
+            'album': row['album'],
+            'track_id': row['track_id'],
+            'method': row['method']
+        }
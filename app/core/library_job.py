@@ -0,0 +1,329 @@
+"""
+Background precomputation of cover colors for the user's whole library
+"""
+import json
+import logging
+import os
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.core.color_store import ColorStore
+from app.utils.atomic import write_json
+from app.utils.color_extractor import METHODS, ColorExtractor
+from app.utils.spotify_client import RateLimitedError
+
+logger = logging.getLogger(__name__)
+
+# Walk order; the checkpoint records the phase and the offset within it
+PHASE_ALBUMS = 'albums'
+PHASE_PLAYLISTS = 'playlists'
+PHASE_PLAYLIST_ITEMS = 'playlist_items'
+PHASE_DONE = 'done'
+
+STATE_IDLE = 'idle'
+STATE_RUNNING = 'running'
+STATE_STOPPED = 'stopped'
+STATE_FINISHED = 'finished'
+STATE_FAILED = 'failed'
+
+# Spotify's maximum page sizes
+ALBUM_PAGE_SIZE = 50
+PLAYLIST_PAGE_SIZE = 50
+PLAYLIST_ITEMS_PAGE_SIZE = 100
+
+# How often a paused download checks whether the sync loop is done
+BUSY_POLL_S = 0.5
+
+# Shortest wait when Spotify's request budget is spent
+MIN_RETRY_S = 1.0
+
+
+def cover_url(album: Optional[Dict]) -> Optional[str]:
+    """Largest cover of an album object, the one the sync loop uses"""
+    try:
+        return album['images'][0]['url']
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+class LibraryPrecomputeJob:
+    """
+    Fill the color store for every cover in the library
+
+    Walks the saved albums, then every playlist, page by page. Each page's
+    covers that are not stored yet for every method go through the batch
+    extraction pipeline, fed at most `covers_per_minute`, with `workers`
+    concurrent downloads. Spotify calls use the background budget, so they
+    never take requests from polling, and downloads wait while `is_busy()`
+    says the sync loop is handling a track change.
+
+    A checkpoint is written after every page, so a stopped or crashed run
+    resumes where it left off. It is removed once the walk completes, and
+    the next run starts over, skipping whatever is stored already.
+    """
+
+    def __init__(self, spotify_manager, color_extractor: ColorExtractor, store: ColorStore,
+                 checkpoint_path: str, workers: int = 2, covers_per_minute: float = 60,
+                 is_busy: Optional[Callable[[], bool]] = None, methods: Iterable[str] = METHODS,
+                 download_timeout: float = 10.0):
+        self.spotify_manager = spotify_manager
+        self.color_extractor = color_extractor
+        self.store = store
+        self.checkpoint_path = checkpoint_path
+        self.workers = max(1, int(workers))
+        self.interval_s = 60.0 / covers_per_minute if covers_per_minute > 0 else 0.0
+        self.is_busy = is_busy or (lambda: False)
+        self.methods = tuple(methods)
+        self.download_timeout = download_timeout
+
+        self.state = STATE_IDLE
+        self.error: Optional[str] = None
+        self._checkpoint: Dict[str, Any] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._reset_counters()
+
+    def _reset_counters(self) -> None:
+        self.pages = 0
+        self.covers_seen = 0
+        self.covers_done = 0
+        self.covers_skipped = 0
+        self.covers_failed = 0
+        self.rate_limited = 0
+        self.albums_total: Optional[int] = None
+        self.playlists_total: Optional[int] = None
+        self._started = 0.0
+        self._finished = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start or resume the walk in a background thread
+
+        Returns:
+            False if it is already running
+        """
+        if self.is_running:
+            return False
+        self._stop.clear()
+        self._reset_counters()
+        self._checkpoint = self._load_checkpoint()
+        self.state = STATE_RUNNING
+        self.error = None
+        self._started = monotonic()
+        self._thread = threading.Thread(target=self._run, name='library-job', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop after the downloads in flight; the checkpoint stays for a resume"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Progress and throughput of the current (or last) run"""
+        end = self._finished or monotonic()
+        elapsed = end - self._started if self._started else 0.0
+        checkpoint = self._checkpoint
+        return {
+            'state': self.state,
+            'error': self.error,
+            'phase': checkpoint.get('phase'),
+            'offset': checkpoint.get('offset', 0),
+            'playlists_pending': len(checkpoint.get('playlists', [])),
+            'albums_total': self.albums_total,
+            'playlists_total': self.playlists_total,
+            'pages': self.pages,
+            'covers_seen': self.covers_seen,
+            'covers_done': self.covers_done,
+            'covers_skipped': self.covers_skipped,
+            'covers_failed': self.covers_failed,
+            'rate_limited': self.rate_limited,
+            'elapsed_s': round(elapsed, 1),
+            'covers_per_minute': round(self.covers_done * 60 / elapsed, 1) if elapsed > 0 else 0.0
+        }
+
+    def _run(self) -> None:
+        logger.info(f"Library color precompute started at {self._checkpoint['phase']} "
+                    f"offset {self._checkpoint['offset']}")
+        try:
+            while not self._stop.is_set() and self._checkpoint['phase'] != PHASE_DONE:
+                if not self._step():
+                    break
+        except Exception as e:
+            logger.error(f"Library color precompute failed: {e}", exc_info=True)
+            self.state, self.error = STATE_FAILED, str(e)
+
+        self._finished = monotonic()
+        if self._checkpoint['phase'] == PHASE_DONE:
+            self.state = STATE_FINISHED
+            self._remove_checkpoint()
+        elif self.state == STATE_RUNNING:
+            self.state = STATE_STOPPED
+        # The extraction worker processes are only needed while walking
+        self.color_extractor.close()
+        status = self.get_status()
+        logger.info(f"Library color precompute {self.state}: {status['covers_done']} extracted, "
+                    f"{status['covers_skipped']} already stored, {status['covers_failed']} failed "
+                    f"in {status['elapsed_s']:.0f}s ({status['covers_per_minute']}/min)")
+
+    def _step(self) -> bool:
+        """
+        Fetch and process one page, then advance the checkpoint
+
+        Returns:
+            False if the walk cannot go on
+        """
+        checkpoint = self._checkpoint
+        phase, offset = checkpoint['phase'], checkpoint['offset']
+
+        if phase == PHASE_PLAYLIST_ITEMS and not checkpoint['playlists']:
+            self._advance(PHASE_DONE)
+            return True
+
+        if phase == PHASE_ALBUMS:
+            page = self._fetch(self.spotify_manager.get_saved_albums, offset, ALBUM_PAGE_SIZE)
+        elif phase == PHASE_PLAYLISTS:
+            page = self._fetch(self.spotify_manager.get_playlists, offset, PLAYLIST_PAGE_SIZE)
+        else:
+            page = self._fetch(self.spotify_manager.get_playlist_items, checkpoint['playlists'][0],
+                               offset, PLAYLIST_ITEMS_PAGE_SIZE)
+        if self._stop.is_set():
+            return False
+        if page is None:
+            if phase == PHASE_PLAYLIST_ITEMS:
+                # A deleted or unavailable playlist only costs its own covers
+                logger.warning(f"Skipping playlist {checkpoint['playlists'][0]}")
+                checkpoint['playlists'].pop(0)
+                self._advance(PHASE_PLAYLIST_ITEMS)
+                return True
+            self.state = STATE_FAILED
+            self.error = (f"Could not fetch {phase}; SPOTIFY_SCOPE needs "
+                          f"user-library-read and playlist-read-private")
+            return False
+
+        self.pages += 1
+        items = [item for item in page.get('items') or [] if item]
+        if phase == PHASE_ALBUMS:
+            self.albums_total = page.get('total')
+            urls = [cover_url(item.get('album')) for item in items]
+        elif phase == PHASE_PLAYLISTS:
+            self.playlists_total = page.get('total')
+            checkpoint['playlists'].extend(item['id'] for item in items if item.get('id'))
+            urls = []
+        else:
+            urls = [cover_url((item.get('track') or {}).get('album')) for item in items]
+
+        self._process_covers([url for url in urls if url])
+        if self._stop.is_set():
+            # The page is not done; a resume repeats it and skips what got stored
+            return False
+
+        if items and page.get('next'):
+            checkpoint['offset'] = offset + len(items)
+            self._save_checkpoint()
+        elif phase == PHASE_ALBUMS:
+            self._advance(PHASE_PLAYLISTS)
+        elif phase == PHASE_PLAYLISTS:
+            self._advance(PHASE_PLAYLIST_ITEMS)
+        else:
+            checkpoint['playlists'].pop(0)
+            self._advance(PHASE_PLAYLIST_ITEMS)
+        return True
+
+    def _advance(self, phase: str) -> None:
+        self._checkpoint['phase'] = phase
+        self._checkpoint['offset'] = 0
+        self._save_checkpoint()
+
+    def _fetch(self, fetch: Callable[..., Optional[Dict]], *args: Any) -> Optional[Dict]:
+        """One page, waiting out the request budget as often as needed"""
+        while not self._stop.is_set():
+            try:
+                return fetch(*args)
+            except RateLimitedError as e:
+                self.rate_limited += 1
+                logger.debug(f"Library precompute waiting {e.retry_after:.1f}s for Spotify budget")
+                self._stop.wait(max(e.retry_after, MIN_RETRY_S))
+        return None
+
+    def _process_covers(self, urls: List[str]) -> None:
+        """Precompute the page's covers that are not fully stored yet"""
+        urls = list(dict.fromkeys(urls))
+        missing = self.store.missing(urls, self.methods)
+        self.covers_seen += len(urls)
+        self.covers_skipped += len(urls) - len(missing)
+        if not missing:
+            return
+        for result in self.color_extractor.extract_batch(self._paced(missing), self.methods,
+                                                         timeout=self.download_timeout,
+                                                         download_workers=self.workers):
+            if result.ok:
+                self.store.put(result.url, result.colors)
+                self.covers_done += 1
+            else:
+                logger.debug(f"Library precompute failed for {result.url}: {result.error}")
+                self.covers_failed += 1
+
+    def _paced(self, urls: List[str]) -> Iterator[str]:
+        """The URLs, each as soon as it may be downloaded"""
+        for url in urls:
+            if not self._wait_turn():
+                return
+            yield url
+
+    def _wait_turn(self) -> bool:
+        """
+        Block until this download may start: the sync loop is idle and the
+        throttle has a slot
+
+        Returns:
+            False if the job is stopping
+        """
+        while self.is_busy():
+            if self._stop.wait(BUSY_POLL_S):
+                return False
+        with self._lock:
+            now = monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval_s
+        if slot > now and self._stop.wait(slot - now):
+            return False
+        return not self._stop.is_set()
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        fresh = {'phase': PHASE_ALBUMS, 'offset': 0, 'playlists': []}
+        try:
+            with open(self.checkpoint_path, 'r') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('phase') in (PHASE_ALBUMS, PHASE_PLAYLISTS, PHASE_PLAYLIST_ITEMS):
+                fresh.update(phase=checkpoint['phase'], offset=int(checkpoint.get('offset', 0)),
+                             playlists=[str(p) for p in checkpoint.get('playlists', [])])
+                logger.info(f"Resuming library precompute from {self.checkpoint_path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.warning(f"Could not read library checkpoint {self.checkpoint_path}: {e}")
+        return fresh
+
+    def _save_checkpoint(self) -> None:
+        try:
+            write_json(self.checkpoint_path, self._checkpoint)
+        except OSError as e:
+            logger.warning(f"Could not write library checkpoint {self.checkpoint_path}: {e}")
+
+    def _remove_checkpoint(self) -> None:
+        try:
+            os.unlink(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove library checkpoint {self.checkpoint_path}: {e}")
@@ -0,0 +1,143 @@
+"""
+Asynchronous, rotating log pipeline
+
+Log records are handed to a queue on the calling thread and written to the
+console and a size-rotated file by a background listener thread, so the
+sync loop never blocks on disk I/O.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Suppress repeated identical messages per logger
+
+    At most `burst` copies of the same message from the same logger pass
+    within `interval` seconds. When the next copy passes after the window
+    rolls over, it is annotated with the number of suppressed copies.
+    Warnings and above are never suppressed.
+    """
+
+    def __init__(self, interval: float = 60.0, burst: int = 5, max_keys: int = 1024):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.max_keys = max_keys
+        # (logger, message) -> [window_start, passed, suppressed]
+        self._windows: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        key = (record.name, record.getMessage())
+        now = monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                if len(self._windows) >= self.max_keys:
+                    self._windows.clear()
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.getMessage()} (suppressed {suppressed} similar messages)"
+                    record.args = None
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(log_path: Optional[str] = None, level: Optional[str] = None,
+                      json_format: Optional[bool] = None, max_bytes: Optional[int] = None,
+                      backup_count: Optional[int] = None,
+                      rate_limit_interval: Optional[float] = None) -> None:
+    """
+    Route all logging through a background queue listener
+
+    Unset arguments come from the environment: LOG_PATH, LOG_LEVEL,
+    LOG_FORMAT ('text' or 'json'), LOG_MAX_BYTES, LOG_BACKUP_COUNT and
+    LOG_RATE_LIMIT (seconds, 0 disables). Calling this again is a no-op.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        log_path = log_path or os.environ.get('LOG_PATH', 'spotifytowled.log')
+        level = level or os.environ.get('LOG_LEVEL', 'INFO')
+        if json_format is None:
+            json_format = os.environ.get('LOG_FORMAT', 'text').lower() == 'json'
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('LOG_MAX_BYTES', 5 * 1024 * 1024))
+        if backup_count is None:
+            backup_count = int(os.environ.get('LOG_BACKUP_COUNT', 3))
+        if rate_limit_interval is None:
+            rate_limit_interval = float(os.environ.get('LOG_RATE_LIMIT', 60))
+
+        formatter = JsonFormatter() if json_format else logging.Formatter(DEFAULT_FORMAT)
+        handlers = [logging.StreamHandler()]
+        try:
+            handlers.append(logging.handlers.RotatingFileHandler(
+                log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+            ))
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Cannot open log file {log_path}: {e}")
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        if rate_limit_interval > 0:
+            queue_handler.addFilter(RateLimitFilter(interval=rate_limit_interval))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush pending records and stop the background writer"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,97 @@
+"""
+Immutable status snapshots published by the sync engine
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+
+# Distinguishes snapshot versions of this engine from those of a previous run
+_BOOT_ID = os.urandom(4).hex()
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts/lists into read-only equivalents"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Convert frozen values back into plain dicts/lists"""
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class StatusSnapshot:
+    """
+    Point-in-time view of the sync engine state
+
+    Snapshots are never mutated after creation. The engine builds a new one
+    whenever its state changes and swaps the reference in a single
+    assignment, so readers never need a lock and never see a half-updated
+    state. The JSON representation is serialized once at creation.
+    """
+    version: int = 0
+    is_running: bool = False
+    current_color: Tuple[int, int, int] = (0, 0, 0)
+    current_album_image_url: str = ""
+    current_track: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+    color_extraction_method: str = 'vibrant'
+    color_history: Tuple[Mapping[str, Any], ...] = ()
+    spotify_authenticated: bool = False
+    instance_id: str = _BOOT_ID
+    json_bytes: bytes = field(default=b"", compare=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, 'current_color', tuple(self.current_color))
+        object.__setattr__(self, 'current_track', _freeze(self.current_track))
+        object.__setattr__(self, 'color_history', _freeze(self.color_history))
+        object.__setattr__(self, 'json_bytes', json.dumps(self.to_dict()).encode('utf-8'))
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'StatusSnapshot':
+        """Rebuild a snapshot from its to_dict()/JSON representation"""
+        return cls(
+            version=data.get('version', 0),
+            is_running=data.get('is_running', False),
+            current_color=tuple(data.get('current_color', (0, 0, 0))),
+            current_album_image_url=data.get('current_album_image_url', ''),
+            current_track=data.get('current_track', {}),
+            color_extraction_method=data.get('color_extraction_method', 'vibrant'),
+            color_history=data.get('color_history', ()),
+            spotify_authenticated=data.get('spotify_authenticated', False),
+            instance_id=data.get('instance_id', _BOOT_ID)
+        )
+
+    @property
+    def current_color_hex(self) -> str:
+        """Current color as hex string"""
+        return "#{:02X}{:02X}{:02X}".format(*self.current_color)
+
+    @property
+    def etag(self) -> str:
+        """HTTP entity tag identifying this snapshot"""
+        return f'"{self.instance_id}-{self.version}"'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get a plain (mutable) dict copy of the snapshot"""
+        return {
+            'version': self.version,
+            'is_running': self.is_running,
+            'current_color': list(self.current_color),
+            'current_color_hex': self.current_color_hex,
+            'current_album_image_url': self.current_album_image_url,
+            'current_track': _thaw(self.current_track),
+            'color_extraction_method': self.color_extraction_method,
+            'color_history': _thaw(self.color_history),
+            'spotify_authenticated': self.spotify_authenticated,
+            'instance_id': self.instance_id
+        }
@@ -1,55 +1,178 @@
 """
 Main sync engine that orchestrates Spotify to WLED synchronization
 """
+import json
 import threading
 import logging
-from time import sleep
-from typing import Optional, Dict, Tuple
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from app.core.config import config
+from app.core.beat_sync import BeatScheduler, build_timeline
+from app.core.color_store import ColorStore
+from app.core.config import Config, get_config
+from app.core.deadline import (
+    Deadline, DeadlineStats, STAGE_DEVICES, STAGE_EFFECTS, STAGE_EXTRACTION, STAGE_SPOTIFY
+)
+from app.core.device_groups import GroupCoordinator, parse_groups
+from app.core.engine_state import EngineState, MAX_SAVED_COLORS, load_state, save_state
+from app.core.history import HistoryStore
+from app.core.library_job import LibraryPrecomputeJob
+from app.core.status import StatusSnapshot
+from app.utils.sacn import SACNSender
+from app.utils.spotify_client import RateLimitedError
 from app.utils.spotify_manager import SpotifyManager
+from app.utils.calibration import ColorCalibration, compile_calibrations
 from app.utils.color_extractor import ColorExtractor
+from app.utils.ddp import DDPSender
+from app.utils.device_queue import DeviceQueue
+from app.utils.device_registry import (
+    DeviceRegistry, PROTOCOL_CUSTOM_PALETTES, PROTOCOL_DDP, PROTOCOL_WEBSOCKET
+)
+from app.utils.mqtt_sink import MQTTSink
+from app.utils.palettes import (
+    MAX_STOPS, PaletteCache, build_palette, palette_document, palette_id, palette_key
+)
+from app.utils.pixel_mapper import PixelMapper
+from app.utils.resolver import HostResolver
+from app.utils.playback_clock import PlaybackClock, EVENT_SEEK, EVENT_SKIP
 from app.utils.wled_controller import WLEDController
+from app.utils.wled_realtime import WLEDRealtimeSender
+from app.utils.wled_state import WLEDStateMirror
 
 logger = logging.getLogger(__name__)
 
+# Shortest cover download timeout, even when the deadline has passed
+MIN_DOWNLOAD_TIMEOUT = 0.5
+
 
 class SyncEngine:
     """
     Orchestrates the synchronization between Spotify and WLED devices
     """
     
-    def __init__(self):
+    def __init__(self, config: Optional[Config] = None):
+        self.config = config or get_config()
         self.spotify_manager: Optional[SpotifyManager] = None
-        self.color_extractor = ColorExtractor(cache_duration=config.get("CACHE_DURATION", 5))
+        self.color_extractor = ColorExtractor(
+            cache_duration=self.config.get("CACHE_DURATION", 5),
+            processes=self.config.get("EXTRACTION_PROCESSES", 2)
+        )
+        # Device hostnames are resolved up front, never on the push path
+        self.resolver = HostResolver()
         self.wled_controller = WLEDController(
-            max_retries=config.get("MAX_RETRIES", 3),
-            retry_delay=config.get("RETRY_DELAY", 2)
+            max_retries=self.config.get("MAX_RETRIES", 3),
+            retry_delay=self.config.get("RETRY_DELAY", 2),
+            resolver=self.resolver
+        )
+        # Capabilities are queried once per device and kept across restarts
+        self.device_registry = DeviceRegistry(
+            self.config.get("DEVICE_CACHE_PATH") or os.path.join(
+                os.path.dirname(os.path.abspath(self.config.config_path)), 'devices.json'
+            ),
+            fetch=self.wled_controller.get_state_info
         )
+        # Each device gets its own worker, so a slow one never delays the rest
+        self.device_queue = DeviceQueue()
+        # Live device state (WLED_WEBSOCKET); pauses syncing while all are off
+        self.device_mirror = WLEDStateMirror(resolve=self.resolver.resolve)
+        self.device_mirror.add_listener(self._on_device_change)
+        self._wake = threading.Event()
+        self._devices_off = False
+        # DEVICE_GROUPS: push to leaders only, WLED's UDP sync relays to followers
+        self.device_groups = GroupCoordinator(self.wled_controller.set_sync, self.device_mirror)
         
         self.is_running = False
         self.current_color: Tuple[int, int, int] = (0, 0, 0)
         self.current_album_image_url = ""
         self.current_track_info: Dict[str, str] = {}
-        self.color_history: list = []  # Store last 10 colors
-        self.max_history = 10
+        self.max_history = 10  # Entries shown on the dashboard
+        self.history = HistoryStore(
+            db_path=self.config.get("HISTORY_DB_PATH") or os.path.join(
+                os.path.dirname(os.path.abspath(self.config.config_path)), 'history.db'
+            ),
+            capacity=max(self.max_history, self.config.get("HISTORY_MEMORY_SIZE", 100)),
+            retention_days=self.config.get("HISTORY_RETENTION_DAYS", 365)
+        )
         
         self._thread: Optional[threading.Thread] = None
         self._color_extraction_method = 'vibrant'
+        
+        # Readers only ever dereference self._status; writers serialize here
+        self._status_lock = threading.Lock()
+        self._status = StatusSnapshot()
+        self._status_listeners: List[Callable[[StatusSnapshot], None]] = []
+        
+        # Beat sync (LIGHTING_MODE == 'beat')
+        self.beat_scheduler = BeatScheduler(sinks=[self._send_beat_frame])
+        self._realtime_sender: Optional[WLEDRealtimeSender] = None
+        self._realtime_devices: Dict[str, int] = {}
+        
+        # DEVICE_CALIBRATION compiled into lookup tables, once per change
+        self._calibrations: Dict[str, ColorCalibration] = {}
+        self._calibration_settings: Optional[str] = None
+        
+        # sACN output (E131_ENABLED), recreated when its settings change;
+        # the sync and beat threads both send, so swaps happen under the lock
+        self._sacn_sender: Optional[SACNSender] = None
+        self._sacn_settings: Optional[str] = None
+        self._sacn_lock = threading.RLock()
+        
+        # Broker connection for MQTT device groups (MQTT_HOST), one per settings
+        self._mqtt_sink: Optional[MQTTSink] = None
+        self._mqtt_settings: Optional[str] = None
+        
+        # Album art streamed across the strips (LIGHTING_MODE == 'pixels')
+        self.pixel_mapper = PixelMapper()
+        self._ddp_sender: Optional[DDPSender] = None
+        
+        # Album palettes on the devices' custom palette slots (LIGHTING_MODE == 'palette')
+        self._palette_cache: Optional[PaletteCache] = None
+        self._palette_settings: Optional[str] = None
+        self._palette_devices: List[str] = []
+        
+        # Extrapolates the playback position between polls
+        self.playback_clock = PlaybackClock()
+        
+        # Every iteration gets SYNC_DEADLINE seconds end to end
+        self.deadline_stats = DeadlineStats()
+        
+        # Last color, track and cover colors, restored on start
+        self._state_path = self.config.get("STATE_PATH") or os.path.join(
+            os.path.dirname(os.path.abspath(self.config.config_path)), 'state.json'
+        )
+        self.warm_start: Dict[str, Any] = {}
+        # False while current_color is only restored, not yet sent this run
+        self._color_applied = True
+        
+        # Cover colors for every method, filled by live extractions and the library job
+        config_dir = os.path.dirname(os.path.abspath(self.config.config_path))
+        self.color_store = ColorStore(
+            self.config.get("COLOR_STORE_PATH") or os.path.join(config_dir, 'colors.db')
+        )
+        self.library_job: Optional[LibraryPrecomputeJob] = None
+        self._library_checkpoint_path = os.path.join(config_dir, 'library_job.json')
+        self._track_changed_at = 0.0
     
     def initialize_spotify(self) -> bool:
         """Initialize Spotify manager with current config"""
         try:
+            if self.spotify_manager:
+                self.spotify_manager.close()
             self.spotify_manager = SpotifyManager(
-                client_id=config.get("SPOTIFY_CLIENT_ID"),
-                client_secret=config.get("SPOTIFY_CLIENT_SECRET"),
-                redirect_uri=config.get("SPOTIFY_REDIRECT_URI"),
-                scope=config.get("SPOTIFY_SCOPE")
+                client_id=self.config.get("SPOTIFY_CLIENT_ID"),
+                client_secret=self.config.get("SPOTIFY_CLIENT_SECRET"),
+                redirect_uri=self.config.get("SPOTIFY_REDIRECT_URI"),
+                scope=self.config.get("SPOTIFY_SCOPE"),
+                requests_per_minute=self.config.get("SPOTIFY_REQUESTS_PER_MINUTE", 60)
             )
             return self.spotify_manager.authenticate()
         except Exception as e:
             logger.error(f"Failed to initialize Spotify: {e}")
             return False
+        finally:
+            self._publish_status()
     
     def get_spotify_auth_url(self) -> Optional[str]:
         """
@@ -62,10 +185,11 @@ class SyncEngine:
             if not self.spotify_manager:
                 # Initialize spotify manager if not already done
                 self.spotify_manager = SpotifyManager(
-                    client_id=config.get("SPOTIFY_CLIENT_ID"),
-                    client_secret=config.get("SPOTIFY_CLIENT_SECRET"),
-                    redirect_uri=config.get("SPOTIFY_REDIRECT_URI"),
-                    scope=config.get("SPOTIFY_SCOPE")
+                    client_id=self.config.get("SPOTIFY_CLIENT_ID"),
+                    client_secret=self.config.get("SPOTIFY_CLIENT_SECRET"),
+                    redirect_uri=self.config.get("SPOTIFY_REDIRECT_URI"),
+                    scope=self.config.get("SPOTIFY_SCOPE"),
+                    requests_per_minute=self.config.get("SPOTIFY_REQUESTS_PER_MINUTE", 60)
                 )
                 # Initialize auth manager
                 self.spotify_manager.authenticate()
@@ -94,6 +218,8 @@ class SyncEngine:
         except Exception as e:
             logger.error(f"Failed to handle callback: {e}")
             return False
+        finally:
+            self._publish_status()
     
     def start(self) -> bool:
         """
@@ -107,26 +233,104 @@ class SyncEngine:
             return False
         
         # Validate configuration
-        is_valid, errors = config.validate()
+        is_valid, errors = self.config.validate()
         if not is_valid:
             logger.error(f"Invalid configuration: {', '.join(errors)}")
             return False
         
-        # Initialize Spotify
-        if not self.initialize_spotify():
+        started = monotonic()
+        state = self._restore_state()
+        
+        # Spotify auth and device warm-up (name lookups, profiles) run side by side
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='warm-start') as pool:
+            devices_warm = pool.submit(self._warm_devices)
+            spotify_ok = self.initialize_spotify()
+            devices_warm.result()
+        if not spotify_ok:
             logger.error("Failed to initialize Spotify connection")
             return False
         
+        self.history.open()
+        self._watch_devices()
         self.is_running = True
+        reapplied = self._reapply_last_color(state)
+        self._publish_status()
         self._thread = threading.Thread(target=self._sync_loop, daemon=True)
         self._thread.start()
-        logger.info("🎵 Sync engine started")
+        
+        ready_ms = (monotonic() - started) * 1000
+        self.warm_start = {'ready_ms': round(ready_ms), 'restored': state is not None, 'reapplied': reapplied}
+        logger.info(f"🎵 Sync engine started, ready in {ready_ms:.0f} ms"
+                    f"{' (last color re-applied)' if reapplied else ''}")
+        return True
+    
+    def _restore_state(self) -> Optional[EngineState]:
+        """Last color, track and cover colors saved by the previous run"""
+        state = load_state(self._state_path)
+        if state is None:
+            return None
+        self.color_extractor.restore_colors(state.colors)
+        self.current_color = state.color
+        self._color_applied = False
+        self.current_track_info = state.track_info
+        self.current_album_image_url = state.album_image_url
+        logger.info(f"Restored last state: RGB{state.color} from '{state.track_info.get('name', '?')}'")
+        return state
+    
+    def _save_state(self) -> None:
+        save_state(self._state_path, EngineState(
+            color=self.current_color,
+            track_info=dict(self.current_track_info),
+            album_image_url=self.current_album_image_url,
+            colors=self.color_extractor.get_cached_colors(MAX_SAVED_COLORS)
+        ))
+    
+    def _warm_devices(self) -> None:
+        """Resolve hostnames, then load every device profile, concurrently"""
+        wled_ips = self.config.get("WLED_IPS", [])
+        self.resolver.prefetch(wled_ips)
+        if wled_ips:
+            with ThreadPoolExecutor(max_workers=min(8, len(wled_ips)), thread_name_prefix='warm-device') as pool:
+                list(pool.map(self.device_registry.get, wled_ips))
+    
+    def _reapply_last_color(self, state: Optional[EngineState]) -> bool:
+        """
+        Push the restored color right away if its track is still playing
+        
+        In static mode the track then counts as handled, so the loop does
+        not extract its color again.
+        """
+        if state is None or not state.track_id or state.color == (0, 0, 0):
+            return False
+        try:
+            track = self.spotify_manager.get_current_track()
+        except Exception as e:
+            logger.warning(f"Could not check playback for warm start: {e}")
+            return False
+        if not track or (track.get('item') or {}).get('id') != state.track_id:
+            return False
+        
+        if self.config.get("LIGHTING_MODE", "static") == "static":
+            self.spotify_manager.is_track_changed(track)
+        self._push_to_devices(state.color)
         return True
     
     def stop(self) -> None:
-        """Stop the sync loop"""
+        """Stop the sync loop and the library precompute (which resumes later)"""
+        self.stop_library_job()
+        self.color_extractor.close()
         if self.is_running:
             self.is_running = False
+            self._wake.set()
+            self.device_mirror.stop()
+            self.beat_scheduler.stop()
+            self._close_sacn()
+            self._close_mqtt()
+            if self._ddp_sender:
+                self._ddp_sender.clear()
+            if self.current_track_info:
+                self._save_state()
+            self._publish_status()
             logger.info("🛑 Sync engine stopped")
     
     def set_color_extraction_method(self, method: str) -> bool:
@@ -142,6 +346,7 @@ class SyncEngine:
         valid_methods = ['vibrant', 'dominant', 'average']
         if method in valid_methods:
             self._color_extraction_method = method
+            self._publish_status()
             logger.info(f"Color extraction method set to: {method}")
             return True
         return False
@@ -152,85 +357,656 @@ class SyncEngine:
         
         while self.is_running:
             try:
+                # Nobody is watching: don't spend Spotify API calls
+                if self._watch_devices():
+                    if not self._devices_off:
+                        logger.info("💤 All WLED devices are off, pausing Spotify polling")
+                        self._devices_off = True
+                    self._wake.wait(self.config.get("REFRESH_INTERVAL", 30))
+                    self._wake.clear()
+                    continue
+                if self._devices_off:
+                    logger.info("WLED device switched on, resuming Spotify polling")
+                    self._devices_off = False
+                
+                # A color that lands long after the track started is useless
+                deadline = self.deadline_stats.start(self.config.get("SYNC_DEADLINE", 5.0))
+                
                 # Get current track
+                requested_at = monotonic()
                 track = self.spotify_manager.get_current_track()
+                deadline.check(STAGE_SPOTIFY)
+                clock_event = self.playback_clock.update(track, requested_at, monotonic())
+                if clock_event in (EVENT_SEEK, EVENT_SKIP):
+                    logger.debug(f"Playback clock detected {clock_event} "
+                                 f"(drift {self.playback_clock.last_drift_s:+.2f}s)")
                 
                 if not track:
                     logger.debug("No track playing, waiting...")
-                    sleep(config.get("REFRESH_INTERVAL", 30))
-                    continue
-                
-                # Check if track changed
-                if self.spotify_manager.is_track_changed(track):
-                    logger.info("🎵 New track detected")
-                    
-                    # Extract track info
-                    self.current_track_info = self.spotify_manager.get_track_info(track)
-                    logger.info(f"Now playing: {self.current_track_info['name']} "
-                              f"by {self.current_track_info['artist']}")
-                    
-                    # Get album cover URL
-                    image_url = self.spotify_manager.get_album_image_url(track)
-                    if not image_url:
-                        logger.warning("No album cover available")
-                        sleep(config.get("REFRESH_INTERVAL", 30))
-                        continue
-                    
-                    self.current_album_image_url = image_url
-                    
-                    # Extract color
-                    color = self.color_extractor.get_color(
-                        image_url, 
-                        method=self._color_extraction_method
-                    )
-                    
-                    if color != self.current_color:
-                        self.current_color = color
-                        
-                        # Add to history
-                        self._add_to_history(color, self.current_track_info)
-                        
-                        # Update WLED devices
-                        wled_ips = config.get("WLED_IPS", [])
-                        results = self.wled_controller.set_color_all(wled_ips, *color)
-                        
-                        # Log results
-                        success_count = sum(1 for v in results.values() if v)
-                        logger.info(f"✓ Updated {success_count}/{len(wled_ips)} WLED devices")
+                elif self.spotify_manager.is_track_changed(track):
+                    self._handle_track_change(track, deadline)
                 
-                # Wait before next iteration
-                sleep(config.get("REFRESH_INTERVAL", 30))
+                # Wait before next iteration; the playback clock asks for an
+                # earlier poll when the track ends or its confidence drops,
+                # and a later one while it is sure of the position
+                sleep(self.playback_clock.next_poll_in(
+                    self.config.get("REFRESH_INTERVAL", 30),
+                    max_interval=self.config.get("MAX_POLL_INTERVAL", 60)
+                ))
                 
+            except RateLimitedError as e:
+                # Back off for as long as Spotify asks instead of polling on
+                logger.warning(f"Spotify rate limited: {e}, retrying in {e.retry_after:.0f}s")
+                sleep(max(e.retry_after, 1))
             except Exception as e:
                 logger.error(f"Error in sync loop: {e}", exc_info=True)
-                sleep(config.get("REFRESH_INTERVAL", 30))
+                sleep(self.config.get("REFRESH_INTERVAL", 30))
         
         logger.info("Sync loop ended")
     
+    def _handle_track_change(self, track: Dict, deadline: Deadline) -> None:
+        """Light up a newly detected track, within the iteration's deadline"""
+        logger.info("🎵 New track detected")
+        self._track_changed_at = monotonic()
+        # The timeline belongs to the previous track, even if
+        # this one ends up without a cover or color
+        if self.beat_scheduler.is_playing:
+            self.beat_scheduler.stop()
+        
+        # Extract track info
+        self.current_track_info = self.spotify_manager.get_track_info(track)
+        logger.info(f"Now playing: {self.current_track_info['name']} "
+                  f"by {self.current_track_info['artist']}")
+        
+        # Get album cover URL
+        image_url = self.spotify_manager.get_album_image_url(track)
+        if not image_url:
+            logger.warning("No album cover available")
+            deadline.check(STAGE_EXTRACTION)
+            return
+        
+        self.current_album_image_url = image_url
+        self._publish_status()
+        
+        # Extract color
+        color = self._extract_color(image_url, deadline)
+        if color is None:
+            logger.warning("No color for this track, keeping the current lights")
+            return
+        
+        if color != self.current_color or not self._color_applied:
+            self.current_color = color
+            
+            # Add to history
+            self._add_to_history(color, self.current_track_info)
+            self._publish_status()
+            
+            # Update WLED devices
+            self._push_to_devices(color, deadline)
+        # A restart continues from here
+        self._save_state()
+        
+        lighting_mode = self.config.get("LIGHTING_MODE", "static")
+        if lighting_mode == "beat":
+            self._start_beat_sync(self.current_track_info.get('id', ''), color)
+        
+        # The solid color above stays as the fallback once the stream ends
+        # or if the cover cannot be fetched in time
+        download_timeout = self._download_timeout(deadline)
+        if lighting_mode == "pixels":
+            self._send_pixels(image_url, download_timeout)
+        elif self._ddp_sender:
+            self._ddp_sender.clear()
+        if lighting_mode == "palette":
+            self._send_palettes(image_url, download_timeout)
+        elif self._palette_devices:
+            self._reset_palette_effect()
+        deadline.check(STAGE_EFFECTS)
+    
+    def _push_to_devices(self, color: Tuple[int, int, int], deadline: Optional[Deadline] = None) -> None:
+        """Send a solid color over sACN, or queue it for every device that is on"""
+        self._color_applied = True
+        sent = self._send_sacn(color)
+        if sent is not None:
+            logger.info(f"✓ Sent color to {sent} sACN universes")
+            return
+        
+        # Latest color wins: one still waiting for a slow
+        # device is replaced instead of queued behind
+        wled_ips = self.config.get("WLED_IPS", [])
+        targets = [ip for ip in wled_ips if self.device_mirror.is_on(ip) is not False]
+        direct = self._plan_group_push(targets, color)
+        finish_by = None
+        if deadline is not None:
+            finish_by = monotonic() + deadline.budget(self.config.get("DEVICE_BUDGET", 3.0))
+        for ip in direct:
+            self.device_queue.submit(ip, 'color', self._push_color, ip, color, deadline, finish_by)
+        logger.info(f"✓ Queued color for {len(direct)}/{len(wled_ips)} WLED devices "
+                    f"({len(targets) - len(direct)} via group sync or MQTT, "
+                    f"{len(wled_ips) - len(targets)} switched off)")
+    
+    def _download_timeout(self, deadline: Deadline) -> float:
+        """Cover download timeout within the extraction budget"""
+        return max(MIN_DOWNLOAD_TIMEOUT, deadline.budget(self.config.get("EXTRACTION_BUDGET", 2.0)))
+    
+    def _extract_color(self, image_url: str, deadline: Deadline) -> Optional[Tuple[int, int, int]]:
+        """
+        Color of the album cover, within the extraction budget
+        
+        Falls back to the color last extracted from this cover, then to the
+        previous album's color, when the download fails or no time is left.
+        
+        Returns:
+            The color, or None if there is neither a color nor a fallback
+        """
+        stored = self.color_store.get(image_url, self._color_extraction_method)
+        if stored is not None:
+            deadline.check(STAGE_EXTRACTION)
+            return stored
+        
+        fallback = self.color_extractor.get_cached_color(image_url)
+        if fallback is None and self.current_color != (0, 0, 0):
+            fallback = self.current_color
+        
+        color = None
+        if deadline.budget(self.config.get("EXTRACTION_BUDGET", 2.0)) > 0 or fallback is None:
+            color = self.color_extractor.get_color(
+                image_url,
+                method=self._color_extraction_method,
+                timeout=self._download_timeout(deadline),
+                default=None
+            )
+        deadline.check(STAGE_EXTRACTION)
+        if color is None and fallback is not None:
+            logger.warning(f"Color extraction ran out of time or failed, using RGB{fallback}")
+            self.deadline_stats.record_fallback(STAGE_EXTRACTION)
+            return fallback
+        if color is not None:
+            self.color_store.put(image_url, {self._color_extraction_method: color})
+        return color
+    
+    def start_library_job(self) -> bool:
+        """
+        Start (or resume) precomputing colors for the saved albums and playlists
+        
+        Needs "user-library-read playlist-read-private" in SPOTIFY_SCOPE.
+        
+        Returns:
+            True if started, False if already running or Spotify is unavailable
+        """
+        if self.library_job and self.library_job.is_running:
+            logger.warning("Library precompute is already running")
+            return False
+        if not (self.spotify_manager and self.spotify_manager.is_authenticated) \
+                and not self.initialize_spotify():
+            logger.error("Library precompute needs a Spotify connection")
+            return False
+        
+        self.library_job = LibraryPrecomputeJob(
+            self.spotify_manager,
+            self.color_extractor,
+            self.color_store,
+            checkpoint_path=self._library_checkpoint_path,
+            workers=self.config.get("LIBRARY_JOB_WORKERS", 2),
+            covers_per_minute=self.config.get("LIBRARY_JOB_COVERS_PER_MINUTE", 60),
+            is_busy=self._is_handling_track_change
+        )
+        return self.library_job.start()
+    
+    def stop_library_job(self) -> None:
+        """Stop the library precompute; the next start resumes it"""
+        if self.library_job:
+            self.library_job.stop()
+    
+    def get_library_job_status(self) -> Dict[str, Any]:
+        """Progress and throughput of the library precompute"""
+        if self.library_job is None:
+            return {'state': 'idle'}
+        return self.library_job.get_status()
+    
+    def _is_handling_track_change(self) -> bool:
+        """True for one sync deadline after a track change, so background work yields"""
+        return monotonic() - self._track_changed_at < self.config.get("SYNC_DEADLINE", 5.0)
+    
+    def _start_beat_sync(self, track_id: str, color: Tuple[int, int, int]) -> None:
+        """Build the beat timeline for a new track and start playing it"""
+        analysis = self.spotify_manager.get_audio_analysis(track_id)
+        if not analysis:
+            logger.warning("No audio analysis available, falling back to static color")
+            self.beat_scheduler.stop()
+            return
+        
+        # The sACN mapping already knows every LED; no per-device lookups
+        if not self.config.get("E131_ENABLED", False):
+            self._realtime_devices = self._get_led_counts()
+        
+        if self._realtime_sender is None:
+            self._realtime_sender = WLEDRealtimeSender()
+        
+        timeline = build_timeline(analysis, color, fps=self.config.get("BEAT_SYNC_FPS", 40))
+        self.beat_scheduler.play(timeline, self.playback_clock.position)
+        logger.info(f"🥁 Beat sync active ({len(timeline.frames)} frames)")
+    
+    def _watch_devices(self) -> bool:
+        """
+        Keep the device mirror in line with the config
+        
+        Returns:
+            True if every configured device is known to be switched off
+        """
+        wled_ips = self.config.get("WLED_IPS", [])
+        if not self.config.get("WLED_WEBSOCKET", True):
+            self.device_mirror.stop()
+            return False
+        # Devices known to have the WebSocket disabled are not worth reconnecting to
+        self.device_mirror.watch([
+            ip for ip in wled_ips
+            if (self.device_registry.peek(ip) is None
+                or self.device_registry.peek(ip).supports(PROTOCOL_WEBSOCKET))
+        ])
+        return self.device_mirror.all_off(wled_ips)
+    
+    def _on_device_change(self, ip: str) -> None:
+        """Device mirror listener: resume and resync devices that come back on"""
+        # Reconnects and firmware updates refresh the profile for free;
+        # group subscriptions are checked again as well
+        self.device_groups.forget(ip)
+        info = self.device_mirror.get_info(ip)
+        if info:
+            self.device_registry.observe(ip, info, self.device_mirror.get_state(ip))
+        
+        if not self.is_running or not self.device_mirror.is_on(ip):
+            return
+        self._wake.set()
+        # The device may have been skipped while it was off
+        if ip in self.config.get("WLED_IPS", []) and not self.config.get("E131_ENABLED", False) \
+                and self.current_color != (0, 0, 0):
+            self.device_queue.submit(ip, 'color', self._push_color, ip, self.current_color)
+    
+    def _plan_group_push(self, ips: List[str], color: Tuple[int, int, int]) -> List[str]:
+        """
+        Devices that need a direct color push
+        
+        MQTT group members get the color published through the broker and
+        followers that track their group leader are left out. Subscription
+        commands for leaders/followers are queued ahead of the color.
+        """
+        try:
+            self.device_groups.configure(parse_groups(self.config.get("DEVICE_GROUPS", [])))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid DEVICE_GROUPS, pushing to every device: {e}")
+            self.device_groups.configure([])
+        
+        mqtt_sink = self._get_mqtt_sink()
+        if mqtt_sink:
+            ips, routes = self.device_groups.route_mqtt(ips)
+            calibrations = self._get_calibrations()
+            for topic, ip in routes:
+                # Group topics reach several devices, so only device topics are calibrated
+                calibration = calibrations.get(ip) if ip else None
+                mqtt_sink.publish_color(topic, calibration.apply_color(color) if calibration else color)
+        
+        direct, subscriptions = self.device_groups.plan(ips)
+        for ip, command in subscriptions:
+            self.device_queue.submit(ip, 'sync', command)
+        return direct
+    
+    def _push_color(self, ip: str, color: Tuple[int, int, int],
+                    deadline: Optional[Deadline] = None, finish_by: Optional[float] = None) -> bool:
+        """
+        Device queue command: set a solid color on every segment of a device
+        
+        Retries stop at `finish_by`; a device that is out of time keeps its
+        previous color until the next push.
+        """
+        profile = self.device_registry.get(ip)
+        calibration = self._get_calibrations().get(ip)
+        if calibration:
+            color = calibration.apply_color(color)
+        ok = self.wled_controller.set_color(
+            ip, *color[:3],
+            segment_ids=profile.segment_ids if profile else None,
+            w=color[3] if len(color) > 3 else None,
+            deadline=finish_by
+        )
+        if deadline is not None:
+            deadline.check(STAGE_DEVICES)
+            if not ok and deadline.expired:
+                self.deadline_stats.record_fallback(STAGE_DEVICES)
+        return ok
+    
+    def _get_led_counts(self) -> Dict[str, int]:
+        """LED count of every configured device, from the device registry"""
+        led_counts = {}
+        for ip in self.config.get("WLED_IPS", []):
+            profile = self.device_registry.get(ip)
+            if profile and profile.led_count:
+                led_counts[ip] = profile.led_count
+            else:
+                logger.warning(f"Unknown LED count for WLED @ {ip}, skipping realtime output")
+        return led_counts
+    
+    def _send_pixels(self, image_url: str, timeout: float = 5) -> None:
+        """Stream the album art, resampled per device, over DDP"""
+        source = self.config.get("PIXEL_SOURCE", "art")
+        calibrations = self._get_calibrations()
+        frames = {}
+        rgbw = []
+        for ip, led_count in self._get_led_counts().items():
+            if self.device_mirror.is_on(ip) is False:
+                continue
+            profile = self.device_registry.get(ip)
+            if not profile or not profile.supports(PROTOCOL_DDP):
+                logger.warning(f"WLED @ {ip} firmware has no DDP support, keeping static color")
+                continue
+            frame = self.pixel_mapper.get_frame(image_url, led_count, source, timeout)
+            address = self.resolver.resolve(ip)
+            if not frame or not address:
+                continue
+            calibration = calibrations.get(ip)
+            if calibration:
+                frame = calibration.apply_frame(frame)
+                if calibration.rgbw:
+                    rgbw.append(address)
+            frames[address] = frame
+        if not frames:
+            logger.warning("No pixel frames available, falling back to static color")
+            return
+        
+        if self._ddp_sender is None:
+            self._ddp_sender = DDPSender()
+        self._ddp_sender.send_frame(frames, rgbw=rgbw)
+        logger.info(f"🖼 Streaming album art to {len(frames)} WLED devices")
+    
+    def _send_palettes(self, image_url: str, timeout: float = 5) -> None:
+        """Show the album palette with a palette effect on every device that stores custom palettes"""
+        cache = self._get_palette_cache()
+        if cache is None:
+            return
+        stops = max(2, min(MAX_STOPS, self.config.get("PALETTE_STOPS", MAX_STOPS)))
+        frame = self.pixel_mapper.get_frame(image_url, stops, self.config.get("PIXEL_SOURCE", "art"), timeout)
+        if not frame:
+            logger.warning("No album palette available, keeping static color")
+            return
+        colors = [tuple(frame[i:i + 3]) for i in range(0, len(frame), 3)]
+        calibrations = self._get_calibrations()
+        
+        queued = 0
+        for ip in self.config.get("WLED_IPS", []):
+            if self.device_mirror.is_on(ip) is False:
+                continue
+            profile = self.device_registry.get(ip)
+            if not profile or not profile.supports(PROTOCOL_CUSTOM_PALETTES):
+                logger.warning(f"WLED @ {ip} firmware has no custom palettes, keeping static color")
+                continue
+            calibration = calibrations.get(ip)
+            device_colors = [calibration.apply_rgb(c) for c in colors] if calibration else colors
+            palette = build_palette(device_colors, stops)
+            self.device_queue.submit(ip, 'palette', self._apply_palette, ip, palette)
+            if ip not in self._palette_devices:
+                self._palette_devices.append(ip)
+            queued += 1
+        logger.info(f"🎨 Queued album palette for {queued} WLED devices")
+    
+    def _apply_palette(self, ip: str, palette: List[Tuple[int, Tuple[int, int, int]]]) -> bool:
+        """Device queue command: select a palette, uploading it only if the device lacks it"""
+        cache = self._palette_cache
+        if cache is None:
+            return False
+        key = palette_key(palette)
+        slot, stored = cache.assign(ip, key)
+        if not stored and not self.wled_controller.upload_palette(ip, slot, palette_document(palette)):
+            cache.forget(ip, key)
+            return False
+        profile = self.device_registry.peek(ip)
+        return self.wled_controller.set_palette(
+            ip, palette_id(slot),
+            effect_id=self.config.get("PALETTE_EFFECT", 65),
+            segment_ids=profile.segment_ids if profile else None
+        )
+    
+    def _reset_palette_effect(self) -> None:
+        """Back to a solid color on devices left showing the album palette"""
+        for ip in self._palette_devices:
+            # Replaces a palette still waiting, so it cannot land afterwards
+            self.device_queue.submit(ip, 'palette', self.wled_controller.set_effect, ip, 0)
+        self._palette_devices = []
+    
+    def _get_palette_cache(self) -> Optional[PaletteCache]:
+        """Palette slot cache for the current slot settings"""
+        first_slot = self.config.get("PALETTE_FIRST_SLOT", 0)
+        slots = self.config.get("PALETTE_SLOTS", 4)
+        settings = json.dumps([first_slot, slots])
+        if settings != self._palette_settings:
+            # Unknown slot contents: the next palette of every device is uploaded again
+            self._palette_settings = settings
+            try:
+                self._palette_cache = PaletteCache(first_slot, slots)
+            except ValueError as e:
+                logger.error(f"Invalid palette slots: {e}")
+                self._palette_cache = None
+        return self._palette_cache
+    
+    def _send_beat_frame(self, color: Tuple[int, int, int]) -> None:
+        """Beat scheduler sink: push a frame to all configured devices over UDP"""
+        if self._send_sacn(color) is not None:
+            return
+        if self._realtime_sender is None:
+            return
+        wled_ips = self.config.get("WLED_IPS", [])
+        calibrations = self._get_calibrations()
+        # Devices that end up with the same color share their packets
+        devices_by_color: Dict[Tuple[int, ...], Dict[str, int]] = {}
+        for ip, count in self._realtime_devices.items():
+            address = self.resolver.resolve(ip) if ip in wled_ips else None
+            if address:
+                calibration = calibrations.get(ip)
+                # DRGB carries no white channel; WLED derives it on RGBW strips
+                device_color = calibration.apply_rgb(color) if calibration else color
+                devices_by_color.setdefault(device_color, {})[address] = count
+        for device_color, devices in devices_by_color.items():
+            self._realtime_sender.send_color(devices, device_color)
+    
+    def _get_calibrations(self) -> Dict[str, ColorCalibration]:
+        """Compiled calibration per device, rebuilt only when the config changes"""
+        settings = self.config.get("DEVICE_CALIBRATION", {})
+        signature = json.dumps(settings, sort_keys=True)
+        if signature != self._calibration_settings:
+            self._calibration_settings = signature
+            try:
+                self._calibrations = compile_calibrations(settings)
+            except ValueError as e:
+                logger.error(f"Invalid DEVICE_CALIBRATION, colors are sent uncalibrated: {e}")
+                self._calibrations = {}
+        return self._calibrations
+    
+    def _send_sacn(self, color: Tuple[int, int, int]) -> Optional[int]:
+        """
+        Send a color over sACN
+        
+        Returns:
+            Number of universes sent, or None when sACN is off
+        """
+        with self._sacn_lock:
+            sacn = self._get_sacn_sender()
+            return sacn.send_color(color) if sacn else None
+    
+    def _get_sacn_sender(self) -> Optional[SACNSender]:
+        """sACN sender for the current settings, or None when sACN is off"""
+        with self._sacn_lock:
+            if not self.config.get("E131_ENABLED", False):
+                self._close_sacn()
+                return None
+            
+            outputs = self.config.get("E131_OUTPUTS", [])
+            priority = self.config.get("E131_PRIORITY", 100)
+            settings = json.dumps([outputs, priority], sort_keys=True)
+            if settings != self._sacn_settings:
+                self._close_sacn()
+                self._sacn_settings = settings
+                try:
+                    self._sacn_sender = SACNSender(outputs, priority=priority)
+                except ValueError as e:
+                    logger.error(f"Invalid sACN configuration: {e}")
+            return self._sacn_sender
+    
+    def _close_sacn(self) -> None:
+        with self._sacn_lock:
+            if self._sacn_sender:
+                self._sacn_sender.close()
+            self._sacn_sender = None
+            self._sacn_settings = None
+    
+    def _get_mqtt_sink(self) -> Optional[MQTTSink]:
+        """MQTT sink for the current settings, or None without a broker"""
+        host = self.config.get("MQTT_HOST", "")
+        if not host:
+            self._close_mqtt()
+            return None
+        
+        settings = json.dumps([
+            host, self.config.get("MQTT_PORT", 1883), self.config.get("MQTT_USERNAME", ""),
+            self.config.get("MQTT_PASSWORD", ""), self.config.get("MQTT_QOS", 1),
+            self.config.get("MQTT_RETAIN", False)
+        ])
+        if settings != self._mqtt_settings:
+            self._close_mqtt()
+            self._mqtt_settings = settings
+            try:
+                self._mqtt_sink = MQTTSink(
+                    host,
+                    port=self.config.get("MQTT_PORT", 1883),
+                    qos=self.config.get("MQTT_QOS", 1),
+                    retain=self.config.get("MQTT_RETAIN", False),
+                    username=self.config.get("MQTT_USERNAME", ""),
+                    password=self.config.get("MQTT_PASSWORD", "")
+                )
+            except (ValueError, ImportError) as e:
+                logger.error(f"Invalid MQTT configuration, MQTT groups are pushed over HTTP: {e}")
+        return self._mqtt_sink
+    
+    def _close_mqtt(self) -> None:
+        if self._mqtt_sink:
+            self._mqtt_sink.close()
+        self._mqtt_sink = None
+        self._mqtt_settings = None
+    
+    @property
+    def color_history(self) -> list:
+        """Most recent history entries, newest first"""
+        return self.history.recent(self.max_history)
+    
     def _add_to_history(self, color: Tuple[int, int, int], track_info: Dict) -> None:
-        """Add color to history"""
-        self.color_history.insert(0, {
-            'color': color,
-            'track': track_info.get('name', 'Unknown'),
-            'artist': track_info.get('artist', 'Unknown')
-        })
+        """Add color to history (O(1), persisted in the background)"""
+        self.history.append(color, track_info, method=self._color_extraction_method)
+    
+    def _publish_status(self) -> None:
+        """Build a new immutable status snapshot and swap it in"""
+        with self._status_lock:
+            self._status = StatusSnapshot(
+                version=self._status.version + 1,
+                is_running=self.is_running,
+                current_color=self.current_color,
+                current_album_image_url=self.current_album_image_url,
+                current_track=self.current_track_info,
+                color_extraction_method=self._color_extraction_method,
+                color_history=self.color_history,
+                spotify_authenticated=self.spotify_manager.is_authenticated if self.spotify_manager else False
+            )
+            for listener in self._status_listeners:
+                try:
+                    listener(self._status)
+                except Exception as e:
+                    logger.error(f"Status listener failed: {e}")
+    
+    def add_status_listener(self, listener: Callable[[StatusSnapshot], None]) -> None:
+        """Register a callback invoked with every newly published snapshot"""
+        self._status_listeners.append(listener)
+    
+    def get_status_snapshot(self) -> StatusSnapshot:
+        """
+        Get the latest published status snapshot
         
-        # Keep only last N entries
-        if len(self.color_history) > self.max_history:
-            self.color_history = self.color_history[:self.max_history]
+        The returned object is immutable and safe to share between threads.
+        """
+        return self._status
     
     def get_status(self) -> Dict:
-        """Get current status of sync engine"""
+        """Get current status of sync engine as a plain dict"""
+        return self._status.to_dict()
+    
+    def query_history(self, **filters: Any) -> Dict[str, Any]:
+        """Query persisted color history (see HistoryStore.query)"""
+        return self.history.query(**filters)
+    
+    def check_device_health(self, ip: str) -> bool:
+        """Check if a WLED device is reachable"""
+        online = self.device_mirror.is_online(ip)
+        if online is not None:
+            return online
+        return self.wled_controller.health_check(ip)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics for monitoring"""
+        sacn = self._sacn_sender
+        mqtt_sink = self._mqtt_sink
         return {
-            'is_running': self.is_running,
-            'current_color': self.current_color,
-            'current_album_image_url': self.current_album_image_url,
-            'current_track': self.current_track_info,
-            'color_extraction_method': self._color_extraction_method,
-            'color_history': self.color_history,
-            'spotify_authenticated': self.spotify_manager.is_authenticated if self.spotify_manager else False
+            'spotify_api': self.spotify_manager.api.get_metrics() if self.spotify_manager else None,
+            'beat_sync': self.beat_scheduler.get_stats(),
+            'devices': self.device_queue.get_stats(),
+            'device_state': self.device_mirror.get_snapshot(),
+            'device_profiles': self.device_registry.get_snapshot(),
+            'resolver': self.resolver.get_stats(),
+            'device_groups': {'relayed_pushes': self.device_groups.relayed},
+            'sacn': {
+                'universes': len(sacn.universes),
+                'packets_sent': sacn.packets_sent
+            } if sacn else None,
+            'mqtt': mqtt_sink.get_stats() if mqtt_sink else None,
+            'warm_start': self.warm_start,
+            'library_job': self.get_library_job_status(),
+            'deadlines': self.deadline_stats.get_stats(),
+            'palettes': self._palette_cache.get_stats() if self._palette_cache else None,
+            'pixels': {
+                'frames_sent': self._ddp_sender.frames_sent if self._ddp_sender else 0,
+                'cache_hits': self.pixel_mapper.hits,
+                'cache_misses': self.pixel_mapper.misses
+            }
         }
+    
+    def reload_config(self) -> None:
+        """
+        Notify the engine that the configuration was changed and saved
+        
+        In-process the engine shares the config object with the web routes;
+        remote engines reload it from disk first. New device hostnames are
+        resolved in the background so the next push finds them cached.
+        """
+        self.resolver.prefetch(self.config.get("WLED_IPS", []), wait_for_results=False)
+
+
+_sync_engine: Optional[SyncEngine] = None
+_sync_engine_lock = threading.Lock()
+
+
+def get_sync_engine() -> SyncEngine:
+    """
+    Get the global sync engine instance, creating it on first use
+    
+    When SYNC_WORKER_ADDRESS is set, this is a proxy to the engine running
+    in the separate sync worker process (see app.core.worker).
+    """
+    global _sync_engine
+    if _sync_engine is None:
+        with _sync_engine_lock:
+            if _sync_engine is None:
+                from app.core.worker import create_remote_engine
+                _sync_engine = create_remote_engine() or SyncEngine()
+    return _sync_engine
 
 
-# Global sync engine instance
-sync_engine = SyncEngine()
+def __getattr__(name: str):
+    # Backwards compatible ``from app.core.sync_engine import sync_engine``
+    if name == 'sync_engine':
+        return get_sync_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
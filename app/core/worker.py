@@ -0,0 +1,412 @@
+"""
+Standalone sync worker process for multi-worker WSGI deployments
+
+Run exactly one worker next to any number of web processes:
+
+    python -m app.core.worker
+    SYNC_WORKER_ADDRESS=/tmp/spotifytowled-sync.sock gunicorn -w 4 'app.main:create_app()'
+
+The worker owns the only SyncEngine. Web processes send commands over a
+local multiprocessing connection and read the status snapshot from a shared
+memory segment, so status polling never crosses a socket.
+"""
+import json
+import logging
+import os
+import signal
+import struct
+import threading
+from multiprocessing import resource_tracker
+from multiprocessing.connection import (
+    AuthenticationError, Client, Listener, answer_challenge, deliver_challenge
+)
+from multiprocessing.shared_memory import SharedMemory
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple, Union
+
+from app.core.config import Config, get_config
+from app.core.log_setup import configure_logging
+from app.core.status import StatusSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = '/tmp/spotifytowled-sync.sock'
+DEFAULT_SHM_NAME = 'spotifytowled_status'
+DEFAULT_SHM_SIZE = 1024 * 1024
+
+# seq (odd while writing), payload length, instance (0 once retired)
+_HEADER = struct.Struct('<QIQ')
+
+# Seconds between checks whether a restarted worker replaced the board
+BOARD_RECHECK_S = 5.0
+
+# Seconds a new connection may take to answer the authentication challenge
+HANDSHAKE_TIMEOUT_S = 5.0
+
+# Segments created by this process (see StatusBoard.__init__)
+_owned_segments = set()
+
+# Commands a web process may invoke on the worker's engine
+_COMMANDS = {
+    'start', 'stop', 'set_color_extraction_method', 'get_spotify_auth_url',
+    'handle_spotify_callback', 'query_history', 'check_device_health', 'reload_config',
+    'get_metrics', 'start_library_job', 'stop_library_job', 'get_library_job_status'
+}
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """Parse 'host:port' into a TCP address, anything else is a Unix socket path"""
+    host, sep, port = address.rpartition(':')
+    if sep and host and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def _authkey(config: Config, address: str) -> bytes:
+    """
+    Shared secret of the worker and the web processes
+
+    Raises:
+        ValueError: For a TCP address without SYNC_WORKER_AUTHKEY or SECRET_KEY
+    """
+    key = os.environ.get('SYNC_WORKER_AUTHKEY') or config.get('SECRET_KEY')
+    if not key:
+        if not isinstance(parse_address(address), str):
+            raise ValueError("A TCP SYNC_WORKER_ADDRESS needs SYNC_WORKER_AUTHKEY or SECRET_KEY")
+        # Only local users can reach a Unix socket
+        key = 'spotifytowled'
+    return key.encode('utf-8')
+
+
+class _HandshakeConnection:
+    """Connection whose receives give up after a timeout (for the challenge only)"""
+
+    def __init__(self, conn, timeout: float):
+        self._conn = conn
+        self._timeout = timeout
+
+    def send_bytes(self, buf: bytes) -> None:
+        self._conn.send_bytes(buf)
+
+    def recv_bytes(self, maxlength: Optional[int] = None) -> bytes:
+        if not self._conn.poll(self._timeout):
+            raise AuthenticationError(f"no answer within {self._timeout:.0f}s")
+        return self._conn.recv_bytes(maxlength)
+
+
+class StatusBoard:
+    """
+    Single-writer status snapshot in shared memory
+
+    The writer bumps a sequence number to odd, copies the JSON payload and
+    bumps it back to even (a seqlock). Readers copy the payload and retry if
+    the sequence changed meanwhile, so neither side ever takes a lock.
+
+    Every board carries a random instance id. A writer that closes the
+    board, or a new writer that takes over the name, sets it to 0, which
+    tells readers to attach to the new segment.
+    """
+
+    def __init__(self, name: str = DEFAULT_SHM_NAME, size: int = DEFAULT_SHM_SIZE, create: bool = False):
+        self.name = name
+        self.create = create
+        if create:
+            try:
+                stale = SharedMemory(name=name)
+                self._retire(stale)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = SharedMemory(name=name, create=True, size=size)
+            self.instance = int.from_bytes(os.urandom(8), 'little') or 1
+            _HEADER.pack_into(self._shm.buf, 0, 0, 0, self.instance)
+            _owned_segments.add(name)
+        else:
+            self._shm = SharedMemory(name=name)
+            # Readers must not unlink the segment when they exit
+            if name not in _owned_segments:
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+            self.instance = _HEADER.unpack_from(self._shm.buf, 0)[2]
+        self._seq = 0
+
+    @staticmethod
+    def _retire(shm: SharedMemory) -> None:
+        if shm.size >= _HEADER.size:
+            seq, length, _ = _HEADER.unpack_from(shm.buf, 0)
+            _HEADER.pack_into(shm.buf, 0, seq, length, 0)
+
+    def publish(self, payload: bytes) -> None:
+        """Write a new payload (writer process only)"""
+        capacity = self._shm.size - _HEADER.size
+        if len(payload) > capacity:
+            logger.error(f"Status payload of {len(payload)} bytes exceeds shared memory size")
+            return
+        buf = self._shm.buf
+        self._seq += 1
+        _HEADER.pack_into(buf, 0, self._seq, 0, self.instance)
+        buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+        self._seq += 1
+        _HEADER.pack_into(buf, 0, self._seq, len(payload), self.instance)
+
+    def sequence(self) -> int:
+        """Current sequence number (cheap change detection)"""
+        return _HEADER.unpack_from(self._shm.buf, 0)[0]
+
+    @property
+    def retired(self) -> bool:
+        """Whether the writer closed this board or was replaced"""
+        return _HEADER.unpack_from(self._shm.buf, 0)[2] != self.instance
+
+    def read(self, retries: int = 100) -> Tuple[int, Optional[bytes]]:
+        """Read a consistent (sequence, payload) pair"""
+        buf = self._shm.buf
+        for _ in range(retries):
+            seq, length, _ = _HEADER.unpack_from(buf, 0)
+            if seq % 2:
+                continue
+            payload = bytes(buf[_HEADER.size:_HEADER.size + length])
+            if _HEADER.unpack_from(buf, 0)[0] == seq:
+                return seq, payload if length else None
+        return -1, None
+
+    def close(self) -> None:
+        """Detach (and remove, for the writer) the segment"""
+        if self.create:
+            self._retire(self._shm)
+        self._shm.close()
+        if self.create:
+            self._shm.unlink()
+            _owned_segments.discard(self.name)
+
+
+class SyncWorker:
+    """Serves a SyncEngine to web processes"""
+
+    def __init__(self, engine, address: str, authkey: bytes,
+                 shm_name: str = DEFAULT_SHM_NAME, shm_size: int = DEFAULT_SHM_SIZE):
+        self.engine = engine
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.board = StatusBoard(shm_name, shm_size, create=True)
+        self._listener: Optional[Listener] = None
+        self._stopped = threading.Event()
+
+    def serve_forever(self) -> None:
+        """Accept and handle connections until stop() is called"""
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self.engine.add_status_listener(lambda snapshot: self.board.publish(snapshot.json_bytes))
+        self.board.publish(self.engine.get_status_snapshot().json_bytes)
+
+        # Authentication happens in the connection's thread, so a client that
+        # stalls in the handshake cannot hold up everyone else's commands
+        self._listener = Listener(self.address)
+        logger.info(f"Sync worker listening on {self.address}")
+
+        while not self._stopped.is_set():
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def stop(self) -> None:
+        """Stop serving and shut down the engine"""
+        self._stopped.set()
+        self.engine.stop()
+        if self._listener is not None:
+            self._listener.close()
+        self.board.close()
+
+    def _handle(self, conn) -> None:
+        with conn:
+            try:
+                handshake = _HandshakeConnection(conn, HANDSHAKE_TIMEOUT_S)
+                deliver_challenge(handshake, self.authkey)
+                answer_challenge(handshake, self.authkey)
+            except (AuthenticationError, EOFError, OSError) as e:
+                logger.warning(f"Rejected worker connection: {e}")
+                return
+            while True:
+                try:
+                    command, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                conn.send(self.dispatch(command, args, kwargs))
+
+    def dispatch(self, command: str, args: tuple, kwargs: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Run a command on the engine and return (ok, result_or_error)"""
+        if command not in _COMMANDS:
+            return (False, f"Unknown command: {command}")
+        try:
+            if command == 'reload_config':
+                self.engine.config.load()
+                self.engine.reload_config()
+                return (True, None)
+            return (True, getattr(self.engine, command)(*args, **kwargs))
+        except Exception as e:
+            logger.error(f"Worker command {command} failed: {e}")
+            return (False, str(e))
+
+
+class RemoteSyncEngine:
+    """
+    Web-side stand-in for SyncEngine that talks to a SyncWorker
+
+    Exposes the subset of the SyncEngine interface used by the web routes.
+    """
+
+    def __init__(self, address: str, authkey: bytes, shm_name: str = DEFAULT_SHM_NAME):
+        self.address = parse_address(address)
+        self.authkey = authkey
+        self.shm_name = shm_name
+        self._board: Optional[StatusBoard] = None
+        self._board_checked_at = 0.0
+        self._snapshot = StatusSnapshot()
+        self._seq = -1
+        self._lock = threading.Lock()
+
+    def _call(self, command: str, *args: Any, **kwargs: Any) -> Any:
+        with Client(self.address, authkey=self.authkey) as conn:
+            conn.send((command, args, kwargs))
+            ok, result = conn.recv()
+        if not ok:
+            raise RuntimeError(result)
+        return result
+
+    def _safe_call(self, command: str, default: Any, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return self._call(command, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Sync worker call '{command}' failed: {e}")
+            return default
+
+    def get_status_snapshot(self) -> StatusSnapshot:
+        """Get the latest snapshot published by the worker"""
+        with self._lock:
+            board = self._current_board()
+            if board is None or board.sequence() == self._seq:
+                return self._snapshot
+            seq, payload = board.read()
+            if payload and seq != self._seq:
+                self._snapshot = StatusSnapshot.from_dict(json.loads(payload))
+                self._seq = seq
+        return self._snapshot
+
+    def _current_board(self) -> Optional[StatusBoard]:
+        """
+        The board of the running worker (call with the lock held)
+
+        A restarted worker publishes on a new segment under the same name,
+        while ours keeps the old one mapped. Re-attach when the old board is
+        retired, and every BOARD_RECHECK_S in case the worker died without
+        retiring it.
+        """
+        now = monotonic()
+        board = self._board
+        if board is not None and not board.retired and now - self._board_checked_at < BOARD_RECHECK_S:
+            return board
+        self._board_checked_at = now
+        try:
+            latest = StatusBoard(self.shm_name)
+        except FileNotFoundError:
+            return board
+        if board is not None and latest.instance == board.instance:
+            latest.close()
+            return board
+        if board is not None:
+            board.close()
+            logger.info("Sync worker restarted, attaching to its new status board")
+        self._board = latest
+        self._seq = -1
+        return latest
+
+    def get_status(self) -> Dict:
+        return self.get_status_snapshot().to_dict()
+
+    @property
+    def is_running(self) -> bool:
+        return self.get_status_snapshot().is_running
+
+    def start(self) -> bool:
+        return self._safe_call('start', False)
+
+    def stop(self) -> None:
+        self._safe_call('stop', None)
+
+    def set_color_extraction_method(self, method: str) -> bool:
+        return self._safe_call('set_color_extraction_method', False, method)
+
+    def get_spotify_auth_url(self) -> Optional[str]:
+        return self._safe_call('get_spotify_auth_url', None)
+
+    def handle_spotify_callback(self, code: str) -> bool:
+        return self._safe_call('handle_spotify_callback', False, code)
+
+    def query_history(self, **filters: Any) -> Dict[str, Any]:
+        return self._call('query_history', **filters)
+
+    def check_device_health(self, ip: str) -> bool:
+        return self._safe_call('check_device_health', False, ip)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return self._call('get_metrics')
+
+    def reload_config(self) -> None:
+        self._safe_call('reload_config', None)
+
+    def start_library_job(self) -> bool:
+        return self._safe_call('start_library_job', False)
+
+    def stop_library_job(self) -> None:
+        self._safe_call('stop_library_job', None)
+
+    def get_library_job_status(self) -> Dict[str, Any]:
+        return self._call('get_library_job_status')
+
+
+def create_remote_engine(config: Optional[Config] = None) -> Optional[RemoteSyncEngine]:
+    """Create a RemoteSyncEngine if SYNC_WORKER_ADDRESS is set, else None"""
+    address = os.environ.get('SYNC_WORKER_ADDRESS')
+    if not address:
+        return None
+    return RemoteSyncEngine(
+        address,
+        _authkey(config or get_config(), address),
+        shm_name=os.environ.get('SYNC_STATUS_SHM', DEFAULT_SHM_NAME)
+    )
+
+
+def main() -> None:
+    """Run the sync worker process"""
+    from app.core.sync_engine import SyncEngine
+
+    configure_logging()
+    config = get_config()
+    address = os.environ.get('SYNC_WORKER_ADDRESS', DEFAULT_ADDRESS)
+    try:
+        authkey = _authkey(config, address)
+    except ValueError as e:
+        logger.error(f"Sync worker not started: {e}")
+        raise SystemExit(1)
+    worker = SyncWorker(
+        SyncEngine(config),
+        address=address,
+        authkey=authkey,
+        shm_name=os.environ.get('SYNC_STATUS_SHM', DEFAULT_SHM_NAME)
+    )
+
+    def _shutdown(signum, frame):
+        logger.info("Sync worker shutting down")
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _shutdown)
+    signal.signal(signal.SIGINT, _shutdown)
+
+    worker.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
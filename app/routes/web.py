@@ -1,48 +1,114 @@
 """
 Web routes for the application
 """
-from flask import render_template, request, redirect, url_for, flash, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify, Response
 import logging
 
-from app.core.config import config
-from app.core.sync_engine import sync_engine
-from app.utils.color_extractor import ColorExtractor
+from app.core.config import get_config
+from app.core.sync_engine import get_sync_engine
 
 logger = logging.getLogger(__name__)
 
 
 def register_routes(app):
     """Register all application routes"""
+    config = get_config()
+    sync_engine = get_sync_engine()
     
     @app.route('/')
     def index():
         """Main dashboard page"""
-        status = sync_engine.get_status()
+        status = sync_engine.get_status_snapshot()
         
         return render_template(
             'index.html',
-            is_running=status['is_running'],
-            current_color=status['current_color'],
-            current_color_hex=ColorExtractor.rgb_to_hex(*status['current_color']),
-            current_album_image_url=status.get('current_album_image_url', ''),
-            current_track=status.get('current_track', {}),
-            color_history=status.get('color_history', []),
-            color_method=status.get('color_extraction_method', 'vibrant'),
+            is_running=status.is_running,
+            current_color=status.current_color,
+            current_color_hex=status.current_color_hex,
+            current_album_image_url=status.current_album_image_url,
+            current_track=status.current_track,
+            color_history=status.color_history,
+            color_method=status.color_extraction_method,
             spotify_client_id=config.get('SPOTIFY_CLIENT_ID', ''),
             spotify_client_secret=config.get('SPOTIFY_CLIENT_SECRET', ''),
             spotify_redirect_uri=config.get('SPOTIFY_REDIRECT_URI', 'http://localhost:5000/callback'),
             refresh_interval=config.get('REFRESH_INTERVAL', 30),
             wled_ips=config.get('WLED_IPS', []),
-            spotify_authenticated=status.get('spotify_authenticated', False)
+            spotify_authenticated=status.spotify_authenticated
         )
     
     # API Routes
     @app.route('/api/status')
     def api_status():
-        """Get current status as JSON"""
-        status = sync_engine.get_status()
-        status['current_color_hex'] = ColorExtractor.rgb_to_hex(*status['current_color'])
-        return jsonify(status)
+        """Get current status as JSON (pre-serialized, versioned snapshot)"""
+        status = sync_engine.get_status_snapshot()
+        etag = status.etag
+        
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304, headers={'ETag': etag})
+        
+        return Response(status.json_bytes, mimetype='application/json', headers={'ETag': etag})
+    
+    @app.route('/api/history')
+    def api_history():
+        """Query persisted color history (paginated, filterable)"""
+        try:
+            since = request.args.get('since', type=float)
+            until = request.args.get('until', type=float)
+            result = sync_engine.query_history(
+                page=request.args.get('page', 1, type=int),
+                per_page=request.args.get('per_page', 50, type=int),
+                track_id=request.args.get('track_id', '').strip() or None,
+                artist=request.args.get('artist', '').strip() or None,
+                since=since,
+                until=until
+            )
+            return jsonify(result)
+        except Exception as e:
+            logger.error(f"Error querying history: {e}")
+            return jsonify({'success': False, 'message': 'An error occurred while querying history'}), 500
+    
+    @app.route('/api/metrics')
+    def api_metrics():
+        """Runtime metrics (Spotify request budget, beat sync timing, ...)"""
+        try:
+            return jsonify(sync_engine.get_metrics())
+        except Exception as e:
+            logger.error(f"Error collecting metrics: {e}")
+            return jsonify({'success': False, 'message': 'An error occurred while collecting metrics'}), 500
+    
+    @app.route('/api/library/precompute')
+    def api_library_precompute_status():
+        """Progress of the library color precompute"""
+        try:
+            return jsonify(sync_engine.get_library_job_status())
+        except Exception as e:
+            logger.error(f"Error getting library precompute status: {e}")
+            return jsonify({'success': False, 'message': 'An error occurred while getting the precompute status'}), 500
+    
+    @app.route('/api/library/precompute/start', methods=['POST'])
+    def api_library_precompute_start():
+        """Precompute colors for the saved albums and playlists in the background"""
+        try:
+            if sync_engine.start_library_job():
+                return jsonify({'success': True, 'message': 'Library precompute started'})
+            return jsonify({
+                'success': False,
+                'message': 'Library precompute is already running or Spotify is not connected'
+            }), 400
+        except Exception as e:
+            logger.error(f"Error starting library precompute: {e}")
+            return jsonify({'success': False, 'message': 'An error occurred while starting the precompute'}), 500
+    
+    @app.route('/api/library/precompute/stop', methods=['POST'])
+    def api_library_precompute_stop():
+        """Stop the library precompute; starting it again resumes"""
+        try:
+            sync_engine.stop_library_job()
+            return jsonify({'success': True, 'message': 'Library precompute stopped'})
+        except Exception as e:
+            logger.error(f"Error stopping library precompute: {e}")
+            return jsonify({'success': False, 'message': 'An error occurred while stopping the precompute'}), 500
     
     @app.route('/api/sync/start', methods=['POST'])
     def api_sync_start():
@@ -85,12 +151,12 @@ def register_routes(app):
                 flash('Invalid refresh interval. Please enter a valid number.', 'warning')
                 return redirect(url_for('index'))
             
-            config.set('SPOTIFY_CLIENT_ID', client_id)
-            config.set('SPOTIFY_CLIENT_SECRET', client_secret)
-            config.set('SPOTIFY_REDIRECT_URI', redirect_uri)
-            config.set('REFRESH_INTERVAL', refresh_interval)
-            
-            config.save()
+            with config.edit():
+                config.set('SPOTIFY_CLIENT_ID', client_id)
+                config.set('SPOTIFY_CLIENT_SECRET', client_secret)
+                config.set('SPOTIFY_REDIRECT_URI', redirect_uri)
+                config.set('REFRESH_INTERVAL', refresh_interval)
+            sync_engine.reload_config()
             
             flash('Configuration updated successfully', 'success')
             return redirect(url_for('index'))
@@ -124,12 +190,14 @@ def register_routes(app):
                 flash('Please enter a valid IP address', 'warning')
                 return redirect(url_for('index'))
             
-            wled_ips = config.get('WLED_IPS', [])
+            with config.edit():
+                wled_ips = config.get('WLED_IPS', [])
+                added = ip not in wled_ips
+                if added:
+                    config.set('WLED_IPS', wled_ips + [ip])
             
-            if ip not in wled_ips:
-                wled_ips.append(ip)
-                config.set('WLED_IPS', wled_ips)
-                config.save()
+            if added:
+                sync_engine.reload_config()
                 flash(f'WLED device {ip} added', 'success')
             else:
                 flash(f'WLED device {ip} already exists', 'info')
@@ -146,12 +214,14 @@ def register_routes(app):
         try:
             ip = request.args.get('ip', '').strip()
             
-            wled_ips = config.get('WLED_IPS', [])
+            with config.edit():
+                wled_ips = config.get('WLED_IPS', [])
+                removed = ip in wled_ips
+                if removed:
+                    config.set('WLED_IPS', [other for other in wled_ips if other != ip])
             
-            if ip in wled_ips:
-                wled_ips.remove(ip)
-                config.set('WLED_IPS', wled_ips)
-                config.save()
+            if removed:
+                sync_engine.reload_config()
                 return jsonify({'success': True, 'message': f'Device {ip} removed'})
             else:
                 return jsonify({'success': False, 'message': 'Device not found'}), 404
@@ -165,7 +235,7 @@ def register_routes(app):
         try:
             ip = request.args.get('ip', '').strip()
             
-            online = sync_engine.wled_controller.health_check(ip)
+            online = sync_engine.check_device_health(ip)
             
             return jsonify({
                 'ip': ip,
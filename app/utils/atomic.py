@@ -0,0 +1,30 @@
+"""
+Atomic file writes
+"""
+import json
+import os
+import tempfile
+from typing import Any
+
+
+def write_json(path: str, data: Any, **dump_kwargs: Any) -> None:
+    """
+    Write data as JSON, replacing the file atomically
+
+    The JSON goes to a temporary file in the same directory, which then
+    replaces the target. Readers (and a restart after a crash) see either
+    the old file or the complete new one, never half of it.
+
+    Raises:
+        OSError: If the file cannot be written; the target is left untouched
+        TypeError, ValueError: If data is not JSON serializable
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,90 @@
+"""
+Per-device color calibration compiled into lookup tables
+"""
+import logging
+from typing import Any, Dict, Sequence, Tuple
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+
+class ColorCalibration:
+    """
+    Gamma, white balance, brightness cap and optional RGB -> RGBW split
+
+    Everything except the white split is folded into one 256-entry lookup
+    table per channel when the calibration is built, so applying it is a
+    table lookup per channel for single colors and a single fancy-indexing
+    operation for whole pixel frames.
+    """
+
+    def __init__(self, gamma: float = 1.0, white_balance: Sequence[float] = (1.0, 1.0, 1.0),
+                 max_brightness: float = 1.0, rgbw: bool = False):
+        if gamma <= 0:
+            raise ValueError(f"gamma must be positive, got {gamma}")
+        if len(white_balance) != 3 or any(not 0 <= w <= 1 for w in white_balance):
+            raise ValueError(f"white_balance must be three factors between 0 and 1, got {white_balance}")
+        if not 0 <= max_brightness <= 1:
+            raise ValueError(f"max_brightness must be between 0 and 1, got {max_brightness}")
+
+        self.gamma = float(gamma)
+        self.white_balance = tuple(float(w) for w in white_balance)
+        self.max_brightness = float(max_brightness)
+        self.rgbw = bool(rgbw)
+        self.channels = 4 if self.rgbw else 3
+
+        levels = np.arange(256) / 255.0
+        curves = levels[None, :] ** self.gamma * np.asarray(self.white_balance)[:, None] * self.max_brightness
+        self.lut = np.clip(np.rint(curves * 255), 0, 255).astype(np.uint8)
+        self._lut_rows = self.lut.tolist()
+        self._channel_index = np.arange(3)
+
+    @classmethod
+    def from_config(cls, settings: Dict[str, Any]) -> 'ColorCalibration':
+        """Build from a DEVICE_CALIBRATION entry"""
+        return cls(
+            gamma=settings.get('gamma', 1.0),
+            white_balance=settings.get('white_balance', (1.0, 1.0, 1.0)),
+            max_brightness=settings.get('max_brightness', 1.0),
+            rgbw=settings.get('rgbw', False)
+        )
+
+    def apply_rgb(self, color: Sequence[int]) -> Tuple[int, int, int]:
+        """Calibrate one color without the white split (for RGB-only protocols)"""
+        return tuple(self._lut_rows[c][max(0, min(255, int(v)))] for c, v in enumerate(color[:3]))
+
+    def apply_color(self, color: Sequence[int]) -> Tuple[int, ...]:
+        """Calibrate one color; returns (r, g, b) or (r, g, b, w)"""
+        r, g, b = self.apply_rgb(color)
+        if not self.rgbw:
+            return (r, g, b)
+        w = min(r, g, b)
+        return (r - w, g - w, b - w, w)
+
+    def apply_frame(self, pixels: bytes) -> bytes:
+        """Calibrate RGB pixel data; returns RGB or RGBW bytes"""
+        rgb = np.frombuffer(pixels, dtype=np.uint8).reshape(-1, 3)
+        out = self.lut[self._channel_index, rgb]
+        if self.rgbw:
+            white = out.min(axis=1, keepdims=True)
+            out = np.concatenate((out - white, white), axis=1)
+        return out.tobytes()
+
+
+def compile_calibrations(settings: Dict[str, Dict[str, Any]]) -> Dict[str, ColorCalibration]:
+    """
+    Compile the DEVICE_CALIBRATION config (device -> settings)
+
+    Raises:
+        ValueError: If any entry is invalid
+    """
+    calibrations = {}
+    for ip, device_settings in (settings or {}).items():
+        try:
+            calibrations[ip] = ColorCalibration.from_config(device_settings)
+        except (TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Invalid calibration for {ip}: {e}") from e
+    return calibrations
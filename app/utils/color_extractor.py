@@ -1,22 +1,34 @@
 """
 Color extraction utilities with caching
 """
-import requests
 import logging
 from io import BytesIO
-from colorthief import ColorThief
-from typing import Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Tuple, Union
 from time import time
 
+from app.utils.lazy import lazy_import
+
+if TYPE_CHECKING:
+    from app.utils.extraction_pipeline import ExtractionResult
+
+requests = lazy_import('requests')
+colorthief = lazy_import('colorthief')
+
 logger = logging.getLogger(__name__)
 
+# Every supported extraction method
+METHODS = ('vibrant', 'dominant', 'average')
+
 
 class ColorExtractor:
     """Extract colors from album covers with caching"""
     
-    def __init__(self, cache_duration: int = 5):
+    def __init__(self, cache_duration: int = 5, processes: Optional[int] = None):
         self.cache_duration = cache_duration
         self._cache = {}
+        # Worker processes for extract_batch, started on first use
+        self.processes = processes
+        self._pipeline = None
     
     def _is_cache_valid(self, url: str) -> bool:
         """Check if cached color is still valid"""
@@ -25,13 +37,36 @@ class ColorExtractor:
         cached_time = self._cache[url]['time']
         return (time() - cached_time) < self.cache_duration
     
-    def get_color(self, image_url: str, method: str = 'vibrant') -> Tuple[int, int, int]:
+    def get_cached_color(self, image_url: str) -> Optional[Tuple[int, int, int]]:
+        """Last color extracted for a cover, however old"""
+        entry = self._cache.get(image_url)
+        return entry['color'] if entry else None
+    
+    def get_cached_colors(self, limit: int) -> Dict[str, Tuple[int, int, int]]:
+        """The most recently extracted colors, newest first"""
+        entries = sorted(self._cache.items(), key=lambda item: item[1]['time'], reverse=True)
+        return {url: entry['color'] for url, entry in entries[:limit]}
+    
+    def restore_colors(self, colors: Dict[str, Tuple[int, int, int]]) -> None:
+        """
+        Load colors saved by a previous run
+        
+        They count as expired, so they only serve as fallbacks until the
+        cover is extracted again.
+        """
+        for url, color in colors.items():
+            self._cache.setdefault(url, {'color': self.validate_rgb(*color), 'time': 0.0})
+    
+    def get_color(self, image_url: str, method: str = 'vibrant', timeout: float = 5,
+                  default: Optional[Tuple[int, int, int]] = (0, 0, 0)) -> Optional[Tuple[int, int, int]]:
         """
         Extract color from album cover image
         
         Args:
             image_url: URL of the album cover
             method: Extraction method ('vibrant', 'dominant', 'average')
+            timeout: Download timeout in seconds
+            default: Returned if the cover cannot be downloaded or analyzed
         
         Returns:
             RGB tuple (r, g, b) with values guaranteed to be in LED-compatible range (0-255)
@@ -42,22 +77,8 @@ class ColorExtractor:
             return self._cache[image_url]['color']
         
         try:
-            # Download image
-            response = requests.get(image_url, timeout=5)
-            response.raise_for_status()
-            
-            # Extract color
-            if method == 'vibrant':
-                color = self._get_vibrant_color(response.content)
-            elif method == 'dominant':
-                color = self._get_dominant_color(response.content)
-            elif method == 'average':
-                color = self._get_average_color(response.content)
-            else:
-                color = self._get_vibrant_color(response.content)
-            
-            # Validate and ensure color is in LED-compatible range (0-255)
-            color = self.validate_rgb(*color)
+            # Download image and extract color
+            color = self.extract(self.download(image_url, timeout), method)
             
             # Cache the result
             self._cache[image_url] = {
@@ -65,24 +86,97 @@ class ColorExtractor:
                 'time': time()
             }
             
-            logger.info(f"Extracted color: RGB{color} using method '{method}'")
+            logger.debug(f"Extracted color: RGB{color} using method '{method}'")
             return color
             
         except requests.RequestException as e:
             logger.error(f"Failed to download image: {e}")
-            return (0, 0, 0)
+            return default
         except Exception as e:
             logger.error(f"Error extracting color: {e}")
-            return (0, 0, 0)
+            return default
+    
+    @staticmethod
+    def download(image_url: str, timeout: float = 5) -> bytes:
+        """
+        Download a cover image
+        
+        Raises:
+            requests.RequestException: If the download fails
+        """
+        response = requests.get(image_url, timeout=timeout)
+        response.raise_for_status()
+        return response.content
+    
+    def extract(self, image_bytes: bytes, method: str = 'vibrant') -> Tuple[int, int, int]:
+        """Color of a downloaded cover, clamped to the LED-compatible range"""
+        if method == 'dominant':
+            color = self._get_dominant_color(image_bytes)
+        elif method == 'average':
+            color = self._get_average_color(image_bytes)
+        else:
+            color = self._get_vibrant_color(image_bytes)
+        return self.validate_rgb(*color)
+    
+    def extract_all(self, image_bytes: bytes, methods=METHODS) -> Dict[str, Tuple[int, int, int]]:
+        """
+        Color of a downloaded cover for each extraction method
+        
+        The image is decoded once, and the dominant and average colors share
+        one palette instead of quantizing the image for each.
+        """
+        color_thief = colorthief.ColorThief(BytesIO(image_bytes))
+        palette = None
+        colors = {}
+        for method in methods:
+            if method in ('dominant', 'average'):
+                if palette is None:
+                    palette = color_thief.get_palette(color_count=5, quality=1)
+                color = palette[0] if method == 'dominant' else self._average(palette)
+            else:
+                color = self._pick_vibrant(color_thief)
+            colors[method] = self.validate_rgb(*color)
+        return colors
+    
+    def extract_batch(self, sources: Iterable[Union[str, bytes]], methods=METHODS, timeout: float = 10,
+                      download_workers: int = 8, max_pending: int = 32) -> Iterator['ExtractionResult']:
+        """
+        Extract colors for many covers at once
+        
+        Downloads run concurrently and decoding/quantization in parallel
+        worker processes, overlapped, with bounded queues in between. The
+        color cache is neither read nor filled.
+        
+        Args:
+            sources: Cover URLs or image bytes, consumed lazily
+            methods: Extraction methods to compute for every cover
+            timeout: Download timeout per cover in seconds
+            download_workers: Concurrent downloads
+            max_pending: Covers in flight, results not yet consumed included
+        
+        Returns:
+            ExtractionResult per source, in order of completion
+        """
+        from app.utils.extraction_pipeline import ExtractionPipeline
+        if self._pipeline is None:
+            self._pipeline = ExtractionPipeline(self.processes)
+        return self._pipeline.run(sources, methods, timeout=timeout,
+                                  download_workers=download_workers, max_pending=max_pending)
+    
+    def close(self) -> None:
+        """Stop the batch extraction worker processes"""
+        if self._pipeline is not None:
+            self._pipeline.close()
     
     def _get_vibrant_color(self, image_bytes: bytes) -> Tuple[int, int, int]:
         """
         Get the most vibrant (saturated) color from palette
         Similar to spicetify-dynamic-theme
         """
-        img_bytes = BytesIO(image_bytes)
-        color_thief = ColorThief(img_bytes)
-        
+        return self._pick_vibrant(colorthief.ColorThief(BytesIO(image_bytes)))
+    
+    def _pick_vibrant(self, color_thief) -> Tuple[int, int, int]:
+        """Most saturated palette color of an opened image"""
         # Get palette
         palette = color_thief.get_palette(color_count=6, quality=1)
         
@@ -113,16 +207,19 @@ class ColorExtractor:
     def _get_dominant_color(self, image_bytes: bytes) -> Tuple[int, int, int]:
         """Get the dominant color from image"""
         img_bytes = BytesIO(image_bytes)
-        color_thief = ColorThief(img_bytes)
+        color_thief = colorthief.ColorThief(img_bytes)
         return color_thief.get_color(quality=1)
     
     def _get_average_color(self, image_bytes: bytes) -> Tuple[int, int, int]:
         """Get average color from image palette"""
         img_bytes = BytesIO(image_bytes)
-        color_thief = ColorThief(img_bytes)
+        color_thief = colorthief.ColorThief(img_bytes)
         palette = color_thief.get_palette(color_count=5, quality=1)
-        
-        # Calculate average
+        return self._average(palette)
+    
+    @staticmethod
+    def _average(palette) -> Tuple[int, int, int]:
+        """Average of the palette colors"""
         avg_r = sum(c[0] for c in palette) // len(palette)
         avg_g = sum(c[1] for c in palette) // len(palette)
         avg_b = sum(c[2] for c in palette) // len(palette)
@@ -0,0 +1,139 @@
+"""
+WLED DDP (Distributed Display Protocol) pixel output
+"""
+import logging
+import socket
+import struct
+import threading
+from time import monotonic
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DDP_PORT = 4048
+DDP_HEADER_SIZE = 10
+
+DDP_FLAG_VERSION_1 = 0x40
+DDP_FLAG_PUSH = 0x01
+DDP_TYPE_RGB24 = 0x0B
+DDP_TYPE_RGBW32 = 0x1B
+DDP_ID_DISPLAY = 0x01
+
+# 480 RGB (or 360 RGBW) pixels per packet keeps every datagram below a
+# 1500 byte MTU
+DDP_MAX_DATA = 1440
+
+
+def build_packets(pixels: bytes, sequence: int = 1, max_data: int = DDP_MAX_DATA,
+                  data_type: int = DDP_TYPE_RGB24) -> List[bytes]:
+    """
+    Split pixel data into DDP packets
+
+    Every packet carries its byte offset into the strip; only the last one
+    has the PUSH flag set, so WLED shows the frame once it is complete.
+
+    Args:
+        pixels: RGB bytes (3 per LED) or RGBW bytes (4 per LED)
+        sequence: Sequence number (1-15, 0 disables sequencing)
+        max_data: Payload bytes per packet (multiple of the pixel size)
+        data_type: DDP_TYPE_RGB24 or DDP_TYPE_RGBW32
+    """
+    packets = []
+    total = len(pixels)
+    for offset in range(0, total, max_data):
+        chunk = pixels[offset:offset + max_data]
+        flags = DDP_FLAG_VERSION_1
+        if offset + len(chunk) >= total:
+            flags |= DDP_FLAG_PUSH
+        header = struct.pack('!BBBBIH', flags, sequence & 0x0F, data_type,
+                             DDP_ID_DISPLAY, offset, len(chunk))
+        packets.append(header + chunk)
+    return packets
+
+
+class DDPSender:
+    """
+    Stream pixel frames to WLED devices over DDP
+
+    Packets are built once per frame; the last frame of each device is
+    re-sent as a keep-alive so WLED stays in realtime mode while the image
+    does not change.
+    """
+
+    def __init__(self, port: int = DDP_PORT, keepalive_s: float = 1.0):
+        self.port = port
+        self.keepalive_s = keepalive_s
+        self.frames_sent = 0
+        self.packets_sent = 0
+
+        self._sequence = 0
+        self._packets: Dict[str, List[bytes]] = {}
+        self._last_sent = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._keepalive: Optional[threading.Thread] = None
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def send_frame(self, frames: Dict[str, bytes], rgbw: Iterable[str] = ()) -> int:
+        """
+        Send one frame to several devices
+
+        Args:
+            frames: Mapping of device IP to pixel bytes
+            rgbw: Devices whose frames are RGBW (4 bytes per LED)
+
+        Returns:
+            Number of datagrams sent
+        """
+        rgbw = set(rgbw)
+        with self._lock:
+            self._sequence = self._sequence % 15 + 1
+            self._packets = {
+                ip: build_packets(pixels, self._sequence,
+                                  data_type=DDP_TYPE_RGBW32 if ip in rgbw else DDP_TYPE_RGB24)
+                for ip, pixels in frames.items()
+            }
+            sent = self._send_packets()
+        self._ensure_keepalive()
+        return sent
+
+    def _send_packets(self) -> int:
+        # Caller holds self._lock
+        sent = 0
+        for ip, packets in self._packets.items():
+            for packet in packets:
+                try:
+                    self._sock.sendto(packet, (ip, self.port))
+                    sent += 1
+                except OSError as e:
+                    logger.debug(f"DDP send to WLED @ {ip} failed: {e}")
+        self.frames_sent += 1
+        self.packets_sent += sent
+        self._last_sent = monotonic()
+        return sent
+
+    def _ensure_keepalive(self) -> None:
+        if self.keepalive_s and (self._keepalive is None or not self._keepalive.is_alive()):
+            self._keepalive = threading.Thread(target=self._run_keepalive,
+                                               name='ddp-keepalive', daemon=True)
+            self._keepalive.start()
+
+    def _run_keepalive(self) -> None:
+        while not self._stopped.wait(self.keepalive_s / 2):
+            with self._lock:
+                if self._packets and monotonic() - self._last_sent >= self.keepalive_s:
+                    self._send_packets()
+
+    def clear(self) -> None:
+        """Forget the current frame so it is no longer kept alive"""
+        with self._lock:
+            self._packets = {}
+
+    def close(self) -> None:
+        """Stop the keep-alive and close the socket"""
+        self._stopped.set()
+        with self._lock:
+            self._packets = {}
+            self._sock.close()
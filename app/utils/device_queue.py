@@ -0,0 +1,132 @@
+"""
+Per-device command queues where the latest command wins
+"""
+import logging
+import threading
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _DeviceState:
+    """Pending commands, worker thread and counters of one device"""
+
+    def __init__(self, lock: threading.Lock):
+        # One slot per command kind ('color', 'brightness', ...)
+        self.pending: "OrderedDict[str, Callable[[], Any]]" = OrderedDict()
+        self.wakeup = threading.Condition(lock)
+        self.thread: Optional[threading.Thread] = None
+        self.in_flight = False
+        self.sent = 0
+        self.failed = 0
+        self.coalesced = 0
+
+
+class DeviceQueue:
+    """
+    Send commands to each device from its own worker thread
+
+    Every device has a single slot per command kind. A new command replaces
+    one of the same kind that has not been sent yet (counted as coalesced),
+    so quickly skipping through tracks only ever sends the latest color, and
+    a slow or unreachable device never holds up the others. Workers exit
+    after `idle_timeout_s` without commands and are restarted on demand.
+    """
+
+    def __init__(self, idle_timeout_s: float = 60.0):
+        self.idle_timeout_s = idle_timeout_s
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._devices: Dict[str, _DeviceState] = {}
+        self._closed = False
+
+    def submit(self, ip: str, kind: str, fn: Callable[..., Any], *args: Any) -> bool:
+        """
+        Queue a command for a device
+
+        Args:
+            ip: Device address
+            kind: Command kind; a pending command of the same kind is replaced
+            fn: Callable doing the actual request; returning False counts as failed
+            *args: Arguments for `fn`
+
+        Returns:
+            True if a pending command was replaced
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            state = self._devices.get(ip)
+            if state is None:
+                state = self._devices[ip] = _DeviceState(self._lock)
+
+            replaced = kind in state.pending
+            if replaced:
+                state.coalesced += 1
+            state.pending[kind] = partial(fn, *args)
+
+            if state.thread is None:
+                state.thread = threading.Thread(target=self._run, args=(ip, state),
+                                                name=f'wled-{ip}', daemon=True)
+                state.thread.start()
+            else:
+                state.wakeup.notify()
+            return replaced
+
+    def _run(self, ip: str, state: _DeviceState) -> None:
+        while True:
+            with self._lock:
+                while not state.pending and not self._closed:
+                    if not state.wakeup.wait(self.idle_timeout_s):
+                        break
+                if not state.pending or self._closed:
+                    state.thread = None
+                    return
+                kind, command = state.pending.popitem(last=False)
+                state.in_flight = True
+
+            try:
+                ok = command() is not False
+            except Exception as e:
+                logger.error(f"Error sending {kind} to WLED @ {ip}: {e}")
+                ok = False
+
+            with self._lock:
+                state.in_flight = False
+                if ok:
+                    state.sent += 1
+                else:
+                    state.failed += 1
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued command has been sent"""
+        with self._lock:
+            return self._idle.wait_for(
+                lambda: all(not s.pending and not s.in_flight for s in self._devices.values()),
+                timeout
+            )
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Queue depth and counters per device"""
+        with self._lock:
+            return {
+                ip: {
+                    'queue_depth': len(state.pending),
+                    'in_flight': state.in_flight,
+                    'sent': state.sent,
+                    'failed': state.failed,
+                    'coalesced': state.coalesced
+                }
+                for ip, state in self._devices.items()
+            }
+
+    def close(self) -> None:
+        """Drop pending commands and stop all workers"""
+        with self._lock:
+            self._closed = True
+            for state in self._devices.values():
+                state.pending.clear()
+                state.wakeup.notify()
@@ -0,0 +1,198 @@
+"""
+Persistent registry of WLED device capabilities
+"""
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, field
+from time import monotonic, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_HTTP = 'http'
+PROTOCOL_DRGB = 'drgb'
+PROTOCOL_DNRGB = 'dnrgb'
+PROTOCOL_DDP = 'ddp'
+PROTOCOL_WEBSOCKET = 'ws'
+PROTOCOL_CUSTOM_PALETTES = 'palettes'
+
+# First WLED release that receives each protocol
+_MIN_VERSION = {
+    PROTOCOL_DNRGB: (0, 11, 0),
+    PROTOCOL_DDP: (0, 11, 0),
+    PROTOCOL_CUSTOM_PALETTES: (0, 14, 0),
+}
+
+
+def parse_version(version: str) -> Tuple[int, ...]:
+    """'0.14.0-b2' -> (0, 14, 0)"""
+    return tuple(int(part) for part in re.findall(r'\d+', (version or '').split('-')[0])[:3])
+
+
+@dataclass(frozen=True)
+class DeviceProfile:
+    """What a WLED device is and what it can receive"""
+    ip: str
+    name: str = ''
+    version: str = ''
+    led_count: int = 0
+    rgbw: bool = False
+    # (segment id, first LED, LED after the last)
+    segments: Tuple[Tuple[int, int, int], ...] = ()
+    protocols: Tuple[str, ...] = (PROTOCOL_HTTP,)
+    fetched_at: float = field(default=0.0, compare=False)
+
+    @classmethod
+    def from_wled(cls, ip: str, info: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> 'DeviceProfile':
+        """Build a profile from WLED's /json/info and (optionally) /json/state"""
+        leds = info.get('leds') or {}
+        version = str(info.get('ver', ''))
+        parsed = parse_version(version)
+
+        protocols = [PROTOCOL_HTTP, PROTOCOL_DRGB]
+        for protocol, minimum in _MIN_VERSION.items():
+            if parsed >= minimum:
+                protocols.append(protocol)
+        if info.get('ws', -1) >= 0:
+            protocols.append(PROTOCOL_WEBSOCKET)
+
+        segments = tuple(
+            (int(seg.get('id', index)), int(seg.get('start', 0)), int(seg.get('stop', 0)))
+            for index, seg in enumerate((state or {}).get('seg') or [])
+            if isinstance(seg, dict)
+        )
+        return cls(
+            ip=ip,
+            name=str(info.get('name', '')),
+            version=version,
+            led_count=int(leds.get('count', 0)),
+            rgbw=bool(leds.get('rgbw', False)),
+            segments=segments,
+            protocols=tuple(protocols),
+            fetched_at=time()
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DeviceProfile':
+        data = dict(data)
+        data['segments'] = tuple(tuple(seg) for seg in data.get('segments', ()))
+        data['protocols'] = tuple(data.get('protocols', (PROTOCOL_HTTP,)))
+        return cls(**data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def supports(self, protocol: str) -> bool:
+        return protocol in self.protocols
+
+    @property
+    def segment_ids(self) -> List[int]:
+        return [seg[0] for seg in self.segments]
+
+
+class DeviceRegistry:
+    """
+    Device profiles, fetched once and kept across restarts
+
+    A profile is queried over HTTP only when no profile is known or the
+    previous one was invalidated. Devices with a WebSocket connection
+    refresh their profile for free from the state they push on reconnect,
+    which also picks up firmware updates.
+    """
+
+    def __init__(self, path: Optional[str], fetch: Callable[[str], Optional[Dict[str, Any]]],
+                 retry_after_s: float = 60.0):
+        self.path = path
+        self._fetch = fetch
+        self.retry_after_s = retry_after_s
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, DeviceProfile] = {}
+        self._failed_at: Dict[str, float] = {}
+        self.fetches = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self._profiles = {ip: DeviceProfile.from_dict(profile) for ip, profile in data.items()}
+            logger.debug(f"Loaded {len(self._profiles)} device profiles from {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Could not read device profiles {self.path}: {e}")
+
+    def _save(self) -> None:
+        # Caller holds self._lock
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.devices.', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump({ip: p.to_dict() for ip, p in self._profiles.items()}, f, indent=2)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write device profiles {self.path}: {e}")
+
+    def peek(self, ip: str) -> Optional[DeviceProfile]:
+        """Known profile of a device, never querying it"""
+        return self._profiles.get(ip)
+
+    def get(self, ip: str) -> Optional[DeviceProfile]:
+        """
+        Profile of a device, fetching it only if none is known
+
+        Returns:
+            The profile, or None if the device could not be queried
+            (retried at most every `retry_after_s`)
+        """
+        profile = self._profiles.get(ip)
+        if profile is not None:
+            return profile
+
+        failed_at = self._failed_at.get(ip)
+        if failed_at is not None and monotonic() - failed_at < self.retry_after_s:
+            return None
+
+        self.fetches += 1
+        data = self._fetch(ip)
+        if not data or not isinstance(data.get('info'), dict):
+            self._failed_at[ip] = monotonic()
+            logger.warning(f"Could not read capabilities of WLED @ {ip}")
+            return None
+        return self.observe(ip, data['info'], data.get('state'))
+
+    def observe(self, ip: str, info: Dict[str, Any], state: Optional[Dict[str, Any]] = None) -> DeviceProfile:
+        """Update a profile from info/state the device sent anyway"""
+        profile = DeviceProfile.from_wled(ip, info, state)
+        with self._lock:
+            old = self._profiles.get(ip)
+            self._failed_at.pop(ip, None)
+            if old == profile:
+                return old
+            self._profiles[ip] = profile
+            self._save()
+        if old and old.version != profile.version:
+            logger.info(f"WLED @ {ip} updated from {old.version} to {profile.version}")
+        return profile
+
+    def invalidate(self, ip: str) -> None:
+        """Forget a profile so the next get() queries the device again"""
+        with self._lock:
+            if self._profiles.pop(ip, None) is not None:
+                self._save()
+
+    def get_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """All known profiles as plain dicts"""
+        return {ip: profile.to_dict() for ip, profile in list(self._profiles.items())}
@@ -0,0 +1,202 @@
+"""
+Pipelined batch color extraction: concurrent downloads feeding worker processes
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# How often blocked stages check whether the consumer went away
+POLL_S = 0.1
+
+Source = Union[str, bytes, bytearray]
+
+
+@dataclass
+class ExtractionResult:
+    """Outcome of one image of a batch"""
+    index: int  # Position in the input
+    url: Optional[str]  # None for byte payloads
+    colors: Optional[Dict[str, Tuple[int, int, int]]] = None
+    error: Optional[str] = None
+    download_s: float = 0.0
+    extract_s: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.colors is not None
+
+
+@dataclass
+class _Fed:
+    """Sentinel: the feeder is done after `count` items"""
+    count: int
+
+
+def _extract_colors(image_bytes: bytes, methods: Sequence[str]) -> Tuple[Dict[str, Tuple[int, int, int]], float]:
+    """Decode and quantize one image (runs in a worker process)"""
+    from app.utils.color_extractor import ColorExtractor
+    started = perf_counter()
+    colors = ColorExtractor().extract_all(image_bytes, methods)
+    return colors, perf_counter() - started
+
+
+class ExtractionPipeline:
+    """
+    Overlapped download -> decode/quantize stages for many images
+
+    Downloads run on a thread pool, decoding and quantization (pure Python,
+    so bound by the GIL in threads) on a process pool that is kept between
+    batches. Two semaphores bound the hand-offs: images downloaded but not
+    yet on a worker process, and results not yet taken by the consumer.
+    A slow consumer therefore stalls the CPU stage, which stalls the
+    downloads, instead of letting memory grow.
+
+    With `processes=0` the CPU stage runs in the download threads, which
+    suits tests and single-core hosts.
+
+    A pool whose worker process died (an OOM kill, say) is broken for
+    good; it is dropped and the next image starts a fresh one.
+    """
+
+    def __init__(self, processes: Optional[int] = None):
+        self.processes = (os.cpu_count() or 1) if processes is None else max(0, int(processes))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # Forking a process that runs threads can copy held locks
+                self._pool = ProcessPoolExecutor(max_workers=self.processes,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        logger.warning("Color extraction worker process died, starting new ones for the next images")
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, sources: Iterable[Source], methods: Sequence[str], timeout: float = 10.0,
+            download_workers: int = 8, max_pending: int = 32) -> Iterator[ExtractionResult]:
+        """
+        Extract colors for every source, yielding results as they complete
+
+        Sources are image URLs or image bytes and are consumed lazily, so
+        a generator can pace the input. Closing the iterator early cancels
+        the rest of the batch.
+        """
+        from app.utils.color_extractor import ColorExtractor
+
+        methods = tuple(methods)
+        results: queue.SimpleQueue = queue.SimpleQueue()
+        pending = threading.BoundedSemaphore(max(1, max_pending))
+        cpu_slots = threading.BoundedSemaphore(max(1, self.processes * 2))
+        stop = threading.Event()
+        downloads = ThreadPoolExecutor(max_workers=max(1, download_workers),
+                                       thread_name_prefix='batch-download')
+
+        def acquire(semaphore: threading.BoundedSemaphore) -> bool:
+            while not semaphore.acquire(timeout=POLL_S):
+                if stop.is_set():
+                    return False
+            return True
+
+        def finish(result: ExtractionResult, future: Future, pool: ProcessPoolExecutor) -> None:
+            cpu_slots.release()
+            try:
+                result.colors, result.extract_s = future.result()
+            except BrokenProcessPool as e:
+                self._discard_pool(pool)
+                result.error = f"extraction failed: {e}"
+            except Exception as e:
+                result.error = f"extraction failed: {e}"
+            results.put(result)
+
+        def fetch(index: int, source: Source) -> None:
+            result = ExtractionResult(index, None if isinstance(source, (bytes, bytearray)) else source)
+            try:
+                if result.url is None:
+                    image = bytes(source)
+                else:
+                    started = perf_counter()
+                    try:
+                        image = ColorExtractor.download(result.url, timeout=timeout)
+                    finally:
+                        result.download_s = perf_counter() - started
+            except Exception as e:
+                result.error = f"download failed: {e}"
+                results.put(result)
+                return
+
+            if not self.processes:
+                try:
+                    result.colors, result.extract_s = _extract_colors(image, methods)
+                except Exception as e:
+                    result.error = f"extraction failed: {e}"
+                results.put(result)
+                return
+
+            if not acquire(cpu_slots):
+                result.error = 'cancelled'
+                results.put(result)
+                return
+            pool = self._get_pool()
+            try:
+                future = pool.submit(_extract_colors, image, methods)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._discard_pool(pool)
+                cpu_slots.release()
+                result.error = f"extraction failed: {e}"
+                results.put(result)
+                return
+            future.add_done_callback(lambda f: finish(result, f, pool))
+
+        def feed() -> None:
+            count = 0
+            try:
+                for index, source in enumerate(sources):
+                    if not acquire(pending) or stop.is_set():
+                        break
+                    downloads.submit(fetch, index, source)
+                    count += 1
+            except Exception as e:
+                logger.error(f"Batch extraction input failed: {e}")
+            finally:
+                results.put(_Fed(count))
+
+        feeder = threading.Thread(target=feed, name='batch-feed', daemon=True)
+        feeder.start()
+        fed: Optional[int] = None
+        returned = 0
+        try:
+            while fed is None or returned < fed:
+                item = results.get()
+                if isinstance(item, _Fed):
+                    fed = item.count
+                    continue
+                pending.release()
+                returned += 1
+                yield item
+        finally:
+            stop.set()
+            downloads.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Shut the worker processes down"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,42 @@
+"""
+Deferred module imports to keep application startup fast
+"""
+import importlib
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module lazily
+
+    The returned module object is registered in ``sys.modules`` immediately,
+    but its code only runs on first attribute access. Heavy dependencies
+    (requests, spotipy, Pillow, ...) therefore cost nothing until they are
+    actually used.
+
+    Access submodules as attributes of the returned module; a later
+    ``from package.sub import x`` while the package is still unloaded may
+    create a second copy of the submodule.
+
+    Args:
+        name: Top-level module name (e.g. 'requests')
+
+    Returns:
+        The (possibly not yet loaded) module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        # Let the regular import machinery raise a proper ImportError
+        return importlib.import_module(name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,146 @@
+"""
+MQTT output: colors published to WLED topics through a broker
+"""
+import logging
+import threading
+from time import monotonic
+from typing import Any, Dict, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MQTT_PORT = 1883
+
+# paho's MQTT_ERR_SUCCESS
+_PUBLISH_OK = 0
+
+
+def color_payload(color: Sequence[int]) -> str:
+    """WLED ``<topic>/col`` payload: #RRGGBB, or #WWRRGGBB with a white channel"""
+    r, g, b = (max(0, min(255, int(c))) for c in color[:3])
+    if len(color) > 3:
+        return f"#{max(0, min(255, int(color[3]))):02X}{r:02X}{g:02X}{b:02X}"
+    return f"#{r:02X}{g:02X}{b:02X}"
+
+
+class MQTTSink:
+    """
+    Publish colors over one persistent broker connection
+
+    WLED subscribes to its device topic and, optionally, a group topic, so
+    a single publish can reach any number of devices. The connection is
+    kept open by paho's network thread, which also reconnects.
+
+    While the broker is unreachable only the latest color per topic is
+    buffered: a newer color replaces the older one, and colors older than
+    ``max_age_s`` are dropped on reconnect instead of flashing past.
+    """
+
+    def __init__(self, host: str, port: int = MQTT_PORT, qos: int = 1, retain: bool = False,
+                 client_id: str = 'spotifytowled', username: str = '', password: str = '',
+                 keepalive_s: int = 30, max_age_s: float = 10.0, client: Any = None):
+        if qos not in (0, 1, 2):
+            raise ValueError(f"MQTT QoS must be 0, 1 or 2, got {qos}")
+        self.host = host
+        self.port = port
+        self.qos = qos
+        self.retain = retain
+        self.max_age_s = max_age_s
+        self.published = 0
+        self.dropped = 0
+
+        self._connected = False
+        # topic -> (payload, time it was published)
+        self._pending: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+        self._client = client or self._create_client(client_id)
+        if username:
+            self._client.username_pw_set(username, password or None)
+        self._client.on_connect = self._on_connect
+        self._client.on_disconnect = self._on_disconnect
+        self._client.reconnect_delay_set(min_delay=1, max_delay=30)
+        # Connects (and reconnects) in the background, never on the caller's thread
+        self._client.connect_async(host, port, keepalive_s)
+        self._client.loop_start()
+
+    @staticmethod
+    def _create_client(client_id: str):
+        from paho.mqtt import client as mqtt
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+
+    @property
+    def connected(self) -> bool:
+        """Whether the broker connection is currently up"""
+        return self._connected
+
+    def publish_color(self, topic: str, color: Sequence[int]) -> bool:
+        """
+        Publish a color to ``<topic>/col``
+
+        Returns:
+            True if handed to the broker connection, False if buffered
+        """
+        topic = f"{topic.strip('/')}/col"
+        payload = color_payload(color)
+        with self._lock:
+            if self._connected and self._publish(topic, payload):
+                return True
+            if topic in self._pending:
+                self.dropped += 1
+            self._pending[topic] = (payload, monotonic())
+        return False
+
+    def _publish(self, topic: str, payload: str) -> bool:
+        # Caller holds self._lock
+        try:
+            info = self._client.publish(topic, payload, qos=self.qos, retain=self.retain)
+        except (OSError, ValueError) as e:
+            logger.debug(f"MQTT publish to {topic} failed: {e}")
+            return False
+        if info.rc != _PUBLISH_OK:
+            logger.debug(f"MQTT publish to {topic} failed with code {info.rc}")
+            return False
+        self.published += 1
+        return True
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None) -> None:
+        if reason_code != 0:
+            logger.error(f"MQTT broker {self.host}:{self.port} refused the connection: {reason_code}")
+            return
+        logger.info(f"Connected to MQTT broker {self.host}:{self.port}")
+        with self._lock:
+            self._connected = True
+            pending, self._pending = self._pending, {}
+            now = monotonic()
+            for topic, (payload, queued_at) in pending.items():
+                if now - queued_at > self.max_age_s:
+                    self.dropped += 1
+                elif not self._publish(topic, payload):
+                    self._pending[topic] = (payload, queued_at)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties=None) -> None:
+        with self._lock:
+            self._connected = False
+        logger.warning(f"Disconnected from MQTT broker {self.host}:{self.port}: {reason_code}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'connected': self._connected,
+                'qos': self.qos,
+                'published': self.published,
+                'buffered': len(self._pending),
+                'dropped': self.dropped
+            }
+
+    def close(self) -> None:
+        """Disconnect and stop the network thread; buffered colors are discarded"""
+        with self._lock:
+            self._connected = False
+            self._pending.clear()
+        try:
+            self._client.disconnect()
+        except OSError:
+            pass
+        self._client.loop_stop()
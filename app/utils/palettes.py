@@ -0,0 +1,124 @@
+"""
+WLED custom palettes built from album art
+"""
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+logger = logging.getLogger(__name__)
+
+# WLED gradient palettes hold at most 16 stops
+MAX_STOPS = 16
+# WLED loads palette0.json ... palette9.json and stops at the first missing one
+MAX_SLOTS = 10
+
+
+def build_palette(colors: Sequence[Tuple[int, int, int]], stops: int = MAX_STOPS) -> List[Tuple[int, Tuple[int, int, int]]]:
+    """
+    Gradient palette of `stops` evenly spaced stops through `colors`
+
+    Colors are linearly interpolated at the stop positions, all channels
+    at once, so any number of input colors maps onto the stops.
+
+    Returns:
+        (position 0-255, (r, g, b)) pairs
+    """
+    if not 2 <= stops <= MAX_STOPS:
+        raise ValueError(f"A palette needs 2-{MAX_STOPS} stops, got {stops}")
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+    if len(colors) == 1:
+        colors = np.repeat(colors, 2, axis=0)
+    at = np.linspace(0, len(colors) - 1, stops)
+    lower = np.floor(at).astype(int)
+    upper = np.minimum(lower + 1, len(colors) - 1)
+    fraction = (at - lower)[:, None]
+    stop_colors = np.rint(colors[lower] * (1 - fraction) + colors[upper] * fraction).astype(int)
+    positions = np.rint(np.linspace(0, 255, stops)).astype(int)
+    return [(int(p), tuple(int(c) for c in color)) for p, color in zip(positions, stop_colors)]
+
+
+def palette_document(palette: Sequence[Tuple[int, Sequence[int]]]) -> Dict[str, Any]:
+    """Contents of a WLED paletteN.json file"""
+    entries: List[Any] = []
+    for position, (r, g, b) in palette:
+        entries.extend((position, f"{r:02x}{g:02x}{b:02x}"))
+    return {"palette": entries}
+
+
+def palette_key(palette: Sequence[Tuple[int, Sequence[int]]]) -> str:
+    """Stable identifier of a palette's contents"""
+    document = json.dumps(palette_document(palette), separators=(',', ':'))
+    return hashlib.sha1(document.encode()).hexdigest()[:16]
+
+
+def palette_id(slot: int) -> int:
+    """WLED palette id of custom palette slot N (255, 254, ...)"""
+    return 255 - slot
+
+
+class PaletteCache:
+    """
+    Which palettes are stored in which custom palette slots of each device
+
+    Slots are handed out from `first_slot` upwards (WLED ignores custom
+    palettes after a gap), then the least recently used one is replaced.
+    A palette already on a device only needs to be selected again.
+    """
+
+    def __init__(self, first_slot: int = 0, slots: int = 4):
+        if first_slot < 0 or slots < 1 or first_slot + slots > MAX_SLOTS:
+            raise ValueError(f"Palette slots {first_slot}-{first_slot + slots - 1} are outside 0-{MAX_SLOTS - 1}")
+        self.first_slot = first_slot
+        self.slots = slots
+        self.uploads = 0
+        self.reuses = 0
+        # device -> palette key -> slot, least recently used first
+        self._devices: Dict[str, "OrderedDict[str, int]"] = {}
+        self._lock = threading.Lock()
+
+    def assign(self, ip: str, key: str) -> Tuple[int, bool]:
+        """
+        Slot for a palette on a device
+
+        Returns:
+            (slot, True if the palette is already stored there)
+        """
+        with self._lock:
+            stored = self._devices.setdefault(ip, OrderedDict())
+            if key in stored:
+                stored.move_to_end(key)
+                self.reuses += 1
+                return stored[key], True
+
+            if len(stored) < self.slots:
+                used = set(stored.values())
+                slot = next(s for s in range(self.first_slot, self.first_slot + self.slots) if s not in used)
+            else:
+                _, slot = stored.popitem(last=False)
+            stored[key] = slot
+            self.uploads += 1
+            return slot, False
+
+    def forget(self, ip: str, key: Optional[str] = None) -> None:
+        """Forget one palette (e.g. after a failed upload) or all of a device's"""
+        with self._lock:
+            if key is None:
+                self._devices.pop(ip, None)
+            elif ip in self._devices:
+                self._devices[ip].pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                'uploads': self.uploads,
+                'reuses': self.reuses,
+                'devices': {ip: len(stored) for ip, stored in self._devices.items()}
+            }
@@ -0,0 +1,149 @@
+"""
+Local playback clock that extrapolates the Spotify position between polls
+"""
+import logging
+import math
+from time import monotonic
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Events reported by PlaybackClock.update()
+EVENT_START = 'start'
+EVENT_STEADY = 'steady'
+EVENT_SEEK = 'seek'
+EVENT_SKIP = 'skip'
+EVENT_PAUSE = 'pause'
+
+
+class PlaybackClock:
+    """
+    Track the playback position using the local monotonic clock
+
+    Each poll gives a (progress_ms, time) sample. Samples that agree with
+    the extrapolated position refine the anchor and grow the confidence
+    horizon; a sample that disagrees by more than the tolerance means the
+    user seeked, skipped or paused, and resets the anchor with a short
+    horizon. Confidence decays over the horizon, and the caller only needs
+    to poll again when it drops below the threshold or the track ends.
+    """
+
+    def __init__(self, seek_tolerance_s: float = 1.5, min_horizon_s: float = 10.0,
+                 max_horizon_s: float = 120.0, confidence_threshold: float = 0.5):
+        self.seek_tolerance_s = seek_tolerance_s
+        self.min_horizon_s = min_horizon_s
+        self.max_horizon_s = max_horizon_s
+        self.confidence_threshold = confidence_threshold
+
+        self.track_id: Optional[str] = None
+        self.duration_s: Optional[float] = None
+        self.is_playing = False
+        self.last_drift_s = 0.0
+
+        self._anchor_position = 0.0
+        self._anchor_time = 0.0
+        self._horizon_s = min_horizon_s
+
+    def update(self, track: Optional[Dict], requested_at: Optional[float] = None,
+               received_at: Optional[float] = None) -> str:
+        """
+        Feed a currently-playing response into the clock
+
+        Args:
+            track: Spotify currently-playing payload (None if nothing plays)
+            requested_at: Local monotonic time the request was sent
+            received_at: Local monotonic time the response arrived
+
+        Returns:
+            One of 'start', 'steady', 'seek', 'skip' or 'pause'
+        """
+        received_at = received_at if received_at is not None else monotonic()
+        requested_at = requested_at if requested_at is not None else received_at
+
+        if not track or not track.get('is_playing', True) or not track.get('item'):
+            was_playing = self.is_playing
+            self.is_playing = False
+            return EVENT_PAUSE if was_playing else EVENT_STEADY
+
+        item = track['item']
+        track_id = item.get('id')
+        duration_ms = item.get('duration_ms')
+        # The server sampled progress somewhere during the round trip
+        sample_time = (requested_at + received_at) / 2
+        progress = track.get('progress_ms', 0) / 1000.0
+
+        if track_id != self.track_id:
+            event = EVENT_SKIP if self.track_id is not None else EVENT_START
+            self._reset(track_id, duration_ms, progress, sample_time)
+            return event
+
+        if not self.is_playing:
+            self._reset(track_id, duration_ms, progress, sample_time)
+            return EVENT_START
+
+        drift = progress - self._extrapolate(sample_time)
+        self.last_drift_s = drift
+
+        if abs(drift) > self.seek_tolerance_s:
+            self._reset(track_id, duration_ms, progress, sample_time)
+            return EVENT_SEEK
+
+        # Consistent sample: blend it in and trust the clock for longer
+        self._anchor_position = self._extrapolate(sample_time) + drift / 2
+        self._anchor_time = sample_time
+        self._horizon_s = min(self.max_horizon_s, self._horizon_s * 2)
+        return EVENT_STEADY
+
+    def position(self, now: Optional[float] = None) -> Optional[float]:
+        """Extrapolated playback position in seconds, or None when not playing"""
+        if not self.is_playing:
+            return None
+        position = self._extrapolate(now if now is not None else monotonic())
+        if self.duration_s is not None:
+            position = min(position, self.duration_s)
+        return position
+
+    def confidence(self, now: Optional[float] = None) -> float:
+        """Confidence (0-1) that position() is still correct"""
+        if not self.is_playing:
+            return 0.0
+        elapsed = (now if now is not None else monotonic()) - self._anchor_time
+        return math.exp(-max(0.0, elapsed) / self._horizon_s)
+
+    def next_poll_in(self, interval: float, max_interval: Optional[float] = None,
+                     now: Optional[float] = None) -> float:
+        """
+        Seconds until the next poll is needed
+
+        While nothing plays this is `interval`. During playback it is the
+        moment confidence drops below the threshold: sooner than `interval`
+        right after a seek or skip, later once samples keep agreeing, but
+        never past `max_interval` (manual skips and pauses are only seen
+        when polling) or just after the current track ends.
+        """
+        if not self.is_playing:
+            return interval
+
+        now = now if now is not None else monotonic()
+        elapsed = now - self._anchor_time
+        delay = -math.log(self.confidence_threshold) * self._horizon_s - elapsed
+        if max_interval is not None:
+            delay = min(delay, max(interval, max_interval))
+
+        if self.duration_s is not None:
+            remaining = self.duration_s - self._extrapolate(now)
+            delay = min(delay, remaining + 0.5)
+
+        return max(0.5, delay)
+
+    def _extrapolate(self, at: float) -> float:
+        return self._anchor_position + (at - self._anchor_time)
+
+    def _reset(self, track_id: Optional[str], duration_ms: Optional[int],
+               progress: float, sample_time: float) -> None:
+        self.track_id = track_id
+        self.duration_s = duration_ms / 1000.0 if duration_ms else None
+        self.is_playing = True
+        self._anchor_position = progress
+        self._anchor_time = sample_time
+        self._horizon_s = self.min_horizon_s
@@ -0,0 +1,144 @@
+"""
+Cached hostname resolution for WLED device addresses
+"""
+import ipaddress
+import logging
+import socket
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from time import monotonic
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def is_address(host: str) -> bool:
+    """True for IPv4/IPv6 literals, which need no lookup"""
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+def format_host(address: str) -> str:
+    """Address as it goes into a URL (IPv6 in brackets)"""
+    return f"[{address}]" if ':' in address else address
+
+
+@dataclass
+class _Entry:
+    address: Optional[str]
+    expires_at: float
+    failures: int = 0
+
+
+class HostResolver:
+    """
+    Resolve device hostnames (e.g. wled-kitchen.local) once and cache them
+
+    - Entries live for `ttl_s`; after that the cached address keeps being
+      served while a background lookup refreshes it.
+    - Failed names are cached for `negative_ttl_s`, so an unreachable name
+      costs one lookup, not one per push. A name that resolved before
+      keeps its last address until a refresh succeeds.
+    - prefetch() resolves many names concurrently.
+    """
+
+    def __init__(self, ttl_s: float = 300.0, negative_ttl_s: float = 30.0, max_workers: int = 8):
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.max_workers = max_workers
+        self._entries: Dict[str, _Entry] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.lookups = 0
+        self.failures = 0
+
+    def resolve(self, host: str) -> Optional[str]:
+        """
+        Address of a host
+
+        Only blocks the first time a name is seen (or while it is being
+        prefetched); afterwards this is a dictionary lookup.
+
+        Returns:
+            IP address, or None if the name does not resolve
+        """
+        if is_address(host):
+            return host
+
+        entry = self._entries.get(host)
+        if entry is None:
+            return self._refresh(host).result()
+        if monotonic() >= entry.expires_at:
+            self._refresh(host)
+        return entry.address
+
+    def prefetch(self, hosts: Iterable[str], wait_for_results: bool = True) -> None:
+        """Resolve hostnames concurrently (e.g. at startup or after a config change)"""
+        futures = [self._refresh(host) for host in set(hosts) if not is_address(host)]
+        if futures and wait_for_results:
+            wait(futures)
+
+    def _refresh(self, host: str) -> Future:
+        with self._lock:
+            future = self._pending.get(host)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='resolver')
+                future = self._pending[host] = self._executor.submit(self._lookup, host)
+            return future
+
+    def _lookup(self, host: str) -> Optional[str]:
+        address = None
+        try:
+            infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            # WLED is reached over IPv4 on most networks
+            ipv4 = [info for info in infos if info[0] == socket.AF_INET]
+            address = (ipv4 or infos)[0][4][0]
+        except (OSError, IndexError) as e:
+            logger.warning(f"Could not resolve WLED host {host}: {e}")
+
+        with self._lock:
+            self.lookups += 1
+            self._pending.pop(host, None)
+            old = self._entries.get(host)
+            if address:
+                if old and old.address and old.address != address:
+                    logger.info(f"WLED host {host} moved from {old.address} to {address}")
+                self._entries[host] = _Entry(address, monotonic() + self.ttl_s)
+            else:
+                self.failures += 1
+                self._entries[host] = _Entry(
+                    old.address if old else None,
+                    monotonic() + self.negative_ttl_s,
+                    (old.failures if old else 0) + 1
+                )
+            return self._entries[host].address
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cached names and lookup counters"""
+        now = monotonic()
+        with self._lock:
+            return {
+                'lookups': self.lookups,
+                'failures': self.failures,
+                'hosts': {
+                    host: {
+                        'address': entry.address,
+                        'expires_in_seconds': round(entry.expires_at - now, 1),
+                        'consecutive_failures': entry.failures
+                    }
+                    for host, entry in self._entries.items()
+                }
+            }
+
+    def close(self) -> None:
+        """Stop the lookup threads"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
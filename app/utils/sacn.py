@@ -0,0 +1,208 @@
+"""
+E1.31 (sACN) multicast output
+"""
+import logging
+import socket
+import struct
+import threading
+import uuid
+from time import monotonic
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SACN_PORT = 5568
+DMX_CHANNELS = 512
+MAX_UNIVERSE = 63999
+DEFAULT_PRIORITY = 100
+MAX_PRIORITY = 200
+
+ACN_PACKET_IDENTIFIER = b'ASC-E1.17\x00\x00\x00'
+VECTOR_ROOT_E131_DATA = 0x00000004
+VECTOR_E131_DATA_PACKET = 0x00000002
+VECTOR_DMP_SET_PROPERTY = 0x02
+OPTION_STREAM_TERMINATED = 0x40
+
+# Root (38) + framing (77) + DMP (10) + DMX start code (1)
+HEADER_SIZE = 126
+
+
+def multicast_group(universe: int) -> str:
+    """Multicast address of a universe (239.255.<hi>.<lo>)"""
+    return f"239.255.{universe >> 8}.{universe & 0xFF}"
+
+
+def build_universe_map(outputs: Iterable[Dict[str, Any]]) -> Dict[int, List[Tuple[int, int]]]:
+    """
+    Map devices/segments onto DMX universes
+
+    Each output is a dict with `universe`, `led_count` and optionally
+    `start_channel` (1-based DMX address, default 1). As in WLED's
+    multi-RGB mode, pixels never straddle two universes: a strip that does
+    not fit continues at channel 1 of the following universe.
+
+    Returns:
+        Mapping of universe to a list of (channel offset, LED count) runs
+
+    Raises:
+        ValueError: On an invalid universe, start channel or LED count
+    """
+    universes: Dict[int, List[Tuple[int, int]]] = {}
+    for output in outputs:
+        universe = int(output.get('universe', 0))
+        offset = int(output.get('start_channel', 1)) - 1
+        remaining = int(output.get('led_count', 0))
+        if not 1 <= universe <= MAX_UNIVERSE:
+            raise ValueError(f"sACN universe must be 1-{MAX_UNIVERSE}, got {universe}")
+        if not 0 <= offset < DMX_CHANNELS:
+            raise ValueError(f"sACN start channel must be 1-{DMX_CHANNELS}, got {offset + 1}")
+        if remaining < 1:
+            raise ValueError(f"sACN output on universe {universe} needs a positive led_count")
+
+        while remaining > 0:
+            if universe > MAX_UNIVERSE:
+                raise ValueError("sACN output runs past the last universe")
+            fit = min(remaining, (DMX_CHANNELS - offset) // 3)
+            if fit:
+                universes.setdefault(universe, []).append((offset, fit))
+                remaining -= fit
+            universe += 1
+            offset = 0
+    return universes
+
+
+def build_packet(universe: int, data: bytes, sequence: int, cid: bytes,
+                 source_name: str = 'SpotifyToWLED', priority: int = DEFAULT_PRIORITY,
+                 options: int = 0) -> bytes:
+    """
+    Build an E1.31 data packet
+
+    Args:
+        universe: Universe number (1-63999)
+        data: DMX channel values (at most 512)
+        sequence: Sequence number (0-255)
+        cid: 16-byte component identifier of the source
+        source_name: Human readable source name
+        priority: Source priority (0-200), higher wins at the receiver
+        options: Options byte (e.g. OPTION_STREAM_TERMINATED)
+    """
+    length = HEADER_SIZE + len(data)
+    name = source_name.encode('utf-8')[:63].ljust(64, b'\x00')
+    root = struct.pack(
+        '!HH12sHI16s',
+        0x0010, 0x0000, ACN_PACKET_IDENTIFIER,
+        0x7000 | (length - 16), VECTOR_ROOT_E131_DATA, cid
+    )
+    framing = struct.pack(
+        '!HI64sBHBBH',
+        0x7000 | (length - 38), VECTOR_E131_DATA_PACKET, name,
+        priority, 0, sequence & 0xFF, options, universe
+    )
+    dmp = struct.pack(
+        '!HBBHHHB',
+        0x7000 | (length - 115), VECTOR_DMP_SET_PROPERTY, 0xA1,
+        0x0000, 0x0001, len(data) + 1, 0x00
+    )
+    return root + framing + dmp + bytes(data)
+
+
+class SACNSender:
+    """
+    Send solid-color frames to an installation over E1.31 multicast
+
+    One packet per universe and frame reaches every controller listening on
+    that universe, however many there are. The last frame is re-sent as a
+    keep-alive so receivers do not drop out of realtime mode while the
+    color stays the same, and close() tells them the stream has ended.
+    """
+
+    def __init__(self, outputs: Iterable[Dict[str, Any]], source_name: str = 'SpotifyToWLED',
+                 priority: int = DEFAULT_PRIORITY, port: int = SACN_PORT,
+                 destination: Optional[str] = None, multicast_ttl: int = 1,
+                 keepalive_s: float = 1.0):
+        self.universes = build_universe_map(outputs)
+        self.source_name = source_name
+        self.priority = max(0, min(MAX_PRIORITY, int(priority)))
+        self.port = port
+        # Unicast destination instead of the per-universe multicast groups
+        self.destination = destination
+        self.keepalive_s = keepalive_s
+        self.cid = uuid.uuid4().bytes
+        self.packets_sent = 0
+
+        self._sequence = {universe: 0 for universe in self.universes}
+        self._frame: Dict[int, bytes] = {}
+        self._last_sent = 0.0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._keepalive: Optional[threading.Thread] = None
+
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+        self._sock.setblocking(False)
+
+    def build_frame(self, color: Tuple[int, int, int]) -> Dict[int, bytes]:
+        """DMX data for every universe with all mapped LEDs set to `color`"""
+        pixel = bytes(max(0, min(255, int(c))) for c in color)
+        frame = {}
+        for universe, runs in self.universes.items():
+            data = bytearray(max(offset + count * 3 for offset, count in runs))
+            for offset, count in runs:
+                data[offset:offset + count * 3] = pixel * count
+            frame[universe] = bytes(data)
+        return frame
+
+    def send_color(self, color: Tuple[int, int, int]) -> int:
+        """
+        Send a color to all mapped universes
+
+        Returns:
+            Number of packets sent
+        """
+        frame = self.build_frame(color)
+        with self._lock:
+            self._frame = frame
+            sent = self._send_frame(frame)
+        self._ensure_keepalive()
+        return sent
+
+    def _send_frame(self, frame: Dict[int, bytes], options: int = 0) -> int:
+        # Caller holds self._lock
+        sent = 0
+        for universe, data in frame.items():
+            sequence = self._sequence[universe]
+            self._sequence[universe] = (sequence + 1) & 0xFF
+            packet = build_packet(universe, data, sequence, self.cid,
+                                  self.source_name, self.priority, options)
+            address = self.destination or multicast_group(universe)
+            try:
+                self._sock.sendto(packet, (address, self.port))
+                sent += 1
+            except OSError as e:
+                logger.debug(f"sACN send to universe {universe} failed: {e}")
+        self.packets_sent += sent
+        self._last_sent = monotonic()
+        return sent
+
+    def _ensure_keepalive(self) -> None:
+        if self.keepalive_s and (self._keepalive is None or not self._keepalive.is_alive()):
+            self._keepalive = threading.Thread(target=self._run_keepalive,
+                                               name='sacn-keepalive', daemon=True)
+            self._keepalive.start()
+
+    def _run_keepalive(self) -> None:
+        while not self._stopped.wait(self.keepalive_s / 2):
+            with self._lock:
+                if self._frame and monotonic() - self._last_sent >= self.keepalive_s:
+                    self._send_frame(self._frame)
+
+    def close(self) -> None:
+        """Stop the keep-alive, signal stream termination and close the socket"""
+        self._stopped.set()
+        with self._lock:
+            if self._frame:
+                # E1.31 asks for three terminated packets so receivers release at once
+                for _ in range(3):
+                    self._send_frame(self._frame, OPTION_STREAM_TERMINATED)
+                self._frame = {}
+            self._sock.close()
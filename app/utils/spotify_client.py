@@ -0,0 +1,137 @@
+"""
+Rate-limit-aware wrapper around the Spotify Web API client
+"""
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Request priorities: essential calls (current-track polling) may use the
+# whole budget, background calls (prefetch, analysis) only the part above
+# the reserve
+PRIORITY_ESSENTIAL = 0
+PRIORITY_BACKGROUND = 1
+
+
+class RateLimitedError(Exception):
+    """Raised when Spotify is throttling us or the request budget is spent"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimitedClient:
+    """
+    Shared request budget for all Spotify API calls
+
+    A token bucket refilled at `requests_per_minute` limits the overall
+    request rate. Background calls are refused while the bucket is below
+    the reserve, so they never starve polling. A 429 response blocks every
+    caller until its Retry-After has passed.
+    """
+
+    def __init__(self, requests_per_minute: int = 60, burst: Optional[int] = None,
+                 background_reserve: float = 0.5):
+        self.refill_per_s = max(1, requests_per_minute) / 60.0
+        self.capacity = float(burst or max(1, requests_per_minute // 4))
+        self.background_reserve = background_reserve
+
+        self._tokens = self.capacity
+        self._updated = monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+        self.calls = 0
+        self.throttled = 0
+        self.rejected_background = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_s)
+        self._updated = now
+
+    def acquire(self, priority: int = PRIORITY_ESSENTIAL, timeout: float = 0.0) -> None:
+        """
+        Take one request from the budget
+
+        Args:
+            priority: PRIORITY_ESSENTIAL or PRIORITY_BACKGROUND
+            timeout: Seconds to wait for the budget to refill
+
+        Raises:
+            RateLimitedError: If no budget is available in time
+        """
+        floor = self.capacity * self.background_reserve if priority >= PRIORITY_BACKGROUND else 0.0
+        deadline = monotonic() + timeout
+
+        with self._cond:
+            while True:
+                now = monotonic()
+                if now < self._blocked_until:
+                    raise RateLimitedError("Spotify rate limit in effect", self._blocked_until - now)
+
+                self._refill(now)
+                if self._tokens - 1 >= floor:
+                    self._tokens -= 1
+                    return
+
+                wait = (floor + 1 - self._tokens) / self.refill_per_s
+                if now + wait > deadline:
+                    if priority >= PRIORITY_BACKGROUND:
+                        self.rejected_background += 1
+                    raise RateLimitedError("Spotify request budget exhausted", wait)
+                self._cond.wait(wait)
+
+    def call(self, fn: Callable[..., Any], *args: Any, priority: int = PRIORITY_ESSENTIAL,
+             timeout: float = 0.0, **kwargs: Any) -> Any:
+        """
+        Call a spotipy method within the budget
+
+        Raises:
+            RateLimitedError: On a 429 response or when the budget is spent
+        """
+        self.acquire(priority, timeout)
+        self.calls += 1
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if getattr(e, 'http_status', None) == 429:
+                retry_after = self._parse_retry_after(getattr(e, 'headers', None))
+                self.throttle(retry_after)
+                raise RateLimitedError("Spotify returned 429 Too Many Requests", retry_after) from e
+            raise
+
+    def throttle(self, retry_after: float) -> None:
+        """Block all callers for `retry_after` seconds"""
+        with self._cond:
+            self.throttled += 1
+            self._blocked_until = max(self._blocked_until, monotonic() + retry_after)
+            # Don't burst the moment the block lifts
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+        logger.warning(f"Spotify rate limit hit, pausing API calls for {retry_after:.0f}s")
+
+    @staticmethod
+    def _parse_retry_after(headers: Optional[Dict[str, str]]) -> float:
+        try:
+            return max(1.0, float((headers or {}).get('Retry-After', 5)))
+        except (TypeError, ValueError):
+            return 5.0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Budget and throttling metrics"""
+        with self._cond:
+            now = monotonic()
+            if now >= self._updated:
+                self._refill(now)
+            return {
+                'budget_remaining': round(self._tokens, 2),
+                'budget_capacity': self.capacity,
+                'refill_per_second': round(self.refill_per_s, 3),
+                'blocked_for_seconds': round(max(0.0, self._blocked_until - now), 1),
+                'calls': self.calls,
+                'throttled': self.throttled,
+                'rejected_background': self.rejected_background
+            }
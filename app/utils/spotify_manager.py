@@ -1,11 +1,18 @@
 """
 Spotify API manager with improved error handling
 """
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth
 import logging
 import os
-from typing import Optional, Dict
+from collections import OrderedDict
+from typing import Any, Optional, Dict
+
+from app.utils.lazy import lazy_import
+from app.utils.spotify_client import (
+    RateLimitedClient, RateLimitedError, PRIORITY_BACKGROUND, PRIORITY_ESSENTIAL
+)
+
+requests = lazy_import('requests')
+spotipy = lazy_import('spotipy')
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +21,8 @@ class SpotifyManager:
     """Manage Spotify API interactions with caching"""
     
     def __init__(self, client_id: str, client_secret: str, 
-                 redirect_uri: str, scope: str, cache_path: str = None):
+                 redirect_uri: str, scope: str, cache_path: str = None,
+                 requests_per_minute: int = 60):
         self.client_id = client_id
         self.client_secret = client_secret
         self.redirect_uri = redirect_uri
@@ -25,9 +33,14 @@ class SpotifyManager:
         )
         self._sp = None
         self._auth_manager = None
+        self._token_refresher = None
+        # Request budget shared by every API call made through this manager
+        self.api = RateLimitedClient(requests_per_minute=requests_per_minute)
         self._last_track_id = None
         self._track_cache = {}
         self._cache_duration = 5
+        self._analysis_cache: "OrderedDict[str, Dict]" = OrderedDict()
+        self._analysis_cache_size = 20
     
     def authenticate(self) -> bool:
         """
@@ -36,19 +49,27 @@ class SpotifyManager:
         Returns:
             True if successful, False otherwise
         """
+        from app.utils.token_cache import MemoryTokenCache, TokenRefresher
+        
         try:
-            self._auth_manager = SpotifyOAuth(
+            # Token lives in memory and is refreshed ahead of expiry in the
+            # background, so API calls never block on a refresh
+            token_cache = MemoryTokenCache(self.cache_path)
+            self._auth_manager = spotipy.SpotifyOAuth(
                 client_id=self.client_id,
                 client_secret=self.client_secret,
                 redirect_uri=self.redirect_uri,
                 scope=self.scope,
-                cache_path=self.cache_path,
+                cache_handler=token_cache,
                 open_browser=False  # Don't try to open browser in Docker/headless
             )
-            self._sp = spotipy.Spotify(auth_manager=self._auth_manager)
+            self.close()
+            self._token_refresher = TokenRefresher(self._auth_manager, token_cache)
+            self._token_refresher.start()
+            self._sp = self._create_client()
             
             # Test the connection
-            self._sp.current_user()
+            self.api.call(self._sp.current_user, timeout=5)
             logger.info("✓ Successfully authenticated with Spotify")
             return True
             
@@ -57,6 +78,34 @@ class SpotifyManager:
             self._sp = None
             return False
     
+    def _create_client(self):
+        """
+        Create the spotipy client
+        
+        429 must reach RateLimitedClient (and its Retry-After) on the first
+        response. Leaving it out of status_forcelist is not enough: urllib3
+        still retries any response carrying Retry-After and sleeps inline,
+        so the session's retries ignore that header altogether.
+        """
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retry = Retry(
+            total=3,
+            connect=None,
+            read=False,
+            allowed_methods=frozenset(['GET', 'POST', 'PUT', 'DELETE']),
+            status=3,
+            backoff_factor=0.3,
+            status_forcelist=(500, 502, 503, 504),
+            respect_retry_after_header=False
+        )
+        session = requests.Session()
+        adapter = HTTPAdapter(max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return spotipy.Spotify(auth_manager=self._auth_manager, requests_session=session)
+    
     def get_auth_url(self) -> Optional[str]:
         """
         Get the authorization URL for OAuth flow
@@ -90,7 +139,7 @@ class SpotifyManager:
             
             if token_info:
                 # Re-initialize Spotify client with the new token
-                self._sp = spotipy.Spotify(auth_manager=self._auth_manager)
+                self._sp = self._create_client()
                 logger.info("✓ Successfully authenticated with Spotify via callback")
                 return True
             else:
@@ -107,13 +156,20 @@ class SpotifyManager:
         
         Returns:
             Track info dict or None if nothing is playing
+        
+        Raises:
+            RateLimitedError: If Spotify is throttling us (not "nothing playing")
         """
         if not self._sp:
             logger.warning("Not authenticated with Spotify")
             return None
         
         try:
-            current_track = self._sp.current_user_playing_track()
+            current_track = self.api.call(
+                self._sp.current_user_playing_track,
+                priority=PRIORITY_ESSENTIAL,
+                timeout=5
+            )
             
             if not current_track or not current_track.get("item"):
                 logger.debug("No track currently playing")
@@ -125,6 +181,8 @@ class SpotifyManager:
             
             return current_track
             
+        except RateLimitedError:
+            raise
         except Exception as e:
             logger.error(f"Error fetching current track: {e}")
             return None
@@ -189,6 +247,83 @@ class SpotifyManager:
         
         return False
     
+    def get_audio_analysis(self, track_id: str) -> Optional[Dict]:
+        """
+        Get audio analysis (beats, bars, segments) for a track
+        
+        Results are cached per track, so each track is fetched at most once.
+        
+        Returns:
+            Audio analysis dict or None if unavailable
+        """
+        if track_id in self._analysis_cache:
+            self._analysis_cache.move_to_end(track_id)
+            return self._analysis_cache[track_id]
+        
+        if not self._sp or not track_id:
+            return None
+        
+        try:
+            analysis = self.api.call(self._sp.audio_analysis, track_id, priority=PRIORITY_BACKGROUND)
+        except RateLimitedError as e:
+            logger.info(f"Skipping audio analysis for {track_id}: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Error fetching audio analysis for {track_id}: {e}")
+            return None
+        
+        if analysis:
+            self._analysis_cache[track_id] = analysis
+            while len(self._analysis_cache) > self._analysis_cache_size:
+                self._analysis_cache.popitem(last=False)
+        return analysis
+    
+    def get_saved_albums(self, offset: int = 0, limit: int = 50, timeout: float = 0.0) -> Optional[Dict]:
+        """
+        One page of the user's saved albums (needs user-library-read)
+        
+        Like every library call, this runs at background priority.
+        
+        Returns:
+            Spotify paging object or None on error
+        
+        Raises:
+            RateLimitedError: If no background budget is left or Spotify is throttling us
+        """
+        return self._library_page('saved albums', 'current_user_saved_albums', timeout,
+                                  limit=limit, offset=offset)
+    
+    def get_playlists(self, offset: int = 0, limit: int = 50, timeout: float = 0.0) -> Optional[Dict]:
+        """One page of the user's playlists (needs playlist-read-private), see get_saved_albums"""
+        return self._library_page('playlists', 'current_user_playlists', timeout,
+                                  limit=limit, offset=offset)
+    
+    def get_playlist_items(self, playlist_id: str, offset: int = 0, limit: int = 100,
+                           timeout: float = 0.0) -> Optional[Dict]:
+        """One page of a playlist's tracks, album covers only, see get_saved_albums"""
+        return self._library_page(f"playlist {playlist_id}", 'playlist_items', timeout, playlist_id,
+                                  fields='items(track(album(images))),next,total',
+                                  additional_types=('track',), limit=limit, offset=offset)
+    
+    def _library_page(self, what: str, method: str, timeout: float, *args: Any, **kwargs: Any) -> Optional[Dict]:
+        if not self._sp:
+            logger.warning("Not authenticated with Spotify")
+            return None
+        try:
+            return self.api.call(getattr(self._sp, method), *args, priority=PRIORITY_BACKGROUND,
+                                 timeout=timeout, **kwargs)
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            logger.error(f"Error fetching {what}: {e}")
+            return None
+    
+    def close(self) -> None:
+        """Stop background token refreshing"""
+        if self._token_refresher:
+            self._token_refresher.stop()
+            self._token_refresher = None
+    
     @property
     def is_authenticated(self) -> bool:
         """Check if authenticated"""
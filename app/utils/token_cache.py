@@ -0,0 +1,154 @@
+"""
+In-memory Spotify token cache with proactive background refresh
+"""
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+from time import time
+from typing import Callable, Dict, Optional
+
+from app.utils.lazy import lazy_import
+
+# Must be the same (lazily loaded) spotipy that SpotifyOAuth checks against
+spotipy = lazy_import('spotipy')
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryTokenCache(spotipy.CacheHandler):
+    """
+    spotipy cache handler that keeps the token in memory
+
+    The cache file is read once. Writes happen only when the token actually
+    changes and go through a temporary file plus rename, so a crash never
+    leaves a truncated cache behind.
+    """
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._token: Optional[Dict] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.on_change: Optional[Callable[[Dict], None]] = None
+
+    def get_cached_token(self) -> Optional[Dict]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._token = self._read_file()
+                    self._loaded = True
+        return self._token
+
+    def save_token_to_cache(self, token_info: Dict) -> None:
+        with self._lock:
+            self._loaded = True
+            if token_info == self._token:
+                return
+            self._token = dict(token_info)
+            self._write_file(self._token)
+        if self.on_change:
+            self.on_change(self._token)
+
+    def _read_file(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read token cache {self.cache_path}: {e}")
+            return None
+
+    def _write_file(self, token_info: Dict) -> None:
+        directory = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix='.spotify_cache.', dir=directory)
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(token_info, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.chmod(temp_path, 0o600)
+                os.replace(temp_path, self.cache_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write token cache {self.cache_path}: {e}")
+
+
+class TokenRefresher:
+    """
+    Refresh the access token in the background before it expires
+
+    Refreshes happen `margin_s` (plus random jitter) ahead of expiry, well
+    before spotipy would refresh inline, so API calls never wait for a
+    token round-trip.
+    """
+
+    def __init__(self, auth_manager, cache: MemoryTokenCache,
+                 margin_s: float = 300, jitter_s: float = 60, retry_s: float = 30):
+        self.auth_manager = auth_manager
+        self.cache = cache
+        self.margin_s = margin_s
+        self.jitter_s = jitter_s
+        self.retry_s = retry_s
+        self.refresh_count = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._jitter = random.uniform(0, jitter_s)
+        cache.on_change = self._token_changed
+
+    def start(self) -> None:
+        """Start the refresher thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='token-refresher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the refresher thread"""
+        self._stopped.set()
+        self._wake.set()
+
+    def _token_changed(self, token: Dict) -> None:
+        # New token: pick a new jitter and reschedule
+        self._jitter = random.uniform(0, self.jitter_s)
+        self._wake.set()
+
+    def seconds_until_refresh(self) -> Optional[float]:
+        """Delay until the next refresh, or None without a refresh token"""
+        token = self.cache.get_cached_token()
+        if not token or not token.get('refresh_token'):
+            return None
+        expires_at = token.get('expires_at', 0)
+        return expires_at - time() - self.margin_s - self._jitter
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            delay = self.seconds_until_refresh()
+            if delay is None or delay > 0:
+                # Woken early when a new token is saved (e.g. after login)
+                self._wake.wait(delay)
+                self._wake.clear()
+                continue
+
+            token = self.cache.get_cached_token()
+            try:
+                self.auth_manager.refresh_access_token(token['refresh_token'])
+                self.refresh_count += 1
+                logger.debug("Spotify access token refreshed in background")
+            except Exception as e:
+                logger.warning(f"Background token refresh failed: {e}")
+                self._stopped.wait(self.retry_s)
+                continue
+
+            # Guard against a refresh that did not extend the expiry
+            delay = self.seconds_until_refresh()
+            if delay is not None and delay <= 0:
+                self._stopped.wait(self.retry_s)
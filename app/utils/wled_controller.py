@@ -1,29 +1,62 @@
 """
 WLED device controller with retry logic and health checks
 """
-import requests
+import json
 import logging
-from typing import Dict, List, Optional
-from time import sleep
+from typing import Any, Dict, List, Optional
+from time import monotonic, sleep
+
+from app.utils.lazy import lazy_import
+from app.utils.resolver import HostResolver, format_host
+
+requests = lazy_import('requests')
 
 logger = logging.getLogger(__name__)
 
+# Shortest request timeout left to an attempt when a deadline is close
+MIN_ATTEMPT_TIMEOUT = 0.5
+
 
 class WLEDController:
     """Control WLED devices with improved error handling"""
     
-    def __init__(self, max_retries: int = 3, retry_delay: int = 2):
+    def __init__(self, max_retries: int = 3, retry_delay: int = 2,
+                 resolver: Optional[HostResolver] = None):
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        # Hostnames in WLED_IPS are looked up here instead of on every request
+        self.resolver = resolver
         self._device_status = {}  # Track device health
     
-    def set_color(self, ip: str, r: int, g: int, b: int) -> bool:
+    def _url(self, ip: str, path: str) -> str:
+        """
+        URL of a device endpoint, using the cached address of hostnames
+        
+        Raises:
+            requests.ConnectionError: If the hostname does not resolve
+        """
+        if self.resolver is None:
+            return f"http://{ip}{path}"
+        address = self.resolver.resolve(ip)
+        if address is None:
+            raise requests.ConnectionError(f"Cannot resolve WLED host {ip}")
+        return f"http://{format_host(address)}{path}"
+    
+    def set_color(self, ip: str, r: int, g: int, b: int,
+                  segment_ids: Optional[List[int]] = None, w: Optional[int] = None,
+                  deadline: Optional[float] = None) -> bool:
         """
         Set color on WLED device with retry logic
         
         Args:
             ip: WLED device IP address
             r, g, b: RGB color values (will be clamped to 0-255 for LED compatibility)
+            segment_ids: Segments to color (from the device profile); the
+                first segment only if not given
+            w: White channel value for RGBW strips
+            deadline: monotonic() time by which the color must be set;
+                request timeouts are capped to it and no retry starts after
+                it (the first attempt is always made)
         
         Returns:
             True if successful, False otherwise
@@ -32,20 +65,27 @@ class WLEDController:
         r = max(0, min(255, int(r)))
         g = max(0, min(255, int(g)))
         b = max(0, min(255, int(b)))
+        color = [r, g, b] if w is None else [r, g, b, max(0, min(255, int(w)))]
         
-        url = f"http://{ip}/json/state"
-        payload = {
-            "seg": [{
-                "col": [[r, g, b]]
-            }]
-        }
+        if segment_ids:
+            payload = {"seg": [{"id": seg_id, "col": [color]} for seg_id in segment_ids]}
+        else:
+            payload = {
+                "seg": [{
+                    "col": [color]
+                }]
+            }
         
         for attempt in range(self.max_retries):
+            timeout = 5
+            if deadline is not None:
+                timeout = max(MIN_ATTEMPT_TIMEOUT, min(timeout, deadline - monotonic()))
             try:
-                response = requests.post(url, json=payload, timeout=5)
+                url = self._url(ip, "/json/state")
+                response = requests.post(url, json=payload, timeout=timeout)
                 
                 if response.status_code == 200:
-                    logger.info(f"✓ WLED @ {ip} -> RGB({r}, {g}, {b})")
+                    logger.debug(f"✓ WLED @ {ip} -> RGB({r}, {g}, {b})")
                     self._device_status[ip] = {
                         'status': 'online',
                         'last_success': True
@@ -61,12 +101,16 @@ class WLEDController:
             except Exception as e:
                 logger.error(f"Unexpected error with WLED @ {ip}: {e}")
             
+            if deadline is not None and monotonic() + self.retry_delay >= deadline:
+                logger.warning(f"Out of time for WLED @ {ip}, giving up after {attempt + 1} attempts")
+                break
+            
             # Wait before retry (except on last attempt)
             if attempt < self.max_retries - 1:
                 sleep(self.retry_delay)
         
         # All retries failed
-        logger.error(f"✗ Failed to set color on WLED @ {ip} after {self.max_retries} attempts")
+        logger.error(f"✗ Failed to set color on WLED @ {ip} after {attempt + 1} attempts")
         self._device_status[ip] = {
             'status': 'offline',
             'last_success': False
@@ -96,13 +140,12 @@ class WLEDController:
         Returns:
             True if successful, False otherwise
         """
-        url = f"http://{ip}/json/state"
         payload = {
             "bri": max(0, min(255, brightness))
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=5)
+            response = requests.post(self._url(ip, "/json/state"), json=payload, timeout=5)
             if response.status_code == 200:
                 logger.info(f"✓ WLED @ {ip} brightness set to {brightness}")
                 return True
@@ -124,7 +167,6 @@ class WLEDController:
         Returns:
             True if successful, False otherwise
         """
-        url = f"http://{ip}/json/state"
         payload = {
             "seg": [{
                 "fx": effect_id
@@ -132,7 +174,7 @@ class WLEDController:
         }
         
         try:
-            response = requests.post(url, json=payload, timeout=5)
+            response = requests.post(self._url(ip, "/json/state"), json=payload, timeout=5)
             if response.status_code == 200:
                 logger.info(f"✓ WLED @ {ip} effect set to {effect_id}")
                 return True
@@ -143,6 +185,103 @@ class WLEDController:
             logger.error(f"Error setting effect on WLED @ {ip}: {e}")
             return False
     
+    def upload_palette(self, ip: str, slot: int, palette: Dict[str, Any]) -> bool:
+        """
+        Store a custom palette on WLED device (0.14+)
+        
+        Args:
+            ip: WLED device IP address
+            slot: Custom palette slot (0-9), stored as paletteN.json
+            palette: Palette file contents ({"palette": [position, "rrggbb", ...]})
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        filename = f"palette{slot}.json"
+        files = {"data": (filename, json.dumps(palette, separators=(',', ':')), "application/json")}
+        try:
+            response = requests.post(self._url(ip, "/upload"), files=files, timeout=5)
+            if response.status_code == 200:
+                logger.debug(f"✓ WLED @ {ip} stored {filename}")
+                return True
+            else:
+                logger.warning(f"WLED @ {ip} palette upload failed: {response.status_code}")
+                return False
+        except Exception as e:
+            logger.error(f"Error uploading palette to WLED @ {ip}: {e}")
+            return False
+    
+    def set_palette(self, ip: str, palette_id: int, effect_id: Optional[int] = None,
+                    segment_ids: Optional[List[int]] = None) -> bool:
+        """
+        Select a palette (and optionally the effect showing it)
+        
+        Args:
+            ip: WLED device IP address
+            palette_id: Palette ID (custom palettes count down from 255)
+            effect_id: Effect ID, left unchanged if not given
+            segment_ids: Segments to change; the first segment only if not given
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        segment = {"pal": palette_id}
+        if effect_id is not None:
+            segment["fx"] = effect_id
+        if segment_ids:
+            payload = {"seg": [dict(segment, id=seg_id) for seg_id in segment_ids]}
+        else:
+            payload = {"seg": [segment]}
+        
+        try:
+            response = requests.post(self._url(ip, "/json/state"), json=payload, timeout=5)
+            if response.status_code == 200:
+                logger.debug(f"✓ WLED @ {ip} palette set to {palette_id}")
+                return True
+            else:
+                logger.warning(f"WLED @ {ip} palette change failed: {response.status_code}")
+                return False
+        except Exception as e:
+            logger.error(f"Error setting palette on WLED @ {ip}: {e}")
+            return False
+    
+    def set_sync(self, ip: str, send: Optional[bool] = None, receive: Optional[bool] = None,
+                 send_groups: Optional[int] = None, receive_groups: Optional[int] = None) -> bool:
+        """
+        Configure WLED's UDP sync (notifier on port 21324)
+        
+        Args:
+            ip: WLED device IP address
+            send: Broadcast own state changes
+            receive: Apply state broadcast by other devices
+            send_groups: Sync group bitmask to send to
+            receive_groups: Sync group bitmask to receive from
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        udpn = {}
+        if send is not None:
+            udpn["send"] = send
+        if receive is not None:
+            udpn["recv"] = receive
+        if send_groups is not None:
+            udpn["sgrp"] = send_groups
+        if receive_groups is not None:
+            udpn["rgrp"] = receive_groups
+        
+        try:
+            response = requests.post(self._url(ip, "/json/state"), json={"udpn": udpn}, timeout=5)
+            if response.status_code == 200:
+                logger.debug(f"✓ WLED @ {ip} sync set to {udpn}")
+                return True
+            else:
+                logger.warning(f"WLED @ {ip} sync change failed: {response.status_code}")
+                return False
+        except Exception as e:
+            logger.error(f"Error setting sync on WLED @ {ip}: {e}")
+            return False
+    
     def get_info(self, ip: str) -> Optional[Dict]:
         """
         Get device information
@@ -151,13 +290,28 @@ class WLEDController:
             Device info dict or None if failed
         """
         try:
-            response = requests.get(f"http://{ip}/json/info", timeout=3)
+            response = requests.get(self._url(ip, "/json/info"), timeout=3)
             if response.status_code == 200:
                 return response.json()
         except Exception as e:
             logger.debug(f"Could not get info from WLED @ {ip}: {e}")
         return None
     
+    def get_state_info(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Get device state and information in one request
+        
+        Returns:
+            Dict with 'state' and 'info' or None if failed
+        """
+        try:
+            response = requests.get(self._url(ip, "/json/si"), timeout=3)
+            if response.status_code == 200:
+                return response.json()
+        except Exception as e:
+            logger.debug(f"Could not get state from WLED @ {ip}: {e}")
+        return None
+    
     def health_check(self, ip: str) -> bool:
         """
         Check if WLED device is reachable
@@ -166,7 +320,7 @@ class WLEDController:
             True if device is online, False otherwise
         """
         try:
-            response = requests.get(f"http://{ip}/json/info", timeout=2)
+            response = requests.get(self._url(ip, "/json/info"), timeout=2)
             is_online = response.status_code == 200
             self._device_status[ip] = {
                 'status': 'online' if is_online else 'offline',
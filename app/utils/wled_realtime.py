@@ -0,0 +1,76 @@
+"""
+WLED realtime UDP output (DRGB / DNRGB protocols)
+"""
+import logging
+import socket
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+WLED_REALTIME_PORT = 21324
+
+PROTOCOL_DRGB = 2
+PROTOCOL_DNRGB = 4
+
+# Max LEDs per packet for each protocol (WLED limits)
+DRGB_MAX_LEDS = 490
+DNRGB_MAX_LEDS = 489
+
+
+class WLEDRealtimeSender:
+    """
+    Send solid-color frames to WLED devices over UDP
+
+    One datagram per device and frame (or a few for very long strips), no
+    connection setup and no waiting for a response, so a single thread can
+    drive many devices at animation frame rates.
+    """
+
+    def __init__(self, port: int = WLED_REALTIME_PORT, timeout_s: int = 2):
+        self.port = port
+        # Seconds WLED stays in realtime mode after the last packet
+        self.timeout_s = max(1, min(255, int(timeout_s)))
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def build_packets(self, led_count: int, r: int, g: int, b: int) -> list:
+        """Build the datagrams that set all LEDs of a strip to one color"""
+        pixel = bytes((max(0, min(255, int(r))), max(0, min(255, int(g))), max(0, min(255, int(b)))))
+
+        if led_count <= DRGB_MAX_LEDS:
+            return [bytes((PROTOCOL_DRGB, self.timeout_s)) + pixel * led_count]
+
+        packets = []
+        for start in range(0, led_count, DNRGB_MAX_LEDS):
+            count = min(DNRGB_MAX_LEDS, led_count - start)
+            header = bytes((PROTOCOL_DNRGB, self.timeout_s, start >> 8, start & 0xFF))
+            packets.append(header + pixel * count)
+        return packets
+
+    def send_color(self, devices: Dict[str, int], color: Tuple[int, int, int]) -> int:
+        """
+        Send a color to several devices
+
+        Args:
+            devices: Mapping of device IP to LED count
+            color: RGB tuple
+
+        Returns:
+            Number of datagrams sent
+        """
+        sent = 0
+        packets_by_count = {}
+        for ip, led_count in devices.items():
+            if led_count not in packets_by_count:
+                packets_by_count[led_count] = self.build_packets(led_count, *color)
+            for packet in packets_by_count[led_count]:
+                try:
+                    self._sock.sendto(packet, (ip, self.port))
+                    sent += 1
+                except OSError as e:
+                    logger.debug(f"UDP send to WLED @ {ip} failed: {e}")
+        return sent
+
+    def close(self) -> None:
+        """Close the socket"""
+        self._sock.close()
@@ -0,0 +1,233 @@
+"""
+Live mirror of WLED device state over WebSocket
+"""
+import json
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.utils.lazy import lazy_import
+from app.utils.resolver import format_host
+
+websocket = lazy_import('websocket')
+
+logger = logging.getLogger(__name__)
+
+
+class _Device:
+    """Mirrored state and connection of one device"""
+
+    def __init__(self, ip: str):
+        self.ip = ip
+        self.online: Optional[bool] = None  # None until the first connect attempt
+        self.state: Optional[Dict[str, Any]] = None
+        self.info: Optional[Dict[str, Any]] = None
+        self.updated_at: Optional[float] = None
+        self.ws = None
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+
+class WLEDStateMirror:
+    """
+    Keep a local copy of each device's state via its /ws WebSocket
+
+    WLED pushes its full state whenever anything changes (including from
+    the WLED app or a button), so the mirror always knows whether a device
+    is on and reachable without polling /json/info. Every device has one
+    connection thread that reconnects with exponential backoff.
+    """
+
+    def __init__(self, connect_timeout_s: float = 5.0, ping_interval_s: float = 30.0,
+                 max_backoff_s: float = 30.0,
+                 resolve: Optional[Callable[[str], Optional[str]]] = None):
+        # Hostname lookup (e.g. HostResolver.resolve); names are used as-is without one
+        self._resolve = resolve
+        self.connect_timeout_s = connect_timeout_s
+        self.ping_interval_s = ping_interval_s
+        self.max_backoff_s = max_backoff_s
+        self._devices: Dict[str, _Device] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[str], None]] = []
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(ip)` whenever a device goes on/off or on/offline"""
+        self._listeners.append(listener)
+
+    def watch(self, ips: Iterable[str]) -> None:
+        """Subscribe to exactly these devices, dropping any others"""
+        wanted = set(ips)
+        with self._lock:
+            for ip in list(self._devices):
+                if ip not in wanted:
+                    self._disconnect(self._devices.pop(ip))
+            for ip in wanted:
+                if ip not in self._devices:
+                    device = self._devices[ip] = _Device(ip)
+                    device.thread = threading.Thread(target=self._run, args=(device,),
+                                                     name=f'wled-ws-{ip}', daemon=True)
+                    device.thread.start()
+
+    def stop(self) -> None:
+        """Close all connections"""
+        self.watch([])
+
+    @staticmethod
+    def _disconnect(device: _Device) -> None:
+        device.stopped.set()
+        if device.ws is not None:
+            try:
+                device.ws.close()
+            except Exception:
+                pass
+
+    def _run(self, device: _Device) -> None:
+        backoff = 1.0
+        while not device.stopped.is_set():
+            try:
+                address = self._resolve(device.ip) if self._resolve else device.ip
+                if address is None:
+                    raise ConnectionError("hostname does not resolve")
+                device.ws = websocket.create_connection(
+                    f"ws://{format_host(address)}/ws", timeout=self.connect_timeout_s
+                )
+            except Exception as e:
+                logger.debug(f"WebSocket connect to WLED @ {device.ip} failed: {e}")
+                self._set_online(device, False)
+                device.stopped.wait(backoff)
+                backoff = min(backoff * 2, self.max_backoff_s)
+                continue
+
+            if device.stopped.is_set():
+                device.ws.close()
+                break
+            backoff = 1.0
+            self._set_online(device, True)
+            try:
+                self._receive(device)
+            except Exception as e:
+                if not device.stopped.is_set():
+                    logger.debug(f"WebSocket to WLED @ {device.ip} lost: {e}")
+            finally:
+                try:
+                    device.ws.close()
+                except Exception:
+                    pass
+                device.ws = None
+                if not device.stopped.is_set():
+                    self._set_online(device, False)
+
+    def _receive(self, device: _Device) -> None:
+        ws = device.ws
+        # Ask for the full state right away
+        ws.send('{"v":true}')
+        ws.settimeout(self.ping_interval_s)
+        awaiting_pong = False
+        while not device.stopped.is_set():
+            try:
+                opcode, data = ws.recv_data(control_frame=True)
+            except websocket.WebSocketTimeoutException:
+                if awaiting_pong:
+                    raise ConnectionError("no response to ping")
+                ws.ping()
+                awaiting_pong = True
+                continue
+
+            awaiting_pong = False
+            if opcode == websocket.ABNF.OPCODE_CLOSE:
+                return
+            if opcode == websocket.ABNF.OPCODE_TEXT:
+                self.handle_message(device.ip, data)
+
+    def handle_message(self, ip: str, data: Any) -> None:
+        """Apply a state/info message received from a device"""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(message, dict):
+            return
+
+        device = self._devices.get(ip)
+        if device is None:
+            return
+        was_on = self._is_on(device)
+        if isinstance(message.get('state'), dict):
+            device.state = message['state']
+        if isinstance(message.get('info'), dict):
+            device.info = message['info']
+        device.updated_at = monotonic()
+        if self._is_on(device) != was_on:
+            self._notify(ip)
+
+    def _set_online(self, device: _Device, online: bool) -> None:
+        if device.online != online:
+            device.online = online
+            if not online:
+                device.state = None
+            logger.info(f"WLED @ {device.ip} is {'online' if online else 'offline'}")
+            self._notify(device.ip)
+
+    def _notify(self, ip: str) -> None:
+        for listener in self._listeners:
+            try:
+                listener(ip)
+            except Exception as e:
+                logger.error(f"Error in device state listener: {e}")
+
+    @staticmethod
+    def _is_on(device: _Device) -> Optional[bool]:
+        if not device.online or device.state is None or 'on' not in device.state:
+            return None
+        return bool(device.state['on'])
+
+    def is_online(self, ip: str) -> Optional[bool]:
+        """Whether the device is connected, or None if not known (yet)"""
+        device = self._devices.get(ip)
+        return device.online if device else None
+
+    def is_on(self, ip: str) -> Optional[bool]:
+        """Whether the device is switched on, or None if not known"""
+        device = self._devices.get(ip)
+        return self._is_on(device) if device else None
+
+    def get_state(self, ip: str) -> Optional[Dict[str, Any]]:
+        """Last state received from the device"""
+        device = self._devices.get(ip)
+        return device.state if device and device.online else None
+
+    def seconds_since_update(self, ip: str) -> Optional[float]:
+        """Seconds since the device last pushed anything, None if never"""
+        device = self._devices.get(ip)
+        if device is None or device.updated_at is None:
+            return None
+        return monotonic() - device.updated_at
+
+    def get_info(self, ip: str) -> Optional[Dict[str, Any]]:
+        """Last /json/info received from the device"""
+        device = self._devices.get(ip)
+        return device.info if device and device.online else None
+
+    def all_off(self, ips: Iterable[str]) -> bool:
+        """
+        True if every device is known to be switched off
+
+        Offline or unknown devices count as possibly on, so a device
+        without WebSocket support never pauses syncing.
+        """
+        ips = list(ips)
+        return bool(ips) and all(self.is_on(ip) is False for ip in ips)
+
+    def get_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Mirrored status of every watched device"""
+        now = monotonic()
+        return {
+            ip: {
+                'online': device.online,
+                'on': self._is_on(device),
+                'brightness': (device.state or {}).get('bri'),
+                'updated_seconds_ago': round(now - device.updated_at, 1) if device.updated_at else None
+            }
+            for ip, device in list(self._devices.items())
+        }
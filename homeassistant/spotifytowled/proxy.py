@@ -0,0 +1,159 @@
+"""
+Streaming reverse proxy for Home Assistant integration mode
+
+Forwards every request to the external SpotifyToWLED server over a pooled
+keep-alive session. Request and response bodies are streamed in both
+directions (including server-sent events and other long-lived responses),
+and every response carries a Server-Timing header that separates upstream
+time from proxy overhead.
+"""
+import http.cookiejar
+import logging
+import os
+from time import perf_counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SERVER_URL = os.environ.get('SERVER_URL', '').rstrip('/')
+PROXY_PORT = int(os.environ.get('PROXY_PORT', 5000))
+PROXY_THREADS = int(os.environ.get('PROXY_THREADS', 16))
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+# Hop-by-hop headers (RFC 7230 section 6.1) are never forwarded
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade'
+}
+
+
+class SizedStream:
+    """
+    Request body stream of a known length
+
+    requests sends it with Content-Length and reads it in blocks. A bare
+    stream has no length, so requests would chunk it, and any
+    Content-Length copied from the client would then frame it wrongly.
+    """
+
+    def __init__(self, stream, length: int):
+        self.stream = stream
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+    def __iter__(self):
+        return iter(lambda: self.stream.read(CHUNK_SIZE), b'')
+
+
+def create_session(pool_size: int = PROXY_THREADS) -> requests.Session:
+    """Create a pooled upstream session that never stores cookies"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    # Cookies belong to the individual browser, not to the shared session
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def create_app(server_url: str = SERVER_URL, session: requests.Session = None) -> Flask:
+    """Create the proxy application"""
+    app = Flask(__name__)
+    upstream = session or create_session()
+
+    @app.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
+    @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
+    def proxy(path):
+        """Proxy all requests to the external server"""
+        started = perf_counter()
+        url = f"{server_url}/{path}"
+
+        # Forward query parameters
+        if request.query_string:
+            url = f"{url}?{request.query_string.decode('utf-8')}"
+
+        headers = {key: value for key, value in request.headers
+                   if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() != 'host'}
+
+        # Stream the request body instead of reading it into memory, with
+        # exactly one framing: the client's Content-Length when it sent one,
+        # chunked otherwise
+        body = None
+        if request.content_length:
+            body = SizedStream(request.stream, request.content_length)
+        elif request.headers.get('Transfer-Encoding'):
+            headers = {key: value for key, value in headers.items() if key.lower() != 'content-length'}
+            body = iter(lambda: request.stream.read(CHUNK_SIZE), b'')
+
+        try:
+            upstream_started = perf_counter()
+            resp = upstream.request(
+                method=request.method,
+                url=url,
+                headers=headers,
+                data=body,
+                allow_redirects=False,
+                stream=True,
+                timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)
+            )
+            upstream_ms = (perf_counter() - upstream_started) * 1000
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Proxy error for {request.method} {url}: {e}")
+            return jsonify({'error': 'Unable to connect to external server', 'details': str(e)}), 502
+
+        # Body bytes are passed through undecoded, so Content-Encoding and
+        # Content-Length stay valid; chunked responses are re-chunked
+        chunked = resp.raw.chunked
+        response_headers = [
+            (name, value) for name, value in resp.raw.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+            and not (chunked and name.lower() == 'content-length')
+        ]
+        proxy_ms = (perf_counter() - started) * 1000 - upstream_ms
+        response_headers.append(
+            ('Server-Timing', f'upstream;dur={upstream_ms:.1f}, proxy;dur={proxy_ms:.1f}')
+        )
+
+        def generate():
+            try:
+                # Chunked bodies (e.g. SSE) are relayed chunk by chunk as they
+                # arrive; fixed-length bodies in bounded blocks
+                for chunk in resp.raw.stream(None if chunked else CHUNK_SIZE, decode_content=False):
+                    yield chunk
+            finally:
+                resp.close()
+
+        response = Response(stream_with_context(generate()), resp.status_code, response_headers)
+        # Let Flask/werkzeug keep the upstream Content-Type verbatim
+        response.direct_passthrough = True
+        return response
+
+    return app
+
+
+def main():
+    """Serve the proxy with a multi-threaded production server if available"""
+    app = create_app()
+    logger.info(f"Starting proxy to {SERVER_URL} on port {PROXY_PORT}")
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress not installed, falling back to the threaded development server")
+        app.run(host='0.0.0.0', port=PROXY_PORT, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=PROXY_PORT, threads=PROXY_THREADS)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,66 +20,7 @@ if [ "$MODE" = "integration" ]; then
     
     bashio::log.info "External server: ${SERVER_URL}"
     
-    # Create a simple proxy using Python Flask
-    cat > /app/proxy.py << 'EOFPROXY'
-import os
-import requests
-from flask import Flask, request, jsonify, redirect, Response
-import logging
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-app = Flask(__name__)
-SERVER_URL = os.environ.get('SERVER_URL', '').rstrip('/')
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
-def proxy(path):
-    """Proxy all requests to the external server"""
-    url = f"{SERVER_URL}/{path}"
-    
-    # Forward query parameters
-    if request.query_string:
-        url = f"{url}?{request.query_string.decode('utf-8')}"
-    
-    logger.info(f"Proxying {request.method} {url}")
-    
-    try:
-        # Prepare headers (exclude host)
-        headers = {key: value for key, value in request.headers if key.lower() != 'host'}
-        
-        # Make request to external server
-        resp = requests.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            data=request.get_data(),
-            cookies=request.cookies,
-            allow_redirects=False,
-            timeout=30
-        )
-        
-        # Return response
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-        response_headers = [(name, value) for name, value in resp.raw.headers.items()
-                          if name.lower() not in excluded_headers]
-        
-        return Response(resp.content, resp.status_code, response_headers)
-        
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Proxy error: {e}")
-        return jsonify({'error': 'Unable to connect to external server', 'details': str(e)}), 502
-
-if __name__ == '__main__':
-    logger.info(f"Starting proxy to {SERVER_URL}")
-    app.run(host='0.0.0.0', port=5000, debug=False)
-EOFPROXY
-    
-    # Install requests if not available
-    pip3 install --no-cache-dir requests 2>/dev/null || true
-    
-    # Set environment and start proxy
+    # Start the streaming reverse proxy (pooled upstream connections)
     export SERVER_URL="${SERVER_URL}"
     exec python3 /app/proxy.py
     
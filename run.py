@@ -9,7 +9,11 @@ import os
 # Add the project directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from app.main import main
-
 if __name__ == '__main__':
+    if '--headless' in sys.argv[1:]:
+        # Sync engine only: Flask and the web UI are never imported
+        from app.core.daemon import main as headless_main
+        sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != '--headless']))
+    
+    from app.main import main
     main()
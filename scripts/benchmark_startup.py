@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Startup time and resident memory of the web UI vs. the headless daemon
+
+    python scripts/benchmark_startup.py [--runs 5]
+
+Each entry point is set up in a fresh interpreter, up to the point where
+it would start serving: the web UI creates the Flask app and the sync
+engine, the daemon only the engine. Reported are the median wall time of
+imports plus setup, the peak resident set size and the number of loaded
+modules.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBES = {
+    'web': """
+from app.main import create_app
+from app.core.sync_engine import get_sync_engine
+create_app()
+get_sync_engine()
+""",
+    'headless': """
+from app.core.daemon import Daemon
+from app.core.config import get_config
+from app.core.sync_engine import SyncEngine
+Daemon(SyncEngine(get_config()))
+""",
+}
+
+WRAPPER = """
+import json, resource, sys
+from time import perf_counter
+started = perf_counter()
+%s
+elapsed = perf_counter() - started
+print(json.dumps({
+    'elapsed_ms': elapsed * 1000,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'flask_loaded': 'flask' in sys.modules,
+}))
+"""
+
+
+def measure(probe: str, workdir: str) -> dict:
+    env = dict(os.environ,
+               CONFIG_PATH=os.path.join(workdir, 'config.json'),
+               LOG_PATH=os.path.join(workdir, 'benchmark.log'),
+               LOG_LEVEL='WARNING')
+    env.pop('SYNC_WORKER_ADDRESS', None)
+    output = subprocess.run(
+        [sys.executable, '-c', WRAPPER % probe],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<12} {'startup ms':>11} {'peak RSS MB':>12} {'modules':>8} {'flask':>6}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, probe in PROBES.items():
+            runs = [measure(probe, workdir) for _ in range(args.runs)]
+            print(f"{name:<12} "
+                  f"{statistics.median(r['elapsed_ms'] for r in runs):>11.0f} "
+                  f"{statistics.median(r['max_rss_mb'] for r in runs):>12.1f} "
+                  f"{runs[0]['modules']:>8} "
+                  f"{'yes' if runs[0]['flask_loaded'] else 'no':>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Unit tests for atomic file writes
+"""
+import json
+import os
+import tempfile
+import unittest
+from app.utils.atomic import write_json
+
+
+class TestWriteJson(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'data.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_replaces_file(self):
+        """Test that the new content replaces the old and no temp file is left"""
+        write_json(self.path, {'a': 1})
+        write_json(self.path, {'a': 2}, indent=2)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {'a': 2})
+        self.assertEqual(os.listdir(self.temp_dir.name), ['data.json'])
+
+    def test_failed_write_keeps_old_file(self):
+        """Test that unserializable data leaves the previous file untouched"""
+        write_json(self.path, {'a': 1})
+        with self.assertRaises(TypeError):
+            write_json(self.path, {'a': object()})
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {'a': 1})
+        self.assertEqual(os.listdir(self.temp_dir.name), ['data.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
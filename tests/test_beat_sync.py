@@ -0,0 +1,120 @@
+"""
+Unit tests for beat-synchronized lighting
+"""
+import socket
+import unittest
+from time import monotonic, sleep
+from app.core.beat_sync import BeatScheduler, build_timeline
+from app.utils.wled_realtime import WLEDRealtimeSender, PROTOCOL_DRGB, PROTOCOL_DNRGB
+
+STUB_ANALYSIS = {
+    'track': {'duration': 4.0},
+    'bars': [{'start': 0.0, 'duration': 2.0}, {'start': 2.0, 'duration': 2.0}],
+    'beats': [{'start': 0.5 * n, 'duration': 0.5, 'confidence': 1.0} for n in range(8)],
+    'segments': [
+        {'start': 0.0, 'duration': 2.0, 'loudness_max': -40.0},
+        {'start': 2.0, 'duration': 2.0, 'loudness_max': 0.0}
+    ]
+}
+
+
+class TestBeatTimeline(unittest.TestCase):
+
+    def setUp(self):
+        """Build a timeline from a stubbed analysis"""
+        self.timeline = build_timeline(STUB_ANALYSIS, (200, 0, 0), fps=20)
+
+    def test_frame_count(self):
+        """Test that the timeline covers the whole track"""
+        self.assertEqual(len(self.timeline.frames), 81)
+        self.assertAlmostEqual(self.timeline.duration, 4.05)
+
+    def test_beats_are_brighter(self):
+        """Test that frames on a beat are brighter than between beats"""
+        on_beat = self.timeline.color_at(2.5)
+        between = self.timeline.color_at(2.75)
+        self.assertGreater(on_beat[0], between[0])
+
+    def test_loudness_scales_level(self):
+        """Test that quiet segments are dimmer than loud ones"""
+        quiet = self.timeline.color_at(1.25)
+        loud = self.timeline.color_at(3.25)
+        self.assertLess(quiet[0], loud[0])
+
+    def test_bar_start_mixes_white(self):
+        """Test that bar starts briefly add white to the color"""
+        self.assertGreater(self.timeline.color_at(2.0)[1], 0)
+        self.assertEqual(self.timeline.color_at(3.9)[1], 0)
+
+    def test_position_outside_track(self):
+        """Test that positions outside the track return None"""
+        self.assertIsNone(self.timeline.color_at(10.0))
+        self.assertIsNone(self.timeline.color_at(-1.0))
+
+
+class TestBeatScheduler(unittest.TestCase):
+
+    def test_plays_in_time(self):
+        """Test that frames follow the playback position with low jitter"""
+        timeline = build_timeline(STUB_ANALYSIS, (0, 0, 255), fps=50)
+        received = []
+        scheduler = BeatScheduler(sinks=[received.append])
+        started = monotonic()
+
+        scheduler.play(timeline, lambda: monotonic() - started)
+        sleep(0.5)
+        scheduler.stop()
+
+        stats = scheduler.get_stats()
+        self.assertGreaterEqual(stats['frames_sent'], 20)
+        self.assertLessEqual(stats['frames_sent'], 27)
+        self.assertLess(stats['jitter_max_ms'], 10)
+        self.assertEqual(received[0], timeline.frames[1])
+
+    def test_paused_playback_sends_nothing(self):
+        """Test that no frames are sent while the position is unknown"""
+        received = []
+        scheduler = BeatScheduler(sinks=[received.append])
+
+        scheduler.play(build_timeline(STUB_ANALYSIS, (0, 255, 0)), lambda: None)
+        sleep(0.1)
+        scheduler.stop()
+
+        self.assertEqual(received, [])
+
+
+class TestWLEDRealtimeSender(unittest.TestCase):
+
+    def setUp(self):
+        """Open a local UDP listener"""
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.settimeout(1)
+        self.sender = WLEDRealtimeSender(port=self.listener.getsockname()[1])
+
+    def tearDown(self):
+        """Close sockets"""
+        self.sender.close()
+        self.listener.close()
+
+    def test_send_drgb(self):
+        """Test a short strip gets a single DRGB packet"""
+        sent = self.sender.send_color({'127.0.0.1': 3}, (1, 2, 3))
+        packet = self.listener.recv(2048)
+
+        self.assertEqual(sent, 1)
+        self.assertEqual(packet[0], PROTOCOL_DRGB)
+        self.assertEqual(packet[2:], bytes([1, 2, 3]) * 3)
+
+    def test_long_strip_uses_dnrgb_chunks(self):
+        """Test that long strips are split into DNRGB packets"""
+        packets = self.sender.build_packets(1000, 255, 0, 0)
+
+        self.assertEqual(len(packets), 3)
+        self.assertTrue(all(p[0] == PROTOCOL_DNRGB for p in packets))
+        self.assertEqual((packets[1][2] << 8) | packets[1][3], 489)
+        self.assertEqual(sum((len(p) - 4) // 3 for p in packets), 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
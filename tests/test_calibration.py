@@ -0,0 +1,75 @@
+"""
+Unit tests for per-device color calibration
+"""
+import unittest
+from time import perf_counter
+from app.utils.calibration import ColorCalibration, compile_calibrations
+from app.utils.ddp import build_packets, DDP_TYPE_RGBW32
+
+
+class TestColorCalibration(unittest.TestCase):
+
+    def test_identity(self):
+        """Test that the default calibration changes nothing"""
+        calibration = ColorCalibration()
+        self.assertEqual(calibration.apply_color((12, 128, 255)), (12, 128, 255))
+        self.assertEqual(calibration.apply_frame(bytes((1, 2, 3, 250, 251, 252))),
+                         bytes((1, 2, 3, 250, 251, 252)))
+
+    def test_gamma(self):
+        """Test that gamma darkens mid tones but keeps the end points"""
+        calibration = ColorCalibration(gamma=2.2)
+        r, g, b = calibration.apply_color((0, 128, 255))
+        self.assertEqual((r, b), (0, 255))
+        self.assertLess(g, 64)
+
+    def test_white_balance_and_cap(self):
+        """Test that white balance and the brightness cap scale channels"""
+        calibration = ColorCalibration(white_balance=(1.0, 0.5, 0.25), max_brightness=0.8)
+        self.assertEqual(calibration.apply_color((255, 255, 255)), (204, 102, 51))
+
+    def test_rgbw_split(self):
+        """Test that the common part of RGB moves to the white channel"""
+        calibration = ColorCalibration(rgbw=True)
+        self.assertEqual(calibration.apply_color((200, 150, 100)), (100, 50, 0, 100))
+        self.assertEqual(calibration.apply_rgb((200, 150, 100)), (200, 150, 100))
+        self.assertEqual(calibration.apply_frame(bytes((200, 150, 100))), bytes((100, 50, 0, 100)))
+
+    def test_frame_matches_single_colors(self):
+        """Test that frame and single color calibration agree"""
+        calibration = ColorCalibration(gamma=1.8, white_balance=(1.0, 0.9, 0.7), max_brightness=0.9)
+        pixels = bytes(range(255))[:252]
+        frame = calibration.apply_frame(pixels)
+        expected = b''.join(bytes(calibration.apply_color(pixels[i:i + 3])) for i in range(0, 252, 3))
+        self.assertEqual(frame, expected)
+
+    def test_frame_is_cheap(self):
+        """Test that a few thousand LEDs calibrate well within a frame"""
+        calibration = ColorCalibration(gamma=2.2, rgbw=True)
+        pixels = bytes(range(240)) * 50  # 4000 LEDs
+        started = perf_counter()
+        for _ in range(30):
+            calibration.apply_frame(pixels)
+        self.assertLess((perf_counter() - started) / 30, 0.005)
+
+    def test_invalid_settings(self):
+        """Test that invalid settings are rejected with the device name"""
+        with self.assertRaises(ValueError) as ctx:
+            compile_calibrations({'10.0.0.1': {'gamma': 0}})
+        self.assertIn('10.0.0.1', str(ctx.exception))
+        with self.assertRaises(ValueError):
+            compile_calibrations({'10.0.0.1': {'white_balance': [1, 1]}})
+        self.assertEqual(compile_calibrations({}), {})
+
+
+class TestRGBWFrames(unittest.TestCase):
+
+    def test_ddp_rgbw_packets(self):
+        """Test that RGBW frames are marked as such and split on pixel boundaries"""
+        packets = build_packets(bytes(4 * 400), data_type=DDP_TYPE_RGBW32)
+        self.assertEqual(packets[0][2], DDP_TYPE_RGBW32)
+        self.assertEqual((len(packets[0]) - 10) % 4, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
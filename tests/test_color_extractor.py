@@ -2,7 +2,8 @@
 Unit tests for color extraction utilities
 """
 import unittest
-from app.utils.color_extractor import ColorExtractor
+from unittest.mock import patch
+from app.utils.color_extractor import ColorExtractor, requests
 
 
 class TestColorExtractor(unittest.TestCase):
@@ -103,6 +104,36 @@ class TestColorExtractor(unittest.TestCase):
         # Max edge
         r, g, b = ColorExtractor.validate_rgb(255, 255, 255)
         self.assertEqual((r, g, b), (255, 255, 255))
+    
+    @patch('app.utils.color_extractor.requests.get')
+    def test_download_failure_default(self, mock_get):
+        """Test that failed downloads use the timeout and return the default"""
+        mock_get.side_effect = requests.Timeout("too slow")
+        
+        self.assertEqual(self.extractor.get_color('http://cover', timeout=1.5), (0, 0, 0))
+        self.assertIsNone(self.extractor.get_color('http://cover', default=None))
+        self.assertEqual(mock_get.call_args_list[0][1]['timeout'], 1.5)
+    
+    def test_cached_color_ignores_age(self):
+        """Test that an expired cache entry can still serve as a fallback"""
+        self.extractor._cache['http://cover'] = {'color': (1, 2, 3), 'time': 0}
+        
+        self.assertEqual(self.extractor.get_cached_color('http://cover'), (1, 2, 3))
+        self.assertIsNone(self.extractor.get_cached_color('http://other'))
+
+    
+    def test_extract_all_matches_single_methods(self):
+        """Test that extracting every method at once gives the same colors"""
+        from io import BytesIO
+        from PIL import Image
+        image = Image.new('RGB', (40, 40), (200, 40, 40))
+        image.paste((30, 60, 220), (0, 0, 20, 40))
+        buffer = BytesIO()
+        image.save(buffer, format='PNG')
+        
+        colors = self.extractor.extract_all(buffer.getvalue())
+        for method in ('vibrant', 'dominant', 'average'):
+            self.assertEqual(colors[method], self.extractor.extract(buffer.getvalue(), method))
 
 
 if __name__ == '__main__':
@@ -17,8 +17,9 @@ class TestConfig(unittest.TestCase):
     
     def tearDown(self):
         """Clean up temporary files"""
-        if os.path.exists(self.temp_file.name):
-            os.unlink(self.temp_file.name)
+        for path in (self.temp_file.name, self.temp_file.name + '.lock'):
+            if os.path.exists(path):
+                os.unlink(path)
     
     def test_default_config(self):
         """Test that default configuration is loaded"""
@@ -46,6 +47,21 @@ class TestConfig(unittest.TestCase):
         self.assertEqual(new_config.get('SPOTIFY_CLIENT_SECRET'), 'test_secret')
         self.assertEqual(new_config.get('WLED_IPS'), ['192.168.1.100'])
     
+    def test_edit_keeps_changes_from_other_processes(self):
+        """Test that editing a stale copy does not overwrite another copy's save"""
+        other = Config(config_path=self.temp_file.name)
+        
+        with self.config.edit():
+            self.config.set('WLED_IPS', ['192.168.1.100'])
+        with other.edit():
+            other.set('WLED_IPS', other.get('WLED_IPS') + ['192.168.1.101'])
+        with self.config.edit():
+            self.config.set('REFRESH_INTERVAL', 10)
+        
+        saved = Config(config_path=self.temp_file.name)
+        self.assertEqual(saved.get('WLED_IPS'), ['192.168.1.100', '192.168.1.101'])
+        self.assertEqual(saved.get('REFRESH_INTERVAL'), 10)
+    
     def test_validation_success(self):
         """Test successful validation"""
         self.config.set('SPOTIFY_CLIENT_ID', 'test_id')
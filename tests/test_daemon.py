@@ -0,0 +1,88 @@
+"""
+Unit tests for the headless daemon
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from time import sleep
+from app.core.config import Config
+from app.core.daemon import Daemon
+from app.core.sync_engine import SyncEngine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WEB_MODULES = ['flask', 'jinja2', 'werkzeug', 'app.routes', 'app.main']
+
+
+class TestDaemon(unittest.TestCase):
+
+    def setUp(self):
+        """Run a daemon with an unconfigured engine on a temporary socket"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = Config(config_path=os.path.join(self.temp_dir.name, 'config.json'))
+        self.config.set('HISTORY_DB_PATH', ':memory:')
+        self.config.set('WLED_WEBSOCKET', False)
+        self.socket_path = os.path.join(self.temp_dir.name, 'status.sock')
+
+        self.daemon = Daemon(SyncEngine(self.config), status_socket=self.socket_path)
+        self.thread = threading.Thread(target=self.daemon.run, daemon=True)
+        self.thread.start()
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            sleep(0.01)
+
+    def tearDown(self):
+        """Stop the daemon"""
+        self.daemon.stop()
+        self.thread.join(5)
+        self.temp_dir.cleanup()
+
+    def query(self, command: bytes) -> dict:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(5)
+            sock.connect(self.socket_path)
+            sock.sendall(command + b'\n')
+            return json.loads(sock.makefile('rb').readline())
+
+    def test_status_socket(self):
+        """Test that status and metrics are served as JSON"""
+        self.assertFalse(self.query(b'status')['is_running'])
+        self.assertIn('deadlines', self.query(b'metrics'))
+        self.assertIn('error', self.query(b'bogus'))
+
+    def test_reload_and_stop(self):
+        """Test that a reload rereads the config file and stop shuts down cleanly"""
+        with open(self.config.config_path, 'w') as f:
+            json.dump({'REFRESH_INTERVAL': 7}, f)
+        self.daemon.reload()
+        for _ in range(100):
+            if self.config.get('REFRESH_INTERVAL') == 7:
+                break
+            sleep(0.01)
+        self.assertEqual(self.config.get('REFRESH_INTERVAL'), 7)
+
+        self.daemon.stop()
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(os.path.exists(self.socket_path))
+
+
+class TestDaemonImports(unittest.TestCase):
+
+    def test_web_stack_not_imported(self):
+        """Test that the daemon never imports Flask, Jinja or the routes"""
+        probe = ("import json, sys; import app.core.daemon; "
+                 f"print(json.dumps([m for m in {WEB_MODULES!r} if m in sys.modules]))")
+        output = subprocess.run([sys.executable, '-c', probe], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(json.loads(output.strip().splitlines()[-1]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
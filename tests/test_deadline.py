@@ -0,0 +1,56 @@
+"""
+Unit tests for sync iteration deadlines
+"""
+import unittest
+from unittest.mock import patch
+from app.core.deadline import Deadline, DeadlineStats
+
+
+class TestDeadline(unittest.TestCase):
+
+    @patch('app.core.deadline.monotonic')
+    def test_budget_capped_by_deadline(self, mock_monotonic):
+        """Test that stages get their budget or what is left, whichever is less"""
+        mock_monotonic.return_value = 100.0
+        deadline = Deadline(5.0)
+        self.assertEqual(deadline.budget(2.0), 2.0)
+        mock_monotonic.return_value = 104.0
+        self.assertEqual(deadline.budget(2.0), 1.0)
+        mock_monotonic.return_value = 106.0
+        self.assertEqual(deadline.budget(2.0), 0.0)
+        self.assertTrue(deadline.expired)
+
+    @patch('app.core.deadline.monotonic')
+    def test_first_late_stage_is_the_miss(self, mock_monotonic):
+        """Test that a missed iteration is reported once, for the first late stage"""
+        misses = []
+        mock_monotonic.return_value = 0.0
+        deadline = Deadline(5.0, on_miss=misses.append)
+        self.assertTrue(deadline.check('spotify'))
+        mock_monotonic.return_value = 6.0
+        self.assertFalse(deadline.check('extraction'))
+        self.assertFalse(deadline.check('devices'))
+        self.assertEqual(misses, ['extraction'])
+        self.assertEqual(deadline.missed_stage, 'extraction')
+
+
+class TestDeadlineStats(unittest.TestCase):
+
+    def test_counts(self):
+        """Test that iterations, misses and fallbacks are counted"""
+        stats = DeadlineStats()
+        stats.start(5.0).check('spotify')
+        late = stats.start(0.0)
+        late.check('devices')
+        late.check('devices')
+        stats.record_fallback('extraction')
+        self.assertEqual(stats.get_stats(), {
+            'iterations': 2,
+            'missed': 1,
+            'missed_by_stage': {'devices': 1},
+            'fallbacks': {'extraction': 1}
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
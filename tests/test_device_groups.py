@@ -0,0 +1,159 @@
+"""
+Unit tests for leader/follower device groups
+"""
+import unittest
+from app.core.device_groups import DeviceGroup, GroupCoordinator, parse_groups, TRANSPORT_MQTT
+
+GROUPS = [{'name': 'Living room', 'leader': 'a', 'followers': ['b', 'c'], 'sync_group': 2}]
+MQTT_GROUPS = [
+    {'name': 'Garden', 'transport': 'mqtt', 'devices': ['e', 'f'], 'topic': 'wled/garden/'},
+    {'name': 'Kitchen', 'transport': 'mqtt', 'device_topics': {'g': 'wled/g', 'h': 'wled/h'}}
+]
+
+
+class FakeMirror:
+    """Mirrored states set directly by the tests"""
+
+    def __init__(self):
+        self.states = {}
+        self.ages = {}
+
+    def is_online(self, ip):
+        return True if ip in self.states else None
+
+    def get_state(self, ip):
+        return self.states.get(ip)
+
+    def seconds_since_update(self, ip):
+        return self.ages.get(ip)
+
+
+def state(color, recv=True, rgrp=2):
+    return {'on': True, 'udpn': {'recv': recv, 'rgrp': rgrp}, 'seg': [{'col': [list(color)]}]}
+
+
+class TestParseGroups(unittest.TestCase):
+
+    def test_parse(self):
+        """Test that groups are parsed with their sync mask"""
+        group = parse_groups(GROUPS)[0]
+        self.assertEqual(group, DeviceGroup('Living room', 'a', ('b', 'c'), 2))
+        self.assertEqual(group.mask, 0b10)
+
+    def test_invalid(self):
+        """Test that broken group configs are rejected"""
+        with self.assertRaises(ValueError):
+            parse_groups([{'followers': ['b']}])
+        with self.assertRaises(ValueError):
+            parse_groups([{'leader': 'a', 'sync_group': 9}])
+        with self.assertRaises(ValueError):
+            parse_groups([{'leader': 'a', 'followers': ['b']}, {'leader': 'b'}])
+        with self.assertRaises(ValueError):
+            parse_groups([{'transport': 'carrier pigeon', 'leader': 'a'}])
+
+    def test_parse_mqtt(self):
+        """Test that MQTT groups need a group topic or one per device"""
+        garden, kitchen = parse_groups(MQTT_GROUPS)
+        self.assertEqual((garden.transport, garden.topic, garden.devices),
+                         (TRANSPORT_MQTT, 'wled/garden', ('e', 'f')))
+        self.assertEqual(kitchen.devices, ('g', 'h'))
+        with self.assertRaises(ValueError):
+            parse_groups([{'transport': 'mqtt', 'devices': ['e']}])
+        with self.assertRaises(ValueError):
+            parse_groups([{'transport': 'mqtt', 'devices': ['a'], 'topic': 't'}, GROUPS[0]])
+
+
+class TestGroupCoordinator(unittest.TestCase):
+
+    def setUp(self):
+        """Create a coordinator with a fake sync setter and mirror"""
+        self.sync_calls = []
+        self.mirror = FakeMirror()
+        self.coordinator = GroupCoordinator(self.set_sync, self.mirror)
+        self.coordinator.configure(parse_groups(GROUPS))
+
+    def set_sync(self, ip, **settings):
+        self.sync_calls.append((ip, settings))
+        return True
+
+    def subscribe_all(self):
+        direct, commands = self.coordinator.plan(['a', 'b', 'c', 'd'])
+        for _, command in commands:
+            command()
+        return direct, commands
+
+    def test_first_push_subscribes_and_goes_direct(self):
+        """Test that followers get direct pushes until subscribed"""
+        direct, commands = self.subscribe_all()
+        self.assertEqual(direct, ['a', 'b', 'c', 'd'])
+        self.assertEqual([ip for ip, _ in commands], ['a', 'b', 'c'])
+        self.assertIn(('a', {'send': True, 'send_groups': 2}), self.sync_calls)
+        self.assertIn(('b', {'receive': True, 'receive_groups': 2}), self.sync_calls)
+
+    def test_tracking_followers_are_relayed(self):
+        """Test that only the leader and ungrouped devices are pushed to"""
+        self.subscribe_all()
+        for ip in ('a', 'b', 'c'):
+            self.mirror.states[ip] = state((255, 0, 0))
+        direct, commands = self.coordinator.plan(['a', 'b', 'c', 'd'])
+        self.assertEqual(direct, ['a', 'd'])
+        self.assertEqual(commands, [])
+        self.assertEqual(self.coordinator.relayed, 2)
+
+    def test_followers_without_mirrored_state_stay_direct(self):
+        """Test that followers nobody watches are not left to UDP sync"""
+        self.subscribe_all()
+        self.mirror.states['a'] = state((255, 0, 0))
+        direct, commands = self.coordinator.plan(['a', 'b', 'c'])
+        self.assertEqual(direct, ['a', 'b', 'c'])
+        self.assertEqual(commands, [])
+        self.assertEqual(self.coordinator.relayed, 0)
+
+    def test_follower_with_sync_disabled_falls_back(self):
+        """Test that a follower no longer receiving the group is pushed to directly"""
+        self.subscribe_all()
+        self.mirror.states['a'] = state((255, 0, 0))
+        self.mirror.states['b'] = state((255, 0, 0), recv=False)
+        self.mirror.states['c'] = state((255, 0, 0))
+        direct, commands = self.coordinator.plan(['a', 'b', 'c'])
+        self.assertEqual(direct, ['a', 'b'])
+        self.assertEqual([ip for ip, _ in commands], ['b'])
+
+    def test_follower_out_of_step_falls_back(self):
+        """Test that a follower stuck on an old color is pushed to directly"""
+        self.subscribe_all()
+        self.mirror.states['a'] = state((255, 0, 0))
+        self.mirror.states['b'] = state((0, 0, 255))
+        self.mirror.ages['a'] = 1.0
+        self.assertEqual(self.coordinator.plan(['a', 'b'])[0], ['a'])
+        self.mirror.ages['a'] = 10.0
+        self.assertEqual(self.coordinator.plan(['a', 'b'])[0], ['a', 'b'])
+
+    def test_leader_switched_off(self):
+        """Test that followers are pushed to directly without their leader"""
+        self.subscribe_all()
+        direct, _ = self.coordinator.plan(['b', 'c'])
+        self.assertEqual(direct, ['b', 'c'])
+
+
+class TestMQTTRouting(unittest.TestCase):
+
+    def setUp(self):
+        """Configure one UDP sync group and two MQTT groups"""
+        self.coordinator = GroupCoordinator(lambda ip, **settings: True, FakeMirror())
+        self.coordinator.configure(parse_groups(GROUPS + MQTT_GROUPS))
+
+    def test_route(self):
+        """Test that MQTT members are published to and the rest left alone"""
+        rest, routes = self.coordinator.route_mqtt(['a', 'b', 'e', 'f', 'g', 'x'])
+        self.assertEqual(rest, ['a', 'b', 'x'])
+        self.assertEqual(routes, [('wled/garden', None), ('wled/g', 'g')])
+
+    def test_mqtt_groups_skip_udp_sync(self):
+        """Test that MQTT groups never get sync subscriptions"""
+        direct, commands = self.coordinator.plan(['e', 'g'])
+        self.assertEqual((direct, commands), (['e', 'g'], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for the per-device command queues
+"""
+import threading
+import unittest
+from time import monotonic, sleep
+from app.utils.device_queue import DeviceQueue
+
+
+class TestDeviceQueue(unittest.TestCase):
+
+    def setUp(self):
+        """Create a queue"""
+        self.queue = DeviceQueue(idle_timeout_s=0.5)
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        """Stop the workers"""
+        self.queue.close()
+
+    def record(self, ip, color):
+        with self.lock:
+            self.sent.append((ip, color))
+        return True
+
+    def test_latest_value_wins(self):
+        """Test that pending colors are replaced while the device is busy"""
+        release = threading.Event()
+
+        def blocking(ip, color):
+            release.wait(2)
+            return self.record(ip, color)
+
+        self.queue.submit('10.0.0.1', 'color', blocking, '10.0.0.1', 1)
+        sleep(0.05)  # first command is now in flight
+        for color in (2, 3, 4):
+            self.queue.submit('10.0.0.1', 'color', blocking, '10.0.0.1', color)
+
+        stats = self.queue.get_stats()['10.0.0.1']
+        self.assertEqual(stats['queue_depth'], 1)
+        self.assertTrue(stats['in_flight'])
+        self.assertEqual(stats['coalesced'], 2)
+
+        release.set()
+        self.assertTrue(self.queue.wait_idle(2))
+        self.assertEqual(self.sent, [('10.0.0.1', 1), ('10.0.0.1', 4)])
+        self.assertEqual(self.queue.get_stats()['10.0.0.1']['sent'], 2)
+
+    def test_slow_device_does_not_block_others(self):
+        """Test that devices are served independently"""
+        def slow(ip, color):
+            sleep(0.5)
+            return self.record(ip, color)
+
+        started = monotonic()
+        self.queue.submit('10.0.0.1', 'color', slow, '10.0.0.1', 1)
+        self.queue.submit('10.0.0.2', 'color', self.record, '10.0.0.2', 1)
+        while ('10.0.0.2', 1) not in self.sent and monotonic() - started < 1:
+            sleep(0.01)
+        self.assertLess(monotonic() - started, 0.4)
+        self.assertTrue(self.queue.wait_idle(2))
+
+    def test_kinds_do_not_replace_each_other(self):
+        """Test that only commands of the same kind coalesce"""
+        release = threading.Event()
+        self.queue.submit('10.0.0.1', 'color', lambda: release.wait(2))
+        sleep(0.05)
+        self.queue.submit('10.0.0.1', 'color', self.record, '10.0.0.1', 'red')
+        self.queue.submit('10.0.0.1', 'brightness', self.record, '10.0.0.1', 128)
+        release.set()
+        self.assertTrue(self.queue.wait_idle(2))
+        self.assertEqual(len(self.sent), 2)
+
+    def test_failures_are_counted(self):
+        """Test that False results and exceptions count as failed"""
+        def broken():
+            raise RuntimeError('boom')
+
+        self.queue.submit('10.0.0.1', 'color', lambda: False)
+        self.assertTrue(self.queue.wait_idle(2))
+        self.queue.submit('10.0.0.1', 'color', broken)
+        self.assertTrue(self.queue.wait_idle(2))
+        self.assertEqual(self.queue.get_stats()['10.0.0.1']['failed'], 2)
+
+    def test_idle_worker_exits_and_restarts(self):
+        """Test that idle workers stop and are restarted on demand"""
+        self.queue.submit('10.0.0.1', 'color', self.record, '10.0.0.1', 1)
+        self.assertTrue(self.queue.wait_idle(2))
+        sleep(0.7)
+        self.assertEqual(threading.active_count(),
+                         len([t for t in threading.enumerate() if not t.name.startswith('wled-')]))
+        self.queue.submit('10.0.0.1', 'color', self.record, '10.0.0.1', 2)
+        self.assertTrue(self.queue.wait_idle(2))
+        self.assertEqual(len(self.sent), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for the device capability registry
+"""
+import os
+import tempfile
+import unittest
+from app.utils.device_registry import (
+    DeviceProfile, DeviceRegistry, parse_version, PROTOCOL_DDP, PROTOCOL_WEBSOCKET
+)
+
+INFO = {'ver': '0.14.0', 'name': 'Desk', 'ws': 1, 'leds': {'count': 120, 'rgbw': False}}
+STATE = {'on': True, 'seg': [{'id': 0, 'start': 0, 'stop': 60}, {'id': 1, 'start': 60, 'stop': 120}]}
+
+
+class TestDeviceProfile(unittest.TestCase):
+
+    def test_parse_version(self):
+        """Test version parsing including pre-release suffixes"""
+        self.assertEqual(parse_version('0.14.0-b2'), (0, 14, 0))
+        self.assertEqual(parse_version(''), ())
+
+    def test_from_wled(self):
+        """Test that LEDs, segments and protocols are read from info/state"""
+        profile = DeviceProfile.from_wled('10.0.0.1', INFO, STATE)
+        self.assertEqual(profile.led_count, 120)
+        self.assertEqual(profile.segment_ids, [0, 1])
+        self.assertTrue(profile.supports(PROTOCOL_DDP))
+        self.assertTrue(profile.supports(PROTOCOL_WEBSOCKET))
+
+    def test_old_firmware(self):
+        """Test that old firmware without DDP or WebSocket is detected"""
+        profile = DeviceProfile.from_wled('10.0.0.1', {'ver': '0.10.2', 'ws': -1, 'leds': {'count': 30}})
+        self.assertFalse(profile.supports(PROTOCOL_DDP))
+        self.assertFalse(profile.supports(PROTOCOL_WEBSOCKET))
+
+
+class TestDeviceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        """Create a registry persisting to a temporary directory"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'devices.json')
+        self.fetched = []
+
+    def tearDown(self):
+        """Clean up temporary files"""
+        self.temp_dir.cleanup()
+
+    def fetch(self, ip):
+        self.fetched.append(ip)
+        return None if ip == '10.0.0.9' else {'info': INFO, 'state': STATE}
+
+    def test_fetches_once_and_persists(self):
+        """Test that a device is queried once, also across restarts"""
+        registry = DeviceRegistry(self.path, self.fetch)
+        self.assertEqual(registry.get('10.0.0.1').led_count, 120)
+        registry.get('10.0.0.1')
+        self.assertEqual(self.fetched, ['10.0.0.1'])
+
+        restarted = DeviceRegistry(self.path, self.fetch)
+        self.assertEqual(restarted.get('10.0.0.1').segment_ids, [0, 1])
+        self.assertEqual(self.fetched, ['10.0.0.1'])
+
+    def test_failed_fetch_not_repeated(self):
+        """Test that unreachable devices are not queried on every push"""
+        registry = DeviceRegistry(self.path, self.fetch, retry_after_s=60)
+        self.assertIsNone(registry.get('10.0.0.9'))
+        self.assertIsNone(registry.get('10.0.0.9'))
+        self.assertEqual(self.fetched, ['10.0.0.9'])
+
+    def test_observe_updates_version(self):
+        """Test that pushed info refreshes the profile without a query"""
+        registry = DeviceRegistry(self.path, self.fetch)
+        registry.observe('10.0.0.1', INFO, STATE)
+        registry.observe('10.0.0.1', dict(INFO, ver='0.15.0'), STATE)
+        self.assertEqual(registry.get('10.0.0.1').version, '0.15.0')
+        self.assertEqual(self.fetched, [])
+        self.assertEqual(DeviceRegistry(self.path, self.fetch).peek('10.0.0.1').version, '0.15.0')
+
+    def test_invalidate(self):
+        """Test that an invalidated profile is queried again"""
+        registry = DeviceRegistry(self.path, self.fetch)
+        registry.get('10.0.0.1')
+        registry.invalidate('10.0.0.1')
+        self.assertIsNone(registry.peek('10.0.0.1'))
+        registry.get('10.0.0.1')
+        self.assertEqual(self.fetched, ['10.0.0.1', '10.0.0.1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Unit tests for warm starts from saved engine state
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from app.core.config import Config
+from app.core.engine_state import EngineState, load_state, save_state
+from app.core.sync_engine import SyncEngine
+
+TRACK = {'is_playing': True, 'item': {'id': 'track1', 'name': 'Song'}}
+
+
+class TestEngineStateFile(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, 'state.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that saved state loads back with tuples intact"""
+        save_state(self.path, EngineState(color=(1, 2, 3), track_info={'id': 't'},
+                                          colors={'http://cover': (4, 5, 6)}))
+        state = load_state(self.path)
+        self.assertEqual(state.color, (1, 2, 3))
+        self.assertEqual(state.track_id, 't')
+        self.assertEqual(state.colors, {'http://cover': (4, 5, 6)})
+        self.assertGreater(state.saved_at, 0)
+
+    def test_missing_or_corrupt(self):
+        """Test that a missing or broken file means a cold start"""
+        self.assertIsNone(load_state(self.path))
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(load_state(self.path))
+
+
+class TestWarmStart(unittest.TestCase):
+
+    def setUp(self):
+        """Create an engine whose Spotify and devices are faked"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = Config(config_path=os.path.join(self.temp_dir.name, 'config.json'))
+        self.config.update({
+            'SPOTIFY_CLIENT_ID': 'id', 'SPOTIFY_CLIENT_SECRET': 'secret',
+            'WLED_IPS': ['10.0.0.1'], 'WLED_WEBSOCKET': False, 'HISTORY_DB_PATH': ':memory:'
+        })
+        save_state(os.path.join(self.temp_dir.name, 'state.json'), EngineState(
+            color=(10, 20, 30), track_info={'id': 'track1', 'name': 'Song'},
+            colors={'http://cover': (10, 20, 30)}
+        ))
+        self.engine = SyncEngine(self.config)
+        self.engine.wled_controller.get_state_info = Mock(return_value=None)
+        self.engine.wled_controller.set_color = Mock(return_value=True)
+        self.spotify = Mock()
+        self.spotify.is_authenticated = True
+        self.spotify.is_track_changed.return_value = False
+
+    def tearDown(self):
+        self.engine.stop()
+        self.temp_dir.cleanup()
+
+    def start(self, track):
+        self.spotify.get_current_track.return_value = track
+
+        def initialize_spotify():
+            self.engine.spotify_manager = self.spotify
+            return True
+
+        with patch.object(self.engine, 'initialize_spotify', side_effect=initialize_spotify):
+            self.assertTrue(self.engine.start())
+        self.engine.device_queue.wait_idle(5)
+
+    def test_reapplies_color_of_playing_track(self):
+        """Test that the saved color is pushed at once if its track still plays"""
+        self.start(TRACK)
+        self.engine.wled_controller.set_color.assert_called()
+        self.assertEqual(self.engine.wled_controller.set_color.call_args[0][1:4], (10, 20, 30))
+        self.spotify.is_track_changed.assert_any_call(TRACK)
+        warm_start = self.engine.get_metrics()['warm_start']
+        self.assertTrue(warm_start['restored'])
+        self.assertTrue(warm_start['reapplied'])
+        self.assertIn('ready_ms', warm_start)
+
+    def test_other_track_restores_caches_only(self):
+        """Test that a different track is left to the loop, with restored fallbacks"""
+        self.start({'is_playing': True, 'item': {'id': 'track2'}})
+        self.assertFalse(self.engine.get_metrics()['warm_start']['reapplied'])
+        self.assertEqual(self.engine.current_color, (10, 20, 30))
+        self.assertEqual(self.engine.color_extractor.get_cached_color('http://cover'), (10, 20, 30))
+        self.assertFalse(self.engine._color_applied)
+
+
+if __name__ == '__main__':
+    unittest.main()
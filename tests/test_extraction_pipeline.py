@@ -0,0 +1,92 @@
+"""
+Unit tests for pipelined batch color extraction
+"""
+import os
+import signal
+import unittest
+from io import BytesIO
+from time import sleep
+from unittest.mock import patch
+from PIL import Image
+from app.utils.color_extractor import ColorExtractor, requests
+
+
+def cover(*colors):
+    """PNG with one vertical band per color"""
+    image = Image.new('RGB', (12 * len(colors), 24))
+    for i, color in enumerate(colors):
+        image.paste(color, (12 * i, 0, 12 * (i + 1), 24))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+COVERS = [cover((200, 30, 30), (20, 20, 20)), cover((30, 180, 60)), cover((40, 40, 220), (250, 250, 250))]
+
+
+class TestExtractionPipeline(unittest.TestCase):
+
+    def test_worker_processes_match_single_extraction(self):
+        """Test that colors from worker processes equal the one-at-a-time API"""
+        extractor = ColorExtractor(processes=2)
+        try:
+            results = sorted(extractor.extract_batch(COVERS), key=lambda r: r.index)
+        finally:
+            extractor.close()
+
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+        for result, image in zip(results, COVERS):
+            self.assertTrue(result.ok, result.error)
+            self.assertIsNone(result.url)
+            self.assertEqual(result.colors, extractor.extract_all(image))
+
+    @unittest.skipUnless(hasattr(signal, 'SIGKILL'), "needs SIGKILL")
+    def test_recovers_from_killed_worker(self):
+        """Test that a killed worker process only fails the images it had in flight"""
+        extractor = ColorExtractor(processes=1)
+        try:
+            self.assertTrue(all(r.ok for r in extractor.extract_batch(COVERS[:1])))
+            for pid in list(extractor._pipeline._pool._processes):
+                os.kill(pid, signal.SIGKILL)
+            list(extractor.extract_batch(COVERS[:1]))  # May still land on the broken pool
+
+            results = list(extractor.extract_batch(COVERS))
+        finally:
+            extractor.close()
+        self.assertTrue(all(r.ok for r in results), [r.error for r in results])
+
+    @patch('app.utils.color_extractor.requests.get')
+    def test_failures_are_outcomes(self, mock_get):
+        """Test that broken images and failed downloads come back as errors"""
+        mock_get.side_effect = requests.Timeout("too slow")
+        extractor = ColorExtractor(processes=0)
+        results = {r.index: r for r in extractor.extract_batch([b'not an image', 'http://cover', COVERS[1]],
+                                                               methods=('dominant',))}
+
+        self.assertIn('extraction failed', results[0].error)
+        self.assertIn('download failed', results[1].error)
+        self.assertEqual(results[1].url, 'http://cover')
+        self.assertEqual(mock_get.call_args[1]['timeout'], 10)
+        self.assertEqual(list(results[2].colors), ['dominant'])
+
+    def test_bounded_and_closable(self):
+        """Test that unconsumed results hold the input back and closing ends the batch"""
+        pulled = []
+
+        def sources():
+            for i in range(50):
+                pulled.append(i)
+                yield COVERS[i % len(COVERS)]
+
+        extractor = ColorExtractor(processes=0)
+        batch = extractor.extract_batch(sources(), max_pending=2)
+        next(batch)
+        sleep(0.3)
+        self.assertLessEqual(len(pulled), 5)
+
+        batch.close()
+        self.assertEqual(len(list(extractor.extract_batch(COVERS))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Unit tests for the persistent color history store
+"""
+import os
+import tempfile
+import unittest
+from time import time
+from app.core.history import HistoryStore
+
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        """Create a store backed by a temporary database"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, 'history.db')
+        self.store = HistoryStore(self.db_path, capacity=3)
+        self.store.open()
+
+    def tearDown(self):
+        """Clean up temporary files"""
+        self.temp_dir.cleanup()
+
+    def _track(self, n, artist='Artist'):
+        return {'name': f'Track {n}', 'artist': artist, 'album': 'Album', 'id': f'id{n}'}
+
+    def test_ring_buffer_keeps_newest(self):
+        """Test that the in-memory buffer is capped and newest first"""
+        for n in range(5):
+            self.store.append((n, 0, 0), self._track(n))
+
+        recent = self.store.recent()
+        self.assertEqual(len(recent), 3)
+        self.assertEqual([e['track'] for e in recent], ['Track 4', 'Track 3', 'Track 2'])
+        self.assertEqual(len(self.store.recent(2)), 2)
+
+    def test_entries_persist_across_restart(self):
+        """Test that history survives re-opening the database"""
+        for n in range(5):
+            self.store.append((n, 0, 0), self._track(n))
+        self.store.flush()
+
+        reopened = HistoryStore(self.db_path, capacity=3)
+        recent = reopened.recent()
+        self.assertEqual([e['track'] for e in recent], ['Track 4', 'Track 3', 'Track 2'])
+        self.assertEqual(recent[0]['color'], (4, 0, 0))
+        self.assertEqual(reopened.query()['total'], 5)
+
+    def test_query_pagination(self):
+        """Test paginated queries over the full history"""
+        for n in range(7):
+            self.store.append((n, 0, 0), self._track(n))
+
+        first = self.store.query(page=1, per_page=3)
+        last = self.store.query(page=3, per_page=3)
+
+        self.assertEqual(first['total'], 7)
+        self.assertEqual([e['track'] for e in first['items']], ['Track 6', 'Track 5', 'Track 4'])
+        self.assertEqual([e['track'] for e in last['items']], ['Track 0'])
+
+    def test_query_filters(self):
+        """Test filtering by track, artist and time"""
+        self.store.append((1, 1, 1), self._track(1, artist='Alpha'))
+        self.store.append((2, 2, 2), self._track(2, artist='Beta'))
+        self.store.append((3, 3, 3), self._track(1, artist='Alpha'))
+
+        self.assertEqual(self.store.query(track_id='id1')['total'], 2)
+        self.assertEqual(self.store.query(artist='bet')['total'], 1)
+        self.assertEqual(self.store.query(since=time() + 60)['total'], 0)
+        self.assertEqual(self.store.query(until=time() + 60)['total'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
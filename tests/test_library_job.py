@@ -0,0 +1,189 @@
+"""
+Unit tests for the color store and the library precompute job
+"""
+import json
+import os
+import tempfile
+import unittest
+from time import monotonic
+from unittest.mock import Mock, patch
+from app.core.color_store import ColorStore
+from app.core.library_job import LibraryPrecomputeJob, PHASE_PLAYLIST_ITEMS
+from app.utils.color_extractor import ColorExtractor
+from app.utils.spotify_client import RateLimitedError
+
+METHODS = ('vibrant', 'dominant', 'average')
+
+
+def album(url):
+    return {'images': [{'url': url}]}
+
+
+class FakeSpotify:
+    """Serves a small library: three saved albums and two playlists"""
+
+    def __init__(self):
+        self.calls = []
+        self.albums = [{'album': album('http://a1')}, {'album': album('http://a2')},
+                       {'album': album('http://a3')}]
+        self.playlists = {
+            'p1': [{'track': {'album': album('http://a1')}}, {'track': {'album': album('http://p1')}}],
+            'p2': None  # Deleted meanwhile
+        }
+        self.rate_limit_once = False
+
+    def page(self, items, offset, limit):
+        chunk = items[offset:offset + limit]
+        return {'items': chunk, 'total': len(items),
+                'next': 'more' if offset + limit < len(items) else None}
+
+    def get_saved_albums(self, offset, limit):
+        self.calls.append(('albums', offset))
+        if self.rate_limit_once:
+            self.rate_limit_once = False
+            raise RateLimitedError("budget exhausted", 0.0)
+        return self.page(self.albums, offset, 2)
+
+    def get_playlists(self, offset, limit):
+        self.calls.append(('playlists', offset))
+        return self.page([{'id': pid} for pid in self.playlists], offset, limit)
+
+    def get_playlist_items(self, playlist_id, offset, limit):
+        self.calls.append((playlist_id, offset))
+        items = self.playlists[playlist_id]
+        return None if items is None else self.page(items, offset, limit)
+
+
+class TestColorStore(unittest.TestCase):
+
+    def test_put_get_missing(self):
+        """Test that colors are stored per method and incomplete covers are missing"""
+        store = ColorStore(':memory:')
+        store.put('http://a', {'vibrant': (1, 2, 3), 'dominant': (4, 5, 6), 'average': (7, 8, 9)})
+        store.put('http://b', {'vibrant': (1, 1, 1)})
+
+        self.assertEqual(store.get('http://a', 'dominant'), (4, 5, 6))
+        self.assertIsNone(store.get('http://b', 'average'))
+        self.assertEqual(store.missing(['http://b', 'http://a', 'http://c', 'http://b'], METHODS),
+                         ['http://b', 'http://c'])
+        self.assertEqual(store.count(), 2)
+
+    def test_put_and_get_do_not_wait_for_the_database(self):
+        """Test that puts are queued and reads give up while the database is busy"""
+        store = ColorStore(':memory:', read_timeout=0.05)
+        store.open()
+        with store._lock:
+            started = monotonic()
+            store.put('http://a', {'vibrant': (1, 2, 3)})
+            self.assertEqual(store.get('http://a', 'vibrant'), (1, 2, 3))
+            self.assertIsNone(store.get('http://b', 'vibrant'))
+            self.assertLess(monotonic() - started, 1)
+
+        store.flush()
+        self.assertEqual(store._unwritten, {})
+        self.assertEqual(store.get('http://a', 'vibrant'), (1, 2, 3))
+        self.assertEqual(store.missing(['http://a'], ('vibrant',)), [])
+        store.close()
+
+    def test_file_store_persists(self):
+        """Test that queued puts reach the file before close returns"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'colors.db')
+            store = ColorStore(path)
+            store.put('http://a', {'vibrant': (1, 2, 3)})
+            store.close()
+            reopened = ColorStore(path)
+            self.assertEqual(reopened.get('http://a', 'vibrant'), (1, 2, 3))
+            reopened.close()
+
+
+class TestLibraryPrecomputeJob(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.temp_dir.name, 'library_job.json')
+        self.spotify = FakeSpotify()
+        self.extractor = ColorExtractor(processes=0)
+        self.downloaded = []
+        for name, fake in (('download', self.download),
+                           ('extract_all', lambda image, methods: {m: (1, 2, 3) for m in methods})):
+            patcher = patch(f'app.utils.color_extractor.ColorExtractor.{name}', side_effect=fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.store = ColorStore(':memory:')
+        self.job = LibraryPrecomputeJob(self.spotify, self.extractor, self.store, self.checkpoint_path,
+                                        covers_per_minute=0)
+
+    def tearDown(self):
+        self.job.stop()
+        self.temp_dir.cleanup()
+
+    def download(self, url, timeout):
+        self.downloaded.append(url)
+        return url.encode()
+
+    def run_job(self):
+        self.assertTrue(self.job.start())
+        self.job._thread.join(5)
+        return self.job.get_status()
+
+    def test_walks_library_once_per_cover(self):
+        """Test that every cover is extracted once and the walk completes"""
+        self.store.put('http://a3', {m: (9, 9, 9) for m in METHODS})
+        status = self.run_job()
+
+        self.assertEqual(status['state'], 'finished')
+        self.assertEqual(self.spotify.calls, [('albums', 0), ('albums', 2), ('playlists', 0),
+                                              ('p1', 0), ('p2', 0)])
+        self.assertEqual(sorted(self.downloaded), ['http://a1', 'http://a2', 'http://p1'])
+        self.assertEqual(self.store.get('http://p1', 'average'), (1, 2, 3))
+        self.assertEqual(self.store.get('http://a3', 'average'), (9, 9, 9))
+        self.assertEqual((status['covers_done'], status['covers_skipped']), (3, 2))
+        self.assertEqual(status['albums_total'], 3)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_worker_processes_shut_down_after_run(self):
+        """Test that the extraction worker processes do not outlive the walk"""
+        with patch.object(self.extractor, 'close') as close:
+            self.run_job()
+        close.assert_called_once_with()
+
+    def test_resumes_from_checkpoint(self):
+        """Test that a checkpoint skips the pages already walked"""
+        with open(self.checkpoint_path, 'w') as f:
+            json.dump({'phase': PHASE_PLAYLIST_ITEMS, 'offset': 1, 'playlists': ['p1']}, f)
+        status = self.run_job()
+
+        self.assertEqual(self.spotify.calls, [('p1', 1)])
+        self.assertEqual(status['covers_done'], 1)
+        self.assertEqual(status['state'], 'finished')
+
+    def test_waits_out_rate_limit(self):
+        """Test that an exhausted budget delays the page instead of failing"""
+        self.spotify.rate_limit_once = True
+        with patch('app.core.library_job.MIN_RETRY_S', 0.0):
+            status = self.run_job()
+        self.assertEqual(status['rate_limited'], 1)
+        self.assertEqual(self.spotify.calls[:2], [('albums', 0), ('albums', 0)])
+        self.assertEqual(status['state'], 'finished')
+
+    def test_missing_scope_fails_with_checkpoint_kept(self):
+        """Test that an unreadable library stops the job with a hint"""
+        self.spotify.get_saved_albums = Mock(return_value=None)
+        status = self.run_job()
+        self.assertEqual(status['state'], 'failed')
+        self.assertIn('user-library-read', status['error'])
+
+    def test_yields_to_sync_loop(self):
+        """Test that downloads wait while the sync loop is busy and stop cleanly"""
+        self.job.is_busy = lambda: True
+        self.assertTrue(self.job.start())
+        self.job.stop()
+
+        self.assertFalse(self.job.is_running)
+        self.assertEqual(self.downloaded, [])
+        self.assertEqual(self.job.get_status()['state'], 'stopped')
+
+
+if __name__ == '__main__':
+    unittest.main()
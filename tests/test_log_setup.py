@@ -0,0 +1,100 @@
+"""
+Unit tests for the asynchronous log pipeline
+"""
+import json
+import logging
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from app.core import log_setup
+from app.core.log_setup import JsonFormatter, RateLimitFilter
+
+
+def _record(msg, level=logging.INFO, name='app.test'):
+    return logging.LogRecord(name, level, __file__, 1, msg, None, None)
+
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def test_suppresses_repeats(self):
+        """Test that identical messages beyond the burst are dropped"""
+        rate_filter = RateLimitFilter(interval=60, burst=2)
+        passed = [rate_filter.filter(_record('same')) for _ in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+
+    def test_distinct_messages_and_loggers(self):
+        """Test that limits are tracked per logger and message"""
+        rate_filter = RateLimitFilter(interval=60, burst=1)
+        self.assertTrue(rate_filter.filter(_record('a')))
+        self.assertTrue(rate_filter.filter(_record('b')))
+        self.assertTrue(rate_filter.filter(_record('a', name='app.other')))
+        self.assertFalse(rate_filter.filter(_record('a')))
+
+    def test_warnings_never_suppressed(self):
+        """Test that warnings always pass"""
+        rate_filter = RateLimitFilter(interval=60, burst=1)
+        for _ in range(3):
+            self.assertTrue(rate_filter.filter(_record('oops', level=logging.WARNING)))
+
+    def test_reports_suppressed_count(self):
+        """Test that the first message of a new window reports suppressions"""
+        rate_filter = RateLimitFilter(interval=10, burst=1)
+        with patch('app.core.log_setup.monotonic', return_value=0.0):
+            for _ in range(4):
+                rate_filter.filter(_record('tick'))
+        with patch('app.core.log_setup.monotonic', return_value=11.0):
+            record = _record('tick')
+            self.assertTrue(rate_filter.filter(record))
+        self.assertEqual(record.getMessage(), 'tick (suppressed 3 similar messages)')
+
+
+class TestJsonFormatter(unittest.TestCase):
+
+    def test_format(self):
+        """Test that records are rendered as JSON objects"""
+        entry = json.loads(JsonFormatter().format(_record('hello')))
+        self.assertEqual(entry['message'], 'hello')
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['logger'], 'app.test')
+
+
+class TestConfigureLogging(unittest.TestCase):
+
+    def setUp(self):
+        """Remember root logger state"""
+        self.root = logging.getLogger()
+        self.saved_handlers = list(self.root.handlers)
+        self.saved_level = self.root.level
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Restore root logger state"""
+        log_setup.shutdown_logging()
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+        for handler in self.saved_handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.saved_level)
+        self.temp_dir.cleanup()
+
+    def test_writes_rotating_json_log(self):
+        """Test that records reach a rotating file through the queue"""
+        log_path = os.path.join(self.temp_dir.name, 'app.log')
+        log_setup.configure_logging(log_path=log_path, json_format=True,
+                                    max_bytes=200, backup_count=2)
+
+        self.assertIsInstance(self.root.handlers[0], logging.handlers.QueueHandler)
+        for n in range(10):
+            logging.getLogger('app.test').info(f"message {n}")
+        log_setup.shutdown_logging()
+
+        with open(log_path) as f:
+            last = json.loads(f.read().strip().splitlines()[-1])
+        self.assertEqual(last['message'], 'message 9')
+        self.assertTrue(os.path.exists(log_path + '.1'))
+        self.assertFalse(os.path.exists(log_path + '.3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
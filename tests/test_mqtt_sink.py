@@ -0,0 +1,154 @@
+"""
+Unit tests for the MQTT output sink
+"""
+import os
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from app.utils.mqtt_sink import MQTTSink, color_payload
+
+# Set to host[:port] of a local broker (e.g. mosquitto) to run the broker tests
+TEST_BROKER = os.environ.get('MQTT_TEST_BROKER', '')
+
+
+class FakeClient:
+    """In-process stand-in for a paho client"""
+
+    def __init__(self):
+        self.messages = []
+        self.connected = False
+        self.started = False
+        self.credentials = None
+
+    def username_pw_set(self, username, password=None):
+        self.credentials = (username, password)
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        pass
+
+    def connect_async(self, host, port, keepalive):
+        self.address = (host, port)
+
+    def loop_start(self):
+        self.started = True
+
+    def loop_stop(self):
+        self.started = False
+
+    def disconnect(self):
+        self.connected = False
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        if not self.connected:
+            return SimpleNamespace(rc=4)  # MQTT_ERR_NO_CONN
+        self.messages.append((topic, payload, qos, retain))
+        return SimpleNamespace(rc=0)
+
+    # Broker side
+    def accept(self):
+        self.connected = True
+        self.on_connect(self, None, {}, 0, None)
+
+    def drop(self):
+        self.connected = False
+        self.on_disconnect(self, None, {}, 7, None)
+
+
+class TestColorPayload(unittest.TestCase):
+
+    def test_payload(self):
+        """Test WLED's hex color format with and without white"""
+        self.assertEqual(color_payload((255, 128, 0)), '#FF8000')
+        self.assertEqual(color_payload((1, 2, 3, 200)), '#C8010203')
+
+
+class TestMQTTSink(unittest.TestCase):
+
+    def setUp(self):
+        """Create a sink on a fake client that has not connected yet"""
+        self.client = FakeClient()
+        self.sink = MQTTSink('broker', qos=1, retain=True, username='wled',
+                             password='secret', client=self.client)
+
+    def tearDown(self):
+        self.sink.close()
+
+    def test_connects_in_background(self):
+        """Test that the sink connects asynchronously with credentials"""
+        self.assertTrue(self.client.started)
+        self.assertEqual(self.client.address, ('broker', 1883))
+        self.assertEqual(self.client.credentials, ('wled', 'secret'))
+        self.assertFalse(self.sink.connected)
+
+    def test_publish_with_qos_and_retain(self):
+        """Test that colors go to <topic>/col with the configured QoS"""
+        self.client.accept()
+        self.assertTrue(self.sink.publish_color('wled/garden/', (255, 0, 0)))
+        self.assertEqual(self.client.messages, [('wled/garden/col', '#FF0000', 1, True)])
+
+    def test_offline_buffer_keeps_latest(self):
+        """Test that only the latest color per topic is sent on reconnect"""
+        self.assertFalse(self.sink.publish_color('wled/a', (1, 1, 1)))
+        self.sink.publish_color('wled/a', (2, 2, 2))
+        self.sink.publish_color('wled/b', (3, 3, 3))
+        self.assertEqual(self.sink.get_stats()['buffered'], 2)
+        self.client.accept()
+        self.assertEqual(sorted(m[:2] for m in self.client.messages),
+                         [('wled/a/col', '#020202'), ('wled/b/col', '#030303')])
+        stats = self.sink.get_stats()
+        self.assertEqual((stats['buffered'], stats['dropped'], stats['published']), (0, 1, 2))
+
+    def test_stale_colors_dropped(self):
+        """Test that colors buffered too long ago are not replayed"""
+        with patch('app.utils.mqtt_sink.monotonic', return_value=100.0):
+            self.sink.publish_color('wled/a', (1, 1, 1))
+        with patch('app.utils.mqtt_sink.monotonic', return_value=200.0):
+            self.client.accept()
+        self.assertEqual(self.client.messages, [])
+        self.assertEqual(self.sink.get_stats()['dropped'], 1)
+
+    def test_disconnect_buffers_again(self):
+        """Test that publishing after a disconnect buffers until reconnected"""
+        self.client.accept()
+        self.client.drop()
+        self.assertFalse(self.sink.publish_color('wled/a', (9, 9, 9)))
+        self.client.accept()
+        self.assertEqual(self.client.messages[-1][:2], ('wled/a/col', '#090909'))
+
+    def test_invalid_qos(self):
+        """Test that QoS outside 0-2 is rejected"""
+        with self.assertRaises(ValueError):
+            MQTTSink('broker', qos=3, client=FakeClient())
+
+
+@unittest.skipUnless(TEST_BROKER, 'MQTT_TEST_BROKER not set')
+class TestMQTTSinkBroker(unittest.TestCase):
+
+    def test_round_trip(self):
+        """Test that a color published through a real broker arrives"""
+        from paho.mqtt import client as mqtt
+        host, _, port = TEST_BROKER.partition(':')
+        port = int(port or 1883)
+        received = threading.Event()
+        payloads = []
+
+        subscriber = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        subscriber.on_connect = lambda c, *_: c.subscribe('spotifytowled-test/#', qos=1)
+        subscriber.on_message = lambda c, u, msg: (payloads.append(msg.payload.decode()), received.set())
+        subscriber.connect(host, port)
+        subscriber.loop_start()
+        sink = MQTTSink(host, port=port, client_id='spotifytowled-test')
+        try:
+            # Published while connecting, so this also exercises the buffer
+            sink.publish_color('spotifytowled-test/strip', (0, 255, 0))
+            self.assertTrue(received.wait(5))
+            self.assertEqual(payloads, ['#00FF00'])
+        finally:
+            sink.close()
+            subscriber.loop_stop()
+            subscriber.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Unit tests for album art custom palettes
+"""
+import unittest
+from app.utils.palettes import (
+    PaletteCache, build_palette, palette_document, palette_id, palette_key
+)
+
+
+class TestBuildPalette(unittest.TestCase):
+
+    def test_stops_span_the_palette(self):
+        """Test that stops run from 0 to 255 through the colors"""
+        palette = build_palette([(255, 0, 0), (0, 0, 255)], stops=3)
+        self.assertEqual(palette, [(0, (255, 0, 0)), (128, (128, 0, 128)), (255, (0, 0, 255))])
+
+    def test_interpolates_many_colors(self):
+        """Test that more colors than stops are sampled, not truncated"""
+        colors = [(i, i, i) for i in range(0, 256, 5)]
+        palette = build_palette(colors, stops=16)
+        self.assertEqual(len(palette), 16)
+        self.assertEqual(palette[0][1], (0, 0, 0))
+        self.assertEqual(palette[-1][1], (255, 255, 255))
+
+    def test_single_color(self):
+        """Test that one color becomes a flat palette"""
+        self.assertEqual(build_palette([(9, 8, 7)], stops=2), [(0, (9, 8, 7)), (255, (9, 8, 7))])
+
+    def test_invalid_stops(self):
+        """Test that WLED's stop limit is enforced"""
+        with self.assertRaises(ValueError):
+            build_palette([(0, 0, 0)], stops=17)
+
+    def test_document_and_key(self):
+        """Test WLED's palette file format and content based keys"""
+        palette = build_palette([(255, 0, 0), (0, 255, 16)], stops=2)
+        self.assertEqual(palette_document(palette), {'palette': [0, 'ff0000', 255, '00ff10']})
+        self.assertEqual(palette_key(palette), palette_key(list(palette)))
+        self.assertNotEqual(palette_key(palette), palette_key(build_palette([(1, 0, 0)], stops=2)))
+        self.assertEqual(palette_id(0), 255)
+
+
+class TestPaletteCache(unittest.TestCase):
+
+    def test_repeat_palette_is_reused(self):
+        """Test that a stored palette is only selected again"""
+        cache = PaletteCache(first_slot=2, slots=2)
+        self.assertEqual(cache.assign('a', 'album1'), (2, False))
+        self.assertEqual(cache.assign('a', 'album1'), (2, True))
+        self.assertEqual(cache.assign('b', 'album1'), (2, False))
+        self.assertEqual((cache.uploads, cache.reuses), (2, 1))
+
+    def test_least_recently_used_slot_replaced(self):
+        """Test that slots are filled in order, then recycled"""
+        cache = PaletteCache(first_slot=0, slots=2)
+        cache.assign('a', 'album1')
+        cache.assign('a', 'album2')
+        cache.assign('a', 'album1')
+        self.assertEqual(cache.assign('a', 'album3'), (1, False))
+        self.assertEqual(cache.assign('a', 'album1'), (0, True))
+
+    def test_forget_frees_slot(self):
+        """Test that a failed upload does not count as stored"""
+        cache = PaletteCache(slots=2)
+        cache.assign('a', 'album1')
+        cache.forget('a', 'album1')
+        self.assertEqual(cache.assign('a', 'album1'), (0, False))
+
+    def test_invalid_slots(self):
+        """Test that slots beyond palette9.json are rejected"""
+        with self.assertRaises(ValueError):
+            PaletteCache(first_slot=8, slots=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Unit tests for album art pixel mapping and DDP output
+"""
+import socket
+import struct
+import unittest
+from io import BytesIO
+from time import perf_counter
+from unittest.mock import MagicMock, patch
+from PIL import Image
+from app.utils.ddp import DDPSender, build_packets, DDP_HEADER_SIZE, DDP_FLAG_PUSH, DDP_MAX_DATA
+from app.utils.pixel_mapper import PixelMapper, gradient_profile, resample_profile
+
+
+def make_cover(width=64, height=64):
+    """Left half red, right half blue"""
+    image = Image.new('RGB', (width, height), (255, 0, 0))
+    image.paste((0, 0, 255), (width // 2, 0, width, height))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestResample(unittest.TestCase):
+
+    def test_downsample_averages(self):
+        """Test that shrinking averages the covered area"""
+        pixels = resample_profile([(0, 0, 0), (100, 0, 0), (200, 0, 0), (100, 50, 0)], 2)
+        self.assertEqual(pixels, bytes((50, 0, 0, 150, 25, 0)))
+
+    def test_upsample_repeats(self):
+        """Test that stretching keeps each source color"""
+        pixels = resample_profile([(255, 0, 0), (0, 0, 255)], 4)
+        self.assertEqual(pixels, bytes((255, 0, 0) * 2 + (0, 0, 255) * 2))
+
+    def test_gradient(self):
+        """Test that a gradient runs from the first to the last palette color"""
+        pixels = resample_profile(gradient_profile([(0, 0, 0), (200, 100, 0)]), 100)
+        self.assertEqual(len(pixels), 300)
+        self.assertLess(pixels[0], 5)
+        self.assertGreater(pixels[-3], 195)
+
+
+class TestPixelMapper(unittest.TestCase):
+
+    @patch('app.utils.pixel_mapper.requests.get')
+    def test_frames_are_cached(self, mock_get):
+        """Test that the cover is fetched once and frames are cached per LED count"""
+        mock_get.return_value = MagicMock(content=make_cover())
+        mapper = PixelMapper()
+
+        frame = mapper.get_frame('http://cover', 10)
+        self.assertEqual(frame[:3], bytes((255, 0, 0)))
+        self.assertEqual(frame[-3:], bytes((0, 0, 255)))
+
+        self.assertIs(mapper.get_frame('http://cover', 10), frame)
+        self.assertEqual(len(mapper.get_frame('http://cover', 300)), 900)
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual((mapper.hits, mapper.misses), (1, 2))
+
+
+class TestDDP(unittest.TestCase):
+
+    def test_packets_fit_mtu(self):
+        """Test chunking, offsets and the PUSH flag"""
+        pixels = bytes(range(256)) * 12  # 1024 LEDs
+        packets = build_packets(pixels, sequence=3)
+        self.assertEqual(len(packets), 3)
+        self.assertTrue(all(len(p) <= DDP_HEADER_SIZE + DDP_MAX_DATA for p in packets))
+
+        flags, sequence, _, _, offset, length = struct.unpack('!BBBBIH', packets[1][:DDP_HEADER_SIZE])
+        self.assertEqual((sequence, offset, length), (3, DDP_MAX_DATA, DDP_MAX_DATA))
+        self.assertFalse(flags & DDP_FLAG_PUSH)
+        self.assertTrue(packets[-1][0] & DDP_FLAG_PUSH)
+        self.assertEqual(b''.join(p[DDP_HEADER_SIZE:] for p in packets), pixels)
+
+    def test_send_frame(self):
+        """Test that a frame arrives at a local listener"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.settimeout(1)
+        sender = DDPSender(port=listener.getsockname()[1], keepalive_s=0)
+        try:
+            self.assertEqual(sender.send_frame({'127.0.0.1': bytes((1, 2, 3)) * 10}), 1)
+            packet = listener.recv(2048)
+            self.assertEqual(packet[DDP_HEADER_SIZE:], bytes((1, 2, 3)) * 10)
+        finally:
+            sender.close()
+            listener.close()
+
+    def test_frame_rate_budget(self):
+        """Test that a few thousand LEDs take well under a 30 FPS frame"""
+        frame = resample_profile(gradient_profile([(255, 0, 0), (0, 255, 0), (0, 0, 255)]), 1000)
+        sender = DDPSender(port=9, keepalive_s=0)
+        try:
+            started = perf_counter()
+            for _ in range(30):
+                sender.send_frame({'127.0.0.1': frame, '127.0.0.2': frame, '127.0.0.3': frame})
+            per_frame = (perf_counter() - started) / 30
+        finally:
+            sender.close()
+        self.assertLess(per_frame, 1 / 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""
+Unit tests for the local playback clock
+"""
+import unittest
+from app.utils.playback_clock import PlaybackClock
+
+
+def _track(track_id='t1', progress_ms=0, duration_ms=200000, is_playing=True):
+    return {
+        'is_playing': is_playing,
+        'progress_ms': progress_ms,
+        'item': {'id': track_id, 'duration_ms': duration_ms}
+    }
+
+
+class TestPlaybackClock(unittest.TestCase):
+
+    def setUp(self):
+        """Create a clock and start a track at t=100"""
+        self.clock = PlaybackClock(seek_tolerance_s=1.5, min_horizon_s=10, max_horizon_s=120)
+        self.assertEqual(self.clock.update(_track(progress_ms=10000), 100.0, 100.0), 'start')
+
+    def test_extrapolates_between_polls(self):
+        """Test that position advances with the local clock"""
+        self.assertAlmostEqual(self.clock.position(now=105.0), 15.0)
+        self.assertAlmostEqual(self.clock.position(now=100.0), 10.0)
+
+    def test_uses_round_trip_midpoint(self):
+        """Test that the sample is placed in the middle of the request"""
+        clock = PlaybackClock()
+        clock.update(_track(progress_ms=0), 10.0, 11.0)
+        self.assertAlmostEqual(clock.position(now=12.5), 2.0)
+
+    def test_consistent_poll_grows_confidence(self):
+        """Test that agreeing samples extend the confidence horizon"""
+        before = self.clock.next_poll_in(300, now=100.0)
+        event = self.clock.update(_track(progress_ms=20200), 110.0, 110.0)
+
+        self.assertEqual(event, 'steady')
+        self.assertAlmostEqual(self.clock.last_drift_s, 0.2)
+        self.assertGreater(self.clock.next_poll_in(300, now=110.0), before)
+
+    def test_detects_seek(self):
+        """Test that a large drift is reported as a seek"""
+        event = self.clock.update(_track(progress_ms=90000), 110.0, 110.0)
+        self.assertEqual(event, 'seek')
+        self.assertAlmostEqual(self.clock.position(now=110.0), 90.0)
+
+    def test_detects_skip(self):
+        """Test that a new track ID is reported as a skip"""
+        self.assertEqual(self.clock.update(_track('t2', progress_ms=0), 110.0, 110.0), 'skip')
+        self.assertEqual(self.clock.track_id, 't2')
+
+    def test_detects_pause(self):
+        """Test that a missing or paused track stops the clock"""
+        self.assertEqual(self.clock.update(None, 110.0, 110.0), 'pause')
+        self.assertIsNone(self.clock.position(now=111.0))
+        self.assertEqual(self.clock.confidence(now=111.0), 0.0)
+        self.assertEqual(self.clock.update(_track(progress_ms=10000), 120.0, 120.0), 'start')
+
+    def test_confidence_decays(self):
+        """Test that confidence drops over time since the last sync"""
+        self.assertAlmostEqual(self.clock.confidence(now=100.0), 1.0)
+        self.assertLess(self.clock.confidence(now=120.0), self.clock.confidence(now=105.0))
+
+    def test_polls_at_track_end(self):
+        """Test that the next poll is scheduled just after the track ends"""
+        clock = PlaybackClock(min_horizon_s=1000)
+        clock.update(_track(progress_ms=195000, duration_ms=200000), 0.0, 0.0)
+        self.assertAlmostEqual(clock.next_poll_in(60, now=0.0), 5.5)
+        self.assertEqual(clock.position(now=300.0), 200.0)
+
+    def test_uncertain_clock_polls_early(self):
+        """Test that a fresh anchor polls before the configured interval"""
+        self.assertLess(self.clock.next_poll_in(30, max_interval=60, now=100.0), 30)
+
+    def test_confident_clock_polls_later(self):
+        """Test that agreeing samples stretch the interval mid-track, up to the cap"""
+        clock = PlaybackClock()
+        clock.update(_track(progress_ms=0, duration_ms=600000), 0.0, 0.0)
+        for t in (5.0, 15.0, 35.0, 75.0):
+            clock.update(_track(progress_ms=int(t * 1000), duration_ms=600000), t, t)
+        
+        self.assertGreater(clock.next_poll_in(30, max_interval=120, now=75.0), 30)
+        self.assertEqual(clock.next_poll_in(30, max_interval=45, now=75.0), 45)
+        self.assertEqual(clock.next_poll_in(30, now=75.0),
+                         clock.next_poll_in(30, max_interval=1000, now=75.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+"""
+Unit tests for the Home Assistant integration-mode proxy
+"""
+import importlib.util
+import io
+import os
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+
+PROXY_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'homeassistant', 'spotifytowled', 'proxy.py')
+
+spec = importlib.util.spec_from_file_location('ha_proxy', PROXY_PATH)
+ha_proxy = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ha_proxy)
+
+release_stream = threading.Event()
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith('/events'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for event in (b'data: one\n\n', b'data: two\n\n'):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(event), event))
+                self.wfile.flush()
+                release_stream.wait(5)
+            self.wfile.write(b'0\r\n\r\n')
+            return
+
+        body = f'path={self.path}'.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'session=abc')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestProxy(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a local upstream server"""
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), UpstreamHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.session = ha_proxy.create_session()
+        app = ha_proxy.create_app(f'http://127.0.0.1:{cls.server.server_port}', cls.session)
+        cls.client = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the upstream server"""
+        release_stream.set()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_forwards_path_and_query(self):
+        """Test that path and query string reach the upstream"""
+        response = self.client.get('/api/status?x=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'path=/api/status?x=1')
+        self.assertEqual(response.headers['Content-Length'], str(len(response.data)))
+
+    def test_timing_header(self):
+        """Test that responses carry upstream and proxy timings"""
+        timing = self.client.get('/').headers['Server-Timing']
+        self.assertIn('upstream;dur=', timing)
+        self.assertIn('proxy;dur=', timing)
+
+    def test_streams_request_body(self):
+        """Test that request bodies are forwarded"""
+        payload = os.urandom(200000)
+        response = self.client.post('/upload', data=payload,
+                                    content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, payload)
+
+    def test_streams_server_sent_events(self):
+        """Test that events are relayed before the upstream response ends"""
+        release_stream.clear()
+        response = self.client.get('/events', buffered=False)
+        chunks = iter(response.response)
+
+        self.assertEqual(next(chunks), b'data: one\n\n')
+        release_stream.set()
+        self.assertEqual(b''.join(chunks), b'data: two\n\n')
+        response.close()
+
+    def test_session_does_not_store_cookies(self):
+        """Test that upstream cookies are not shared between clients"""
+        self.client.get('/')
+        self.assertEqual(len(self.session.cookies), 0)
+
+    def test_upstream_unreachable(self):
+        """Test that connection failures return 502"""
+        app = ha_proxy.create_app('http://127.0.0.1:9', ha_proxy.create_session())
+        response = app.test_client().get('/')
+        self.assertEqual(response.status_code, 502)
+
+
+class TestProxyWerkzeugUpstream(unittest.TestCase):
+    """Request bodies against a real WSGI server, which checks the framing"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Start a werkzeug upstream that echoes what it parsed"""
+        upstream = Flask('upstream')
+
+        @upstream.route('/echo', methods=['POST'])
+        def echo():
+            return jsonify({'form': request.form.to_dict(), 'length': len(request.get_data())})
+
+        cls.server = make_server('127.0.0.1', 0, upstream, threaded=True)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        app = ha_proxy.create_app(f'http://127.0.0.1:{cls.server.server_port}', ha_proxy.create_session())
+        cls.client = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the upstream server"""
+        cls.server.shutdown()
+
+    def test_form_post(self):
+        """Test that a form POST keeps its Content-Length framing"""
+        response = self.client.post('/echo', data={'ip': '10.0.0.5', 'name': 'desk'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['form'], {'ip': '10.0.0.5', 'name': 'desk'})
+
+    def test_chunked_post(self):
+        """Test that a body of unknown length is forwarded chunked"""
+        payload = os.urandom(150000)
+        response = self.client.post('/echo', input_stream=io.BytesIO(payload),
+                                    headers={'Transfer-Encoding': 'chunked'},
+                                    # As set by WSGI servers that decoded the chunked request
+                                    environ_overrides={'wsgi.input_terminated': True},
+                                    content_type='application/octet-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['length'], len(payload))
+
+
+if __name__ == '__main__':
+    unittest.main()
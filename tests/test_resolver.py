@@ -0,0 +1,131 @@
+"""
+Unit tests for the hostname resolution cache
+"""
+import socket
+import threading
+import unittest
+from time import sleep
+from unittest.mock import Mock, patch
+from app.utils.resolver import HostResolver, format_host, is_address
+from app.utils.wled_controller import WLEDController
+
+
+def addrinfo(address, family=socket.AF_INET):
+    return [(family, socket.SOCK_STREAM, 6, '', (address, 0))]
+
+
+class TestHostResolver(unittest.TestCase):
+
+    def setUp(self):
+        """Create a resolver with short TTLs"""
+        self.resolver = HostResolver(ttl_s=0.2, negative_ttl_s=0.2)
+        self.addCleanup(self.resolver.close)
+
+    def test_addresses_pass_through(self):
+        """Test that IP literals are never looked up"""
+        with patch('app.utils.resolver.socket.getaddrinfo') as mock_lookup:
+            self.assertEqual(self.resolver.resolve('192.168.1.10'), '192.168.1.10')
+            mock_lookup.assert_not_called()
+        self.assertTrue(is_address('fe80::1'))
+        self.assertEqual(format_host('fe80::1'), '[fe80::1]')
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_cached(self, mock_lookup):
+        """Test that a name is looked up once while fresh"""
+        mock_lookup.return_value = addrinfo('10.0.0.5')
+        for _ in range(3):
+            self.assertEqual(self.resolver.resolve('wled-kitchen.local'), '10.0.0.5')
+        self.assertEqual(mock_lookup.call_count, 1)
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_prefers_ipv4(self, mock_lookup):
+        """Test that IPv4 addresses win over IPv6"""
+        mock_lookup.return_value = addrinfo('fe80::2', socket.AF_INET6) + addrinfo('10.0.0.6')
+        self.assertEqual(self.resolver.resolve('wled.local'), '10.0.0.6')
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_negative_cache(self, mock_lookup):
+        """Test that failing names are not looked up on every call"""
+        mock_lookup.side_effect = socket.gaierror('not found')
+        self.assertIsNone(self.resolver.resolve('missing.local'))
+        self.assertIsNone(self.resolver.resolve('missing.local'))
+        self.assertEqual(mock_lookup.call_count, 1)
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_stale_served_during_refresh(self, mock_lookup):
+        """Test that an expired entry is served while refreshing in the background"""
+        mock_lookup.return_value = addrinfo('10.0.0.5')
+        self.resolver.resolve('wled.local')
+        sleep(0.3)
+
+        release = threading.Event()
+
+        def slow_lookup(*args, **kwargs):
+            release.wait(2)
+            return addrinfo('10.0.0.7')
+
+        mock_lookup.side_effect = slow_lookup
+        self.assertEqual(self.resolver.resolve('wled.local'), '10.0.0.5')
+        release.set()
+        self.resolver.prefetch(['wled.local'])
+        self.assertEqual(self.resolver.resolve('wled.local'), '10.0.0.7')
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_failed_refresh_keeps_address(self, mock_lookup):
+        """Test that a known address survives a failed refresh"""
+        mock_lookup.return_value = addrinfo('10.0.0.5')
+        self.resolver.resolve('wled.local')
+        mock_lookup.side_effect = socket.gaierror('timeout')
+        self.resolver.prefetch(['wled.local'])
+        self.assertEqual(self.resolver.resolve('wled.local'), '10.0.0.5')
+        self.assertEqual(self.resolver.get_stats()['hosts']['wled.local']['consecutive_failures'], 1)
+
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_prefetch_concurrent(self, mock_lookup):
+        """Test that prefetching looks names up in parallel"""
+        active = []
+        peak = []
+
+        def lookup(host, *args, **kwargs):
+            active.append(host)
+            peak.append(len(active))
+            sleep(0.1)
+            active.remove(host)
+            return addrinfo('10.0.0.1')
+
+        mock_lookup.side_effect = lookup
+        self.resolver.prefetch([f'wled-{n}.local' for n in range(4)])
+        self.assertGreater(max(peak), 1)
+        self.assertEqual(self.resolver.get_stats()['lookups'], 4)
+
+
+class TestControllerUsesResolver(unittest.TestCase):
+
+    @patch('app.utils.wled_controller.requests.post')
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_push_uses_cached_address(self, mock_lookup, mock_post):
+        """Test that requests go to the resolved address"""
+        mock_lookup.return_value = addrinfo('10.0.0.5')
+        mock_post.return_value = Mock(status_code=200)
+        resolver = HostResolver()
+        self.addCleanup(resolver.close)
+        controller = WLEDController(max_retries=1, retry_delay=0, resolver=resolver)
+
+        self.assertTrue(controller.set_color('wled.local', 1, 2, 3))
+        self.assertEqual(mock_post.call_args[0][0], 'http://10.0.0.5/json/state')
+
+    @patch('app.utils.wled_controller.requests.post')
+    @patch('app.utils.resolver.socket.getaddrinfo')
+    def test_unresolvable_fails_fast(self, mock_lookup, mock_post):
+        """Test that unresolvable names fail without a request"""
+        mock_lookup.side_effect = socket.gaierror('not found')
+        resolver = HostResolver()
+        self.addCleanup(resolver.close)
+        controller = WLEDController(max_retries=2, retry_delay=0, resolver=resolver)
+
+        self.assertFalse(controller.set_color('missing.local', 1, 2, 3))
+        mock_post.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
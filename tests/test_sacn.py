@@ -0,0 +1,104 @@
+"""
+Unit tests for the E1.31 (sACN) output
+"""
+import socket
+import struct
+import unittest
+from app.utils.sacn import (
+    SACNSender, build_universe_map, multicast_group, HEADER_SIZE, OPTION_STREAM_TERMINATED
+)
+
+
+class TestUniverseMap(unittest.TestCase):
+
+    def test_multicast_group(self):
+        """Test the universe to multicast address mapping"""
+        self.assertEqual(multicast_group(1), '239.255.0.1')
+        self.assertEqual(multicast_group(258), '239.255.1.2')
+
+    def test_devices_share_universe(self):
+        """Test that several segments can live in one universe"""
+        universes = build_universe_map([
+            {'universe': 1, 'led_count': 10},
+            {'universe': 1, 'start_channel': 31, 'led_count': 20}
+        ])
+        self.assertEqual(universes, {1: [(0, 10), (30, 20)]})
+
+    def test_long_strip_spans_universes(self):
+        """Test that pixels continue in the next universe without straddling"""
+        universes = build_universe_map([{'universe': 5, 'led_count': 200}])
+        self.assertEqual(universes, {5: [(0, 170)], 6: [(0, 30)]})
+
+    def test_invalid_outputs(self):
+        """Test that invalid mappings are rejected"""
+        with self.assertRaises(ValueError):
+            build_universe_map([{'universe': 0, 'led_count': 10}])
+        with self.assertRaises(ValueError):
+            build_universe_map([{'universe': 1, 'start_channel': 600, 'led_count': 10}])
+        with self.assertRaises(ValueError):
+            build_universe_map([{'universe': 1, 'led_count': 0}])
+
+
+class TestSACNSender(unittest.TestCase):
+
+    def setUp(self):
+        """Listen on a local UDP socket standing in for the multicast groups"""
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.listener.bind(('127.0.0.1', 0))
+        self.listener.settimeout(1)
+        self.sender = SACNSender(
+            [{'universe': 1, 'led_count': 200}, {'universe': 3, 'led_count': 2}],
+            priority=150, port=self.listener.getsockname()[1],
+            destination='127.0.0.1', keepalive_s=0
+        )
+
+    def tearDown(self):
+        """Close sockets"""
+        self.sender.close()
+        self.listener.close()
+
+    def receive(self, count):
+        packets = {}
+        for _ in range(count):
+            packet = self.listener.recv(1024)
+            universe = struct.unpack('!H', packet[113:115])[0]
+            packets[universe] = packet
+        return packets
+
+    def test_one_packet_per_universe(self):
+        """Test that a frame is one packet per universe with the color data"""
+        self.assertEqual(self.sender.send_color((10, 20, 30)), 3)
+        packets = self.receive(3)
+        self.assertEqual(sorted(packets), [1, 2, 3])
+
+        packet = packets[1]
+        self.assertEqual(packet[4:16], b'ASC-E1.17\x00\x00\x00')
+        self.assertEqual(packet[108], 150)
+        self.assertEqual(len(packet), HEADER_SIZE + 510)
+        self.assertEqual(packet[HEADER_SIZE:HEADER_SIZE + 6], bytes((10, 20, 30, 10, 20, 30)))
+        # Lengths in the flags/length fields match the packet
+        self.assertEqual(struct.unpack('!H', packet[16:18])[0] & 0x0FFF, len(packet) - 16)
+        self.assertEqual(struct.unpack('!H', packet[123:125])[0], 511)
+        self.assertEqual(len(packets[3]), HEADER_SIZE + 6)
+
+    def test_sequence_numbers(self):
+        """Test that each universe counts its own sequence"""
+        self.sender.send_color((1, 1, 1))
+        first = self.receive(3)
+        self.sender.send_color((2, 2, 2))
+        second = self.receive(3)
+        for universe in (1, 2, 3):
+            self.assertEqual(first[universe][111], 0)
+            self.assertEqual(second[universe][111], 1)
+
+    def test_close_terminates_stream(self):
+        """Test that closing sends stream-terminated packets"""
+        self.sender.send_color((1, 1, 1))
+        self.receive(3)
+        self.sender.close()
+        packets = self.receive(3)
+        self.assertTrue(all(p[112] & OPTION_STREAM_TERMINATED for p in packets.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
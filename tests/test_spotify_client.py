@@ -0,0 +1,133 @@
+"""
+Unit tests for the rate-limit-aware Spotify client
+"""
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from time import monotonic
+from unittest.mock import Mock
+from app.utils.spotify_client import (
+    RateLimitedClient, RateLimitedError, PRIORITY_BACKGROUND, PRIORITY_ESSENTIAL
+)
+from app.utils.spotify_manager import SpotifyManager
+
+
+class FakeSpotifyException(Exception):
+    """Mimics spotipy.SpotifyException"""
+
+    def __init__(self, http_status, headers=None):
+        super().__init__(f"http status: {http_status}")
+        self.http_status = http_status
+        self.headers = headers
+
+
+class TestRateLimitedClient(unittest.TestCase):
+
+    def test_budget_exhausted(self):
+        """Calls beyond the burst are refused without a timeout"""
+        client = RateLimitedClient(requests_per_minute=60, burst=3)
+        for _ in range(3):
+            client.acquire()
+        with self.assertRaises(RateLimitedError) as ctx:
+            client.acquire()
+        self.assertGreater(ctx.exception.retry_after, 0)
+
+    def test_background_keeps_reserve(self):
+        """Background calls stop at the reserve, essential calls do not"""
+        client = RateLimitedClient(requests_per_minute=60, burst=4, background_reserve=0.5)
+        client.acquire(PRIORITY_BACKGROUND)
+        client.acquire(PRIORITY_BACKGROUND)
+        with self.assertRaises(RateLimitedError):
+            client.acquire(PRIORITY_BACKGROUND)
+        client.acquire(PRIORITY_ESSENTIAL)
+        self.assertEqual(client.get_metrics()['rejected_background'], 1)
+
+    def test_429_blocks_callers(self):
+        """A 429 response blocks every caller for Retry-After seconds"""
+        client = RateLimitedClient(requests_per_minute=600)
+
+        def throttled():
+            raise FakeSpotifyException(429, {'Retry-After': '30'})
+
+        with self.assertRaises(RateLimitedError) as ctx:
+            client.call(throttled)
+        self.assertEqual(ctx.exception.retry_after, 30)
+
+        with self.assertRaises(RateLimitedError):
+            client.call(lambda: 'never called')
+
+        metrics = client.get_metrics()
+        self.assertEqual(metrics['throttled'], 1)
+        self.assertGreater(metrics['blocked_for_seconds'], 25)
+
+    def test_other_errors_pass_through(self):
+        """Non-429 errors are not treated as rate limiting"""
+        client = RateLimitedClient()
+
+        def failing():
+            raise FakeSpotifyException(500)
+
+        with self.assertRaises(FakeSpotifyException):
+            client.call(failing)
+        self.assertEqual(client.get_metrics()['throttled'], 0)
+
+    def test_call_returns_result(self):
+        """Successful calls pass arguments and return the result"""
+        client = RateLimitedClient()
+        self.assertEqual(client.call(lambda a, b=0: a + b, 1, b=2), 3)
+        self.assertEqual(client.get_metrics()['calls'], 1)
+
+    def test_parse_retry_after(self):
+        """Missing or invalid Retry-After headers fall back to a default"""
+        self.assertEqual(RateLimitedClient._parse_retry_after({'Retry-After': '7'}), 7)
+        self.assertEqual(RateLimitedClient._parse_retry_after(None), 5)
+        self.assertEqual(RateLimitedClient._parse_retry_after({'Retry-After': 'soon'}), 5)
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Answers every request with 429 and Retry-After: 1"""
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(429)
+        self.send_header('Retry-After', '1')
+        self.send_header('Content-Type', 'application/json')
+        body = b'{"error": {"status": 429, "message": "API rate limit exceeded"}}'
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSpotifyManagerClient(unittest.TestCase):
+
+    def setUp(self):
+        ThrottlingHandler.requests = 0
+        self.server = HTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_429_reaches_rate_limiter_without_retries(self):
+        """A 429 costs one request and is not slept on inside spotipy"""
+        manager = SpotifyManager('id', 'secret', 'http://localhost/callback', 'scope')
+        manager._auth_manager = Mock()
+        manager._auth_manager.get_access_token.return_value = 'token'
+        client = manager._create_client()
+        client.prefix = f"http://127.0.0.1:{self.server.server_port}/"
+
+        started = monotonic()
+        with self.assertRaises(RateLimitedError) as ctx:
+            manager.api.call(client.current_user)
+        self.assertLess(monotonic() - started, 1)
+        self.assertEqual(ThrottlingHandler.requests, 1)
+        self.assertEqual(ctx.exception.retry_after, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
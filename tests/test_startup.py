@@ -0,0 +1,64 @@
+"""
+Unit tests for startup cost (lazy imports and singletons)
+"""
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budget for importing the core package on a developer machine. A Pi is
+# several times slower, so regressions here show up as seconds at boot.
+IMPORT_BUDGET_SECONDS = 0.5
+
+HEAVY_MODULES = ['flask', 'requests', 'spotipy', 'colorthief', 'PIL']
+
+PROBE = """
+import json, sys
+from time import perf_counter
+started = perf_counter()
+import app.core.sync_engine
+import app.core.config
+elapsed = perf_counter() - started
+print(json.dumps({
+    'elapsed': elapsed,
+    'loaded': [m for m in %r if m in sys.modules and
+               type(sys.modules[m]).__name__ != '_LazyModule'],
+    'config_created': app.core.config._config is not None,
+    'engine_created': app.core.sync_engine._sync_engine is not None,
+}))
+""" % (HEAVY_MODULES,)
+
+
+class TestStartup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Import the core package in a fresh interpreter"""
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        cls.result = json.loads(output.strip().splitlines()[-1])
+
+    def test_import_time_within_budget(self):
+        """Test that importing the core package stays within budget"""
+        self.assertLess(self.result['elapsed'], IMPORT_BUDGET_SECONDS)
+
+    def test_heavy_dependencies_not_loaded(self):
+        """Test that heavy dependencies are deferred until first use"""
+        self.assertEqual(self.result['loaded'], [])
+
+    def test_singletons_created_lazily(self):
+        """Test that importing does not create config or engine"""
+        self.assertFalse(self.result['config_created'])
+        self.assertFalse(self.result['engine_created'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Unit tests for immutable status snapshots
+"""
+import json
+import os
+import tempfile
+import unittest
+from app.core.config import Config
+from app.core.status import StatusSnapshot
+from app.core.sync_engine import SyncEngine
+
+
+class TestStatusSnapshot(unittest.TestCase):
+
+    def test_snapshot_is_immutable(self):
+        """Test that snapshot fields cannot be modified"""
+        snapshot = StatusSnapshot(
+            current_track={'name': 'Song'},
+            color_history=[{'color': (1, 2, 3), 'track': 'Song'}]
+        )
+
+        with self.assertRaises(Exception):
+            snapshot.is_running = True
+        with self.assertRaises(TypeError):
+            snapshot.current_track['name'] = 'Other'
+        with self.assertRaises(TypeError):
+            snapshot.color_history[0]['track'] = 'Other'
+
+    def test_snapshot_does_not_alias_source(self):
+        """Test that later changes to the source data are not visible"""
+        track = {'name': 'Song'}
+        history = [{'color': (1, 2, 3)}]
+        snapshot = StatusSnapshot(current_track=track, color_history=history)
+
+        track['name'] = 'Other'
+        history.append({'color': (4, 5, 6)})
+
+        self.assertEqual(snapshot.current_track['name'], 'Song')
+        self.assertEqual(len(snapshot.color_history), 1)
+
+    def test_json_serialized_once(self):
+        """Test that JSON is precomputed and matches to_dict()"""
+        snapshot = StatusSnapshot(version=3, current_color=(255, 0, 16))
+
+        data = json.loads(snapshot.json_bytes)
+        self.assertEqual(data, snapshot.to_dict())
+        self.assertEqual(data['current_color_hex'], '#FF0010')
+        self.assertEqual(data['version'], 3)
+
+
+class TestSyncEngineStatus(unittest.TestCase):
+
+    def setUp(self):
+        """Create an engine with a temporary config"""
+        fd, self.config_path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        os.unlink(self.config_path)
+        config = Config(config_path=self.config_path)
+        config.set('HISTORY_DB_PATH', ':memory:')
+        self.engine = SyncEngine(config=config)
+
+    def test_publish_increments_version(self):
+        """Test that each state change publishes a new version"""
+        before = self.engine.get_status_snapshot()
+
+        self.assertTrue(self.engine.set_color_extraction_method('dominant'))
+        after = self.engine.get_status_snapshot()
+
+        self.assertIsNot(before, after)
+        self.assertEqual(after.version, before.version + 1)
+        self.assertEqual(after.color_extraction_method, 'dominant')
+        self.assertEqual(before.color_extraction_method, 'vibrant')
+        self.assertNotEqual(before.etag, after.etag)
+
+    def test_get_status_returns_copy(self):
+        """Test that get_status() callers cannot mutate engine state"""
+        status = self.engine.get_status()
+        status['color_history'].append({'color': (1, 1, 1)})
+
+        self.assertEqual(self.engine.get_status()['color_history'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
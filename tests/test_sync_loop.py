@@ -0,0 +1,136 @@
+"""
+Unit tests for single iterations of the sync loop
+"""
+import os
+import tempfile
+import threading
+import unittest
+from time import sleep
+from unittest.mock import Mock, patch
+from app.core.config import Config
+from app.core.sync_engine import SyncEngine
+
+
+class TestSyncLoop(unittest.TestCase):
+
+    def setUp(self):
+        """Create an engine with faked Spotify and devices"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = Config(config_path=os.path.join(self.temp_dir.name, 'config.json'))
+        self.config.update({
+            'WLED_IPS': ['10.0.0.1'], 'WLED_WEBSOCKET': False, 'HISTORY_DB_PATH': ':memory:',
+            'COLOR_STORE_PATH': ':memory:', 'REFRESH_INTERVAL': 30
+        })
+        self.engine = SyncEngine(self.config)
+        self.engine.wled_controller.set_color = Mock(return_value=True)
+        self.engine.spotify_manager = self.spotify = Mock()
+        self.spotify.is_authenticated = True
+        self.spotify.is_track_changed.return_value = True
+        self.spotify.get_track_info.return_value = {'id': 'track2', 'name': 'Song', 'artist': 'Artist'}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_once(self, track):
+        """Run one loop iteration and return how long it then slept"""
+        self.spotify.get_current_track.return_value = track
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            self.engine.is_running = False
+
+        self.engine.is_running = True
+        with patch('app.core.sync_engine.sleep', side_effect=sleep):
+            self.engine._sync_loop()
+        return slept[0]
+
+    def test_track_change_stops_previous_beat_timeline(self):
+        """Test that a new track without a cover does not keep the old beats"""
+        self.engine.beat_scheduler.stop = Mock()
+        with patch.object(type(self.engine.beat_scheduler), 'is_playing', True):
+            self.spotify.get_album_image_url.return_value = None
+            self.run_once({'is_playing': True, 'item': {'id': 'track2'}})
+        self.engine.beat_scheduler.stop.assert_called_once_with()
+
+    def test_stop_ends_library_job_and_worker_processes(self):
+        """Test that stopping the engine leaves no extraction processes behind"""
+        self.engine.library_job = Mock()
+        self.engine.color_extractor.close = Mock()
+        self.engine.stop()
+        self.engine.library_job.stop.assert_called_once_with()
+        self.engine.color_extractor.close.assert_called_once_with()
+
+    def test_pixels_skip_devices_without_profile(self):
+        """Test that a device whose profile is unknown does not abort the pixel stage"""
+        profile = Mock()
+        profile.supports.return_value = True
+        self.engine._get_led_counts = Mock(return_value={'10.0.0.1': 3, '10.0.0.2': 3})
+        self.engine.device_registry.get = Mock(side_effect={'10.0.0.2': profile}.get)
+        self.engine.pixel_mapper.get_frame = Mock(return_value=[(1, 2, 3)] * 3)
+        self.engine.resolver.resolve = Mock(side_effect=lambda ip: ip)
+        with patch('app.core.sync_engine.DDPSender') as sender:
+            self.engine._send_pixels('http://cover')
+        frames = sender.return_value.send_frame.call_args[0][0]
+        self.assertEqual(list(frames), ['10.0.0.2'])
+
+    def test_failed_push_keeps_device_profile(self):
+        """Test that a flaky device is not queried again after every failed push"""
+        self.engine.wled_controller.set_color.return_value = False
+        self.engine.device_registry.invalidate = Mock()
+        self.assertFalse(self.engine._push_color('10.0.0.1', (1, 2, 3)))
+        self.engine.device_registry.invalidate.assert_not_called()
+
+    def test_sacn_sender_swaps_do_not_race_beat_frames(self):
+        """Test that a settings change under beat frames leaves no sender running"""
+        created = []
+
+        def sender(outputs, priority):
+            sleep(0.001)
+            created.append(Mock())
+            return created[-1]
+
+        self.config.data.update({'E131_ENABLED': True, 'E131_OUTPUTS': [{'universe': 1}]})
+        stop = threading.Event()
+
+        def beat():
+            while not stop.is_set():
+                self.engine._send_beat_frame((1, 2, 3))
+
+        with patch('app.core.sync_engine.SACNSender', side_effect=sender):
+            threads = [threading.Thread(target=beat) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for universe in range(2, 50):
+                self.config.data['E131_OUTPUTS'] = [{'universe': universe}]
+                self.engine._push_to_devices((4, 5, 6))
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.engine._close_sacn()
+
+        self.assertGreater(len(created), 1)
+        for mock in created:
+            mock.close.assert_called_once_with()
+
+    def test_early_exits_use_playback_clock_and_deadline(self):
+        """Test that a track without a cover still ends like every other iteration"""
+        self.spotify.get_album_image_url.return_value = None
+        with patch.object(self.engine.playback_clock, 'next_poll_in', return_value=4.5) as next_poll_in:
+            slept = self.run_once({'is_playing': True, 'item': {'id': 'track2'}})
+
+        self.assertEqual(slept, 4.5)
+        self.assertEqual(next_poll_in.call_args[1]['max_interval'], 60)
+        self.assertEqual(self.engine.deadline_stats.get_stats()['iterations'], 1)
+
+    def test_missing_color_uses_playback_clock(self):
+        """Test that a cover without a color does not fall back to REFRESH_INTERVAL"""
+        self.spotify.get_album_image_url.return_value = 'http://cover'
+        self.engine._extract_color = Mock(return_value=None)
+        with patch.object(self.engine.playback_clock, 'next_poll_in', return_value=4.5):
+            self.assertEqual(self.run_once({'is_playing': True, 'item': {'id': 'track2'}}), 4.5)
+        self.engine.wled_controller.set_color.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Unit tests for the in-memory token cache and background refresher
+"""
+import json
+import os
+import tempfile
+import unittest
+from time import sleep, time
+from unittest.mock import patch
+from app.utils.token_cache import MemoryTokenCache, TokenRefresher
+
+
+class FakeAuthManager:
+    """Mimics SpotifyOAuth.refresh_access_token saving through the cache"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    def refresh_access_token(self, refresh_token):
+        self.calls += 1
+        token = {'access_token': f'access{self.calls}', 'refresh_token': refresh_token,
+                 'expires_at': int(time()) + 3600}
+        self.cache.save_token_to_cache(token)
+        return token
+
+
+class TestMemoryTokenCache(unittest.TestCase):
+
+    def setUp(self):
+        """Create a cache in a temporary directory"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, '.spotify_cache')
+        self.cache = MemoryTokenCache(self.path)
+
+    def tearDown(self):
+        """Clean up temporary files"""
+        self.temp_dir.cleanup()
+
+    def test_reads_file_once(self):
+        """Test that the cache file is read only on first access"""
+        with open(self.path, 'w') as f:
+            json.dump({'access_token': 'a'}, f)
+
+        with patch.object(self.cache, '_read_file', wraps=self.cache._read_file) as read:
+            self.assertEqual(self.cache.get_cached_token()['access_token'], 'a')
+            self.cache.get_cached_token()
+            self.assertEqual(read.call_count, 1)
+
+    def test_writes_only_on_change(self):
+        """Test that saving an unchanged token does not touch the file"""
+        token = {'access_token': 'a', 'expires_at': 1}
+        with patch.object(self.cache, '_write_file') as write:
+            self.cache.save_token_to_cache(token)
+            self.cache.save_token_to_cache(dict(token))
+            self.assertEqual(write.call_count, 1)
+
+    def test_atomic_write(self):
+        """Test that the cache file is written completely and privately"""
+        self.cache.save_token_to_cache({'access_token': 'b'})
+
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {'access_token': 'b'})
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['.spotify_cache'])
+
+
+class TestTokenRefresher(unittest.TestCase):
+
+    def setUp(self):
+        """Create a cache holding a token that expires soon"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = MemoryTokenCache(os.path.join(self.temp_dir.name, '.spotify_cache'))
+        self.cache.save_token_to_cache({'access_token': 'old', 'refresh_token': 'r',
+                                        'expires_at': int(time()) + 200})
+        self.auth = FakeAuthManager(self.cache)
+
+    def tearDown(self):
+        """Clean up temporary files"""
+        self.temp_dir.cleanup()
+
+    def test_refreshes_ahead_of_expiry(self):
+        """Test that a token inside the margin is refreshed in the background"""
+        refresher = TokenRefresher(self.auth, self.cache, margin_s=300, jitter_s=0)
+        refresher.start()
+        for _ in range(100):
+            if refresher.refresh_count:
+                break
+            sleep(0.01)
+        refresher.stop()
+
+        self.assertEqual(self.auth.calls, 1)
+        self.assertEqual(self.cache.get_cached_token()['access_token'], 'access1')
+        self.assertGreater(refresher.seconds_until_refresh(), 3000)
+
+    def test_no_refresh_when_far_from_expiry(self):
+        """Test that fresh tokens are left alone"""
+        refresher = TokenRefresher(self.auth, self.cache, margin_s=60, jitter_s=0)
+        refresher.start()
+        sleep(0.05)
+        refresher.stop()
+
+        self.assertEqual(self.auth.calls, 0)
+
+    def test_jitter_within_bounds(self):
+        """Test that the refresh time includes bounded jitter"""
+        refresher = TokenRefresher(self.auth, self.cache, margin_s=60, jitter_s=30)
+        delay = refresher.seconds_until_refresh()
+        self.assertLessEqual(delay, 200 - 60 + 1)
+        self.assertGreaterEqual(delay, 200 - 60 - 30 - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
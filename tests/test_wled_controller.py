@@ -103,6 +103,53 @@ class TestWLEDController(unittest.TestCase):
         self.assertEqual(sent_color[0], 255)  # 300 -> 255
         self.assertEqual(sent_color[1], 0)    # -50 -> 0
         self.assertEqual(sent_color[2], 128)  # 128 -> 128
+    
+    @patch('app.utils.wled_controller.requests.post')
+    def test_set_color_segments(self, mock_post):
+        """Test that every given segment is colored"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_post.return_value = mock_response
+        
+        self.controller.set_color('192.168.1.100', 10, 20, 30, segment_ids=[0, 2])
+        
+        payload = mock_post.call_args[1]['json']
+        self.assertEqual(payload['seg'], [
+            {'id': 0, 'col': [[10, 20, 30]]},
+            {'id': 2, 'col': [[10, 20, 30]]}
+        ])
+    
+    @patch('app.utils.wled_controller.monotonic')
+    @patch('app.utils.wled_controller.requests.post')
+    def test_set_color_deadline(self, mock_post, mock_monotonic):
+        """Test that attempts are capped by the deadline and not retried past it"""
+        mock_post.side_effect = Exception("Connection error")
+        mock_monotonic.return_value = 100.0
+        self.controller.retry_delay = 2
+        
+        self.assertFalse(self.controller.set_color('192.168.1.100', 1, 2, 3, deadline=101.0))
+        
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(mock_post.call_args[1]['timeout'], 1.0)
+    
+    @patch('app.utils.wled_controller.requests.post')
+    def test_upload_and_select_palette(self, mock_post):
+        """Test that palettes are uploaded as paletteN.json and selected by id"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_post.return_value = mock_response
+        
+        self.assertTrue(self.controller.upload_palette('192.168.1.100', 3, {'palette': [0, 'ff0000']}))
+        url = mock_post.call_args[0][0]
+        filename, content, _ = mock_post.call_args[1]['files']['data']
+        self.assertTrue(url.endswith('/upload'))
+        self.assertEqual((filename, content), ('palette3.json', '{"palette":[0,"ff0000"]}'))
+        
+        self.controller.set_palette('192.168.1.100', 252, effect_id=65, segment_ids=[0, 1])
+        self.assertEqual(mock_post.call_args[1]['json']['seg'], [
+            {'pal': 252, 'fx': 65, 'id': 0},
+            {'pal': 252, 'fx': 65, 'id': 1}
+        ])
 
 
 if __name__ == '__main__':
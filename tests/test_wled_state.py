@@ -0,0 +1,116 @@
+"""
+Unit tests for the WLED WebSocket state mirror
+"""
+import json
+import queue
+import unittest
+from time import monotonic, sleep
+from unittest.mock import patch
+from app.utils.wled_state import WLEDStateMirror, websocket
+
+
+class FakeWebSocket:
+    """Stands in for a websocket-client connection to a WLED device"""
+
+    def __init__(self):
+        self.frames = queue.Queue()
+        self.sent = []
+        self.closed = False
+
+    def push_state(self, **state):
+        self.frames.put((websocket.ABNF.OPCODE_TEXT, json.dumps({'state': state, 'info': {'leds': {'count': 30}}})))
+
+    def send(self, data):
+        self.sent.append(data)
+
+    def settimeout(self, timeout):
+        pass
+
+    def ping(self):
+        pass
+
+    def recv_data(self, control_frame=False):
+        frame = self.frames.get()
+        if frame is None:
+            raise ConnectionError('closed')
+        return frame
+
+    def close(self):
+        self.closed = True
+        self.frames.put(None)
+
+
+def wait_for(condition, timeout=2):
+    deadline = monotonic() + timeout
+    while not condition() and monotonic() < deadline:
+        sleep(0.01)
+    return condition()
+
+
+class TestWLEDStateMirror(unittest.TestCase):
+
+    def setUp(self):
+        """Create a mirror whose connections go to fake sockets"""
+        self.sockets = {}
+
+        def connect(url, timeout):
+            ip = url.split('/')[2]
+            if ip == '10.0.0.9':
+                raise ConnectionRefusedError('unreachable')
+            self.sockets[ip] = FakeWebSocket()
+            return self.sockets[ip]
+
+        patcher = patch.object(websocket, 'create_connection', side_effect=connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mirror = WLEDStateMirror(max_backoff_s=0.1)
+        self.addCleanup(self.mirror.stop)
+
+    def test_mirrors_state(self):
+        """Test that pushed state updates the mirror and notifies listeners"""
+        changes = []
+        self.mirror.add_listener(changes.append)
+        self.mirror.watch(['10.0.0.1'])
+        self.assertTrue(wait_for(lambda: '10.0.0.1' in self.sockets))
+        self.assertEqual(self.sockets['10.0.0.1'].sent, ['{"v":true}'])
+
+        self.sockets['10.0.0.1'].push_state(on=True, bri=128)
+        self.assertTrue(wait_for(lambda: self.mirror.is_on('10.0.0.1') is True))
+        self.assertTrue(self.mirror.is_online('10.0.0.1'))
+        self.assertEqual(self.mirror.get_info('10.0.0.1')['leds']['count'], 30)
+        self.assertEqual(self.mirror.get_snapshot()['10.0.0.1']['brightness'], 128)
+
+        self.sockets['10.0.0.1'].push_state(on=False, bri=128)
+        self.assertTrue(wait_for(lambda: self.mirror.is_on('10.0.0.1') is False))
+        self.assertIn('10.0.0.1', changes)
+
+    def test_all_off(self):
+        """Test that only devices confirmed off count as off"""
+        self.mirror.watch(['10.0.0.1', '10.0.0.2'])
+        self.assertTrue(wait_for(lambda: len(self.sockets) == 2))
+        self.sockets['10.0.0.1'].push_state(on=False)
+        self.assertTrue(wait_for(lambda: self.mirror.is_on('10.0.0.1') is False))
+        self.assertFalse(self.mirror.all_off(['10.0.0.1', '10.0.0.2']))
+
+        self.sockets['10.0.0.2'].push_state(on=False)
+        self.assertTrue(wait_for(lambda: self.mirror.all_off(['10.0.0.1', '10.0.0.2'])))
+        self.assertFalse(self.mirror.all_off([]))
+
+    def test_unreachable_device(self):
+        """Test that unreachable devices are offline and never count as off"""
+        self.mirror.watch(['10.0.0.9'])
+        self.assertTrue(wait_for(lambda: self.mirror.is_online('10.0.0.9') is False))
+        self.assertIsNone(self.mirror.is_on('10.0.0.9'))
+        self.assertFalse(self.mirror.all_off(['10.0.0.9']))
+
+    def test_unwatch_closes_connection(self):
+        """Test that devices removed from the watch list are disconnected"""
+        self.mirror.watch(['10.0.0.1'])
+        self.assertTrue(wait_for(lambda: self.mirror.is_online('10.0.0.1')))
+        self.mirror.watch([])
+        self.assertTrue(self.sockets['10.0.0.1'].closed)
+        self.assertIsNone(self.mirror.is_online('10.0.0.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
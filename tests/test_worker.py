@@ -0,0 +1,163 @@
+"""
+Unit tests for the separate sync worker process
+"""
+import os
+import tempfile
+import threading
+import unittest
+from multiprocessing.connection import Client
+from time import monotonic, sleep
+from unittest.mock import patch
+from app.core.config import Config
+from app.core.sync_engine import SyncEngine
+from app.core.worker import RemoteSyncEngine, StatusBoard, SyncWorker, _authkey, parse_address
+
+
+class TestStatusBoard(unittest.TestCase):
+
+    def setUp(self):
+        """Create a shared memory board"""
+        self.name = f'stw_test_{os.getpid()}'
+        self.writer = StatusBoard(self.name, size=4096, create=True)
+        self.reader = StatusBoard(self.name)
+
+    def tearDown(self):
+        """Release shared memory"""
+        self.reader.close()
+        self.writer.close()
+
+    def test_publish_and_read(self):
+        """Test that readers see the latest payload"""
+        self.assertEqual(self.reader.read()[1], None)
+
+        self.writer.publish(b'{"version": 1}')
+        seq, payload = self.reader.read()
+        self.assertEqual(payload, b'{"version": 1}')
+        self.assertEqual(seq % 2, 0)
+
+        self.writer.publish(b'{"version": 2}')
+        self.assertGreater(self.reader.sequence(), seq)
+        self.assertEqual(self.reader.read()[1], b'{"version": 2}')
+
+    def test_oversized_payload_ignored(self):
+        """Test that payloads larger than the segment are rejected"""
+        self.writer.publish(b'{}')
+        self.writer.publish(b'x' * 8192)
+        self.assertEqual(self.reader.read()[1], b'{}')
+
+
+class TestSyncWorker(unittest.TestCase):
+
+    def setUp(self):
+        """Start a worker serving an engine on a temporary socket"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.temp_dir.name, 'sync.sock')
+        self.shm_name = f'stw_worker_{os.getpid()}'
+        self.worker = self.start_worker()
+        self.remote = RemoteSyncEngine(self.address, b'secret', shm_name=self.shm_name)
+
+    def start_worker(self):
+        config = Config(config_path=os.path.join(self.temp_dir.name, 'config.json'))
+        config.set('HISTORY_DB_PATH', ':memory:')
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        worker = SyncWorker(SyncEngine(config), self.address, b'secret', shm_name=self.shm_name)
+        threading.Thread(target=worker.serve_forever, daemon=True).start()
+        for _ in range(100):
+            if os.path.exists(self.address):
+                break
+            sleep(0.01)
+        return worker
+
+    def tearDown(self):
+        """Stop the worker"""
+        self.worker.stop()
+        self.temp_dir.cleanup()
+
+    def test_commands_and_status(self):
+        """Test that commands reach the worker and status comes back via shared memory"""
+        self.assertFalse(self.remote.is_running)
+        before = self.remote.get_status_snapshot().version
+
+        self.assertTrue(self.remote.set_color_extraction_method('average'))
+        self.assertFalse(self.remote.set_color_extraction_method('bogus'))
+
+        snapshot = self.remote.get_status_snapshot()
+        self.assertEqual(snapshot.color_extraction_method, 'average')
+        self.assertGreater(snapshot.version, before)
+        self.assertIs(self.remote.get_status_snapshot(), snapshot)
+
+    def test_status_follows_restarted_worker(self):
+        """Test that the web side re-attaches to the board of a new worker"""
+        self.assertTrue(self.remote.set_color_extraction_method('average'))
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'average')
+
+        self.worker.stop()
+        self.worker = self.start_worker()
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'vibrant')
+        self.assertTrue(self.remote.set_color_extraction_method('dominant'))
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'dominant')
+
+    def test_status_follows_worker_after_crash(self):
+        """Test that a board left behind without being retired is replaced too"""
+        self.assertTrue(self.remote.set_color_extraction_method('average'))
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'average')
+
+        # A killed worker never retires its board; the segment just goes away
+        self.worker.board._shm.unlink()
+        self.worker._listener.close()
+        self.worker = self.start_worker()
+        self.assertTrue(self.remote.set_color_extraction_method('dominant'))
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'average')
+        with patch('app.core.worker.BOARD_RECHECK_S', 0.0):
+            self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'dominant')
+
+    def test_start_fails_with_invalid_config(self):
+        """Test that start reports failure from the worker"""
+        self.assertFalse(self.remote.start())
+
+    def test_history_query(self):
+        """Test that history queries are served by the worker"""
+        self.assertEqual(self.remote.query_history(page=1)['total'], 0)
+
+    def test_stalled_handshake_does_not_block_commands(self):
+        """Test that a client that never answers the challenge holds up nobody else"""
+        with patch('app.core.worker.HANDSHAKE_TIMEOUT_S', 0.5), Client(self.address) as stalled:
+            started = monotonic()
+            self.assertTrue(self.remote.set_color_extraction_method('average'))
+            self.assertLess(monotonic() - started, 0.5)
+            sleep(0.7)
+            with self.assertRaises((EOFError, OSError)):
+                stalled.recv_bytes()  # The challenge
+                stalled.recv_bytes()
+
+    def test_wrong_authkey_rejected(self):
+        """Test that clients without the auth key cannot send commands"""
+        intruder = RemoteSyncEngine(self.remote.address, b'wrong', shm_name=self.remote.shm_name)
+        self.assertFalse(intruder.set_color_extraction_method('dominant'))
+        self.assertEqual(self.remote.get_status_snapshot().color_extraction_method, 'vibrant')
+
+
+class TestParseAddress(unittest.TestCase):
+
+    def test_parse_address(self):
+        """Test TCP and Unix socket address parsing"""
+        self.assertEqual(parse_address('127.0.0.1:7000'), ('127.0.0.1', 7000))
+        self.assertEqual(parse_address('/tmp/sync.sock'), '/tmp/sync.sock')
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_tcp_needs_authkey(self):
+        """Test that only Unix sockets fall back to the built-in auth key"""
+        config = Config(config_path=os.path.join(tempfile.gettempdir(), 'stw_missing_config.json'))
+        config.data.pop('SECRET_KEY', None)
+        self.assertEqual(_authkey(config, '/tmp/sync.sock'), b'spotifytowled')
+        with self.assertRaises(ValueError):
+            _authkey(config, '0.0.0.0:7000')
+        config.data['SECRET_KEY'] = 'app secret'
+        self.assertEqual(_authkey(config, '0.0.0.0:7000'), b'app secret')
+        with patch.dict(os.environ, {'SYNC_WORKER_AUTHKEY': 'worker secret'}):
+            self.assertEqual(_authkey(config, '0.0.0.0:7000'), b'worker secret')
+
+
+if __name__ == '__main__':
+    unittest.main()